@@ -4,17 +4,28 @@ HTTP Wrapper for Tonnage Prediction MCP Server
 This makes it easy to integrate with n8n using HTTP Request nodes
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import asyncio
+import atexit
 import json
+import multiprocessing
 import sys
 import os
+import threading
+import time
+import uuid
+from io import BytesIO
+import numpy as np
+import pandas as pd
 
 # Add the current directory to path to import the MCP server
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from tonnage_mcp_server import MCPServer
+import tonnage_mcp_server
+from tonnage_mcp_server import MCPServer, run_simulation_job, simulation_cache_key
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -22,6 +33,165 @@ CORS(app)  # Enable CORS for all routes
 # Create a single MCP server instance
 mcp_server = MCPServer()
 
+# Simulation jobs run in worker processes so the CPU-bound engine never holds the
+# Flask process's GIL while /predict and the other routes are being served
+SIMULATION_JOB_WORKERS = int(os.environ.get("SIMULATION_JOB_WORKERS", "2"))
+SIMULATION_MAX_PENDING = int(os.environ.get("SIMULATION_MAX_PENDING", "16"))
+# Finished jobs are forgotten after SIMULATION_JOB_TTL seconds, oldest first past SIMULATION_MAX_JOBS
+SIMULATION_JOB_TTL = float(os.environ.get("SIMULATION_JOB_TTL", "3600"))
+SIMULATION_MAX_JOBS = int(os.environ.get("SIMULATION_MAX_JOBS", "256"))
+SIMULATION_PAGE_SIZE = 100
+SIMULATION_MAX_PAGE_SIZE = 1000
+
+simulation_executor = None
+simulation_manager = None
+simulation_progress = None
+simulation_jobs = {}
+simulation_jobs_lock = threading.Lock()
+
+
+def _timestamp():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _update_job(job_id, **fields):
+    with simulation_jobs_lock:
+        if job_id in simulation_jobs:
+            simulation_jobs[job_id].update(fields)
+
+
+def get_simulation_executor():
+    """Return the simulation worker pool and progress queue, starting them on first use"""
+    global simulation_executor, simulation_manager, simulation_progress
+    with simulation_jobs_lock:
+        if simulation_executor is None:
+            simulation_manager = multiprocessing.Manager()
+            simulation_progress = simulation_manager.Queue()
+            simulation_executor = ProcessPoolExecutor(max_workers=SIMULATION_JOB_WORKERS)
+            threading.Thread(target=_drain_progress, args=(simulation_progress,),
+                             name="simulation-progress", daemon=True).start()
+            atexit.register(simulation_executor.shutdown, wait=False, cancel_futures=True)
+            atexit.register(simulation_manager.shutdown)
+    return simulation_executor, simulation_progress
+
+
+def _drain_progress(progress):
+    """Apply progress messages sent by worker processes to the job records"""
+    while True:
+        try:
+            event, job_id, months_completed, months_total = progress.get()
+        except (EOFError, OSError):
+            return
+        with simulation_jobs_lock:
+            job = simulation_jobs.get(job_id)
+            if job is None or job["status"] in ("completed", "failed"):
+                continue
+            if event == "started":
+                job.update(status="running", started_at=_timestamp())
+            else:
+                job.update(months_completed=months_completed, months_total=months_total)
+
+
+def _simulation_worker(job_id, params, cache_dir, progress):
+    """Run one simulation job in a worker process, reporting progress through the queue"""
+    progress.put(("started", job_id, 0, 0))
+
+    def report_progress(months_completed, months_total):
+        progress.put(("progress", job_id, months_completed, months_total))
+
+    output_dir = os.path.join(cache_dir, params["cache_key"])
+    summary_path = os.path.join(output_dir, "summary.json")
+    summary = None
+    if os.path.exists(summary_path):
+        with open(summary_path) as f:
+            summary = json.load(f)
+        if not os.path.exists(summary["purchase_orders_path"]):
+            summary = None
+    if summary is None:
+        summary = run_simulation_job(params["harvest_csv_path"], params["demand_csv_path"],
+                                     params["simulation_years"], params["planning_lead_time"],
+                                     output_dir, progress_callback=report_progress)
+    _index_rows(summary["purchase_orders_path"])
+    return summary
+
+
+def _index_rows(csv_path):
+    """Return the byte offset of every line of a CSV, writing them next to it on first use.
+
+    offsets[0] is the header, offsets[i] the i-th data row and offsets[-1] the end of
+    the file, so a page of rows is read with one seek instead of parsing from the top.
+    """
+    offsets_path = f"{csv_path}.offsets.npy"
+    if not os.path.exists(offsets_path):
+        with open(csv_path, "rb") as f:
+            offsets = np.concatenate([[0], np.cumsum([len(line) for line in f])]).astype(np.int64)
+        tmp_path = f"{offsets_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, offsets)
+        os.replace(tmp_path, offsets_path)
+    return np.load(offsets_path, mmap_mode="r")
+
+
+def _read_rows(csv_path, start, stop):
+    """Read data rows [start, stop) of a CSV by seeking to them"""
+    offsets = _index_rows(csv_path)
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        f.seek(int(offsets[start + 1]))
+        data = f.read(int(offsets[stop + 1] - offsets[start + 1]))
+    return pd.read_csv(BytesIO(header + data))
+
+
+def _finish_job(job_id, future):
+    """Record the outcome of a finished worker future"""
+    try:
+        summary = future.result()
+    except Exception as e:
+        _update_job(job_id, status="failed", finished_at=_timestamp(),
+                    finished_ts=time.time(), error=str(e))
+        return
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        if job is not None:
+            job.update(status="completed", finished_at=_timestamp(), finished_ts=time.time(),
+                       months_completed=job["months_total"], summary=summary)
+
+
+def _prune_jobs(now=None):
+    """Forget finished jobs past their TTL, then the oldest finished ones past the size limit.
+
+    Must be called with simulation_jobs_lock held.
+    """
+    now = time.time() if now is None else now
+    finished = sorted((job["finished_ts"], job_id) for job_id, job in simulation_jobs.items()
+                      if job["status"] in ("completed", "failed"))
+    excess = len(simulation_jobs) - SIMULATION_MAX_JOBS
+    for finished_ts, job_id in finished:
+        if now - finished_ts > SIMULATION_JOB_TTL or excess > 0:
+            del simulation_jobs[job_id]
+            excess -= 1
+
+
+def _job_view(job):
+    """Public representation of a job record"""
+    months_total = job["months_total"]
+    view = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "parameters": job["parameters"],
+        "progress": {
+            "months_completed": job["months_completed"],
+            "months_total": months_total,
+            "percent": round(100.0 * job["months_completed"] / months_total, 1) if months_total else 0.0
+        },
+        "submitted_at": job["submitted_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+    if job["status"] == "failed":
+        view["error"] = job["error"]
+    return view
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -201,6 +371,136 @@ def get_valid_values():
             "message": str(e)
         }), 500
 
+@app.route('/simulations', methods=['POST'])
+def submit_simulation():
+    """Queue a supply chain simulation and return its job ID"""
+    try:
+        data = request.get_json() or {}
+        params = {
+            "harvest_csv_path": data.get('harvest_csv_path'),
+            "demand_csv_path": data.get('demand_csv_path'),
+            "simulation_years": [int(year) for year in data.get('simulation_years', [2021])],
+            "planning_lead_time": int(data.get('planning_lead_time', 3))
+        }
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Invalid parameters: {e}"}), 400
+
+    for key in ("harvest_csv_path", "demand_csv_path"):
+        if not params[key] or not os.path.exists(params[key]):
+            return jsonify({"status": "error", "message": f"Input file not found: {params[key]}"}), 400
+    if not params["simulation_years"]:
+        return jsonify({"status": "error", "message": "simulation_years must not be empty"}), 400
+
+    try:
+        cache_key = simulation_cache_key(params["harvest_csv_path"], params["demand_csv_path"],
+                                         params["simulation_years"], params["planning_lead_time"])
+    except OSError as e:
+        return jsonify({"status": "error", "message": f"Could not read input files: {e}"}), 400
+
+    executor, progress = get_simulation_executor()
+    with simulation_jobs_lock:
+        _prune_jobs()
+
+        # An identical request joins the job already in flight instead of writing the
+        # same output directory concurrently; finished results are reused from the cache
+        for job in simulation_jobs.values():
+            if job["cache_key"] == cache_key and job["status"] in ("queued", "running"):
+                return jsonify({
+                    "job_id": job["job_id"],
+                    "status": job["status"],
+                    "status_url": f"/simulations/{job['job_id']}",
+                    "deduplicated": True
+                }), 202
+
+        pending = sum(1 for job in simulation_jobs.values() if job["status"] in ("queued", "running"))
+        if pending >= SIMULATION_MAX_PENDING:
+            return jsonify({
+                "status": "error",
+                "message": "Simulation queue is full, retry later",
+                "pending_jobs": pending
+            }), 503
+
+        job_id = uuid.uuid4().hex
+        simulation_jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "parameters": params,
+            "months_completed": 0,
+            "months_total": len(params["simulation_years"]) * 12,
+            "submitted_at": _timestamp(),
+            "started_at": None,
+            "finished_at": None,
+            "finished_ts": None,
+            "error": None,
+            "cache_key": cache_key,
+            "summary": None
+        }
+        future = executor.submit(_simulation_worker, job_id, {**params, "cache_key": cache_key},
+                                 tonnage_mcp_server.SIMULATION_CACHE_DIR, progress)
+    future.add_done_callback(lambda done: _finish_job(job_id, done))
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/simulations/{job_id}"
+    }), 202
+
+@app.route('/simulations/<job_id>', methods=['GET'])
+def get_simulation(job_id):
+    """Report job progress and, once complete, a page of purchase orders"""
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        job = dict(job) if job else None
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown simulation job: {job_id}"}), 404
+
+    view = _job_view(job)
+    if job["status"] != "completed":
+        return jsonify(view)
+
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        page_size = int(request.args.get('page_size', SIMULATION_PAGE_SIZE))
+        page_size = min(max(page_size, 1), SIMULATION_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"status": "error", "message": "page and page_size must be integers"}), 400
+
+    summary = job["summary"]
+    total = summary["total_purchase_orders"]
+    start = (page - 1) * page_size
+    rows = []
+    if start < total:
+        page_df = _read_rows(summary["purchase_orders_path"], start, min(start + page_size, total))
+        rows = json.loads(page_df.to_json(orient="records"))
+
+    view["summary"] = {k: v for k, v in summary.items() if k != "purchase_orders_path"}
+    view["purchase_orders"] = {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": (total + page_size - 1) // page_size,
+        "rows": rows,
+        "download_url": f"/simulations/{job_id}/purchase-orders"
+    }
+    return jsonify(view)
+
+@app.route('/simulations/<job_id>/purchase-orders', methods=['GET'])
+def stream_simulation_purchase_orders(job_id):
+    """Stream the full purchase order table of a completed job as CSV"""
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        job = dict(job) if job else None
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown simulation job: {job_id}"}), 404
+    if job["status"] != "completed":
+        return jsonify({"status": "error", "message": f"Simulation job is {job['status']}"}), 409
+
+    def generate(path):
+        with open(path) as f:
+            for line in f:
+                yield line
+
+    return Response(generate(job["summary"]["purchase_orders_path"]), mimetype="text/csv")
+
 @app.route('/', methods=['GET'])
 def index():
     """Show available endpoints"""
@@ -214,6 +514,9 @@ def index():
             "POST /predict": "Make a prediction (body: {city, customer_id, apple_variety, year, month})",
             "POST /batch-predict": "Batch predictions (body: {predictions: [...]})",
             "GET /valid-values": "Get valid categorical values",
+            "POST /simulations": "Queue a supply chain simulation (body: {harvest_csv_path, demand_csv_path, simulation_years, planning_lead_time})",
+            "GET /simulations/<job_id>": "Simulation progress and paginated results (query: page, page_size)",
+            "GET /simulations/<job_id>/purchase-orders": "Stream the full purchase order table as CSV",
             "POST /mcp": "Raw MCP protocol endpoint"
         },
         "model_trained": mcp_server.model_trained
@@ -231,6 +534,8 @@ if __name__ == '__main__':
     print("  POST /predict       - Make prediction")
     print("  POST /batch-predict - Batch predictions")
     print("  GET  /valid-values  - Get valid values")
+    print("  POST /simulations   - Queue a simulation job")
+    print("  GET  /simulations/<id> - Simulation progress and results")
     print("  POST /mcp           - MCP protocol")
     print("\n" + "="*60)
     
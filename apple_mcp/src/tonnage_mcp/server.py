@@ -6,7 +6,13 @@ This server exposes the tonnage prediction model via MCP protocol
 
 import json
 import sys
+import os
 import asyncio
+import hashlib
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Sequence
 import pickle
 import pandas as pd
@@ -16,12 +22,129 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 
+# Bumped when the layout of cached summaries changes; engine changes are picked up
+# through engine_fingerprint()
+SIMULATION_CACHE_VERSION = "1"
+
+SIMULATION_CACHE_DIR = os.environ.get(
+    "TONNAGE_MCP_SIMULATION_CACHE",
+    os.path.join(tempfile.gettempdir(), "tonnage_mcp_simulations")
+)
+SIMULATION_WORKERS = int(os.environ.get("TONNAGE_MCP_SIMULATION_WORKERS", "2"))
+# Summaries kept in memory; older ones are evicted and reloaded from summary.json on demand
+SIMULATION_MEMORY_ENTRIES = int(os.environ.get("TONNAGE_MCP_SIMULATION_MEMORY_ENTRIES", "128"))
+
+
+def find_simulation_src() -> str:
+    """Locate the supply chain simulation sources (the repository's src/ directory)"""
+    configured = os.environ.get("SUPPLY_CHAIN_SRC")
+    if configured:
+        return os.path.abspath(configured)
+
+    current = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(current, "src")
+        if os.path.exists(os.path.join(candidate, "simulation.py")):
+            return candidate
+        parent = os.path.dirname(current)
+        if parent == current:
+            raise FileNotFoundError(
+                "Supply chain simulation sources not found; set SUPPLY_CHAIN_SRC"
+            )
+        current = parent
+
+
+@lru_cache(maxsize=1)
+def engine_fingerprint() -> str:
+    """Engine version and the config tables its output depends on, as src/result_cache.py hashes them"""
+    src_dir = find_simulation_src()
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from result_cache import ENGINE_SETTINGS, ENGINE_VERSION
+    return ENGINE_VERSION + json.dumps(ENGINE_SETTINGS, sort_keys=True, default=str)
+
+
+def simulation_cache_key(harvest_csv_path: str, demand_csv_path: str,
+                         simulation_years: list, planning_lead_time: int) -> str:
+    """Hash the input file contents, run parameters and engine version into a cache key"""
+    digest = hashlib.sha256()
+    digest.update(SIMULATION_CACHE_VERSION.encode())
+    digest.update(engine_fingerprint().encode())
+    for path in (harvest_csv_path, demand_csv_path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    params = {"simulation_years": list(simulation_years), "planning_lead_time": planning_lead_time}
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def run_simulation_job(harvest_csv_path: str, demand_csv_path: str, simulation_years: list,
+                       planning_lead_time: int, output_dir: str, progress_callback=None) -> dict:
+    """Run the supply chain simulation and write its PO table to output_dir.
+
+    Usually runs in a worker process, so it only takes and returns picklable values;
+    progress_callback(months_completed, months_total) is only usable in-process.
+    """
+    src_dir = find_simulation_src()
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from data_utils import load_csv_data
+    from simulation_api import simulate, SimulationConfig
+
+    # The schemas map unit-suffixed headers such as 'Harvest Quantity(million metrictons)'
+    df_harvest = load_csv_data(harvest_csv_path, schema="Harvest_By_Supplier")
+    df_demand = load_csv_data(demand_csv_path, schema="CustomerDemand")
+    if df_harvest is None or df_demand is None:
+        raise ValueError("Could not load harvest or demand data")
+
+    config = SimulationConfig(simulation_years=tuple(simulation_years),
+                              planning_lead_time=planning_lead_time)
+    result = simulate(df_harvest, df_demand, config, progress_callback=progress_callback)
+    if result is None:
+        raise ValueError("Simulation inputs are invalid; check the required columns")
+
+    os.makedirs(output_dir, exist_ok=True)
+    po_path = os.path.join(output_dir, "purchase_orders.csv")
+    po_df = result.purchase_orders
+    po_df.to_csv(po_path, index=False)
+
+    shortfalls = result.shortfalls
+    summary = {
+        "simulation_years": list(config.simulation_years),
+        "planning_lead_time": config.planning_lead_time,
+        "total_purchase_orders": int(result.po_count),
+        "total_quantity_ordered": float(po_df["QuantityOrdered"].sum()) if not po_df.empty else 0.0,
+        "quantity_by_variety": (
+            {k: float(v) for k, v in po_df.groupby("AppleVariety")["QuantityOrdered"].sum().items()}
+            if not po_df.empty else {}
+        ),
+        "quantity_by_supplier": (
+            {k: float(v) for k, v in po_df.groupby("SupplierID")["QuantityOrdered"].sum().items()}
+            if not po_df.empty else {}
+        ),
+        "shortfall_count": int(len(shortfalls)),
+        "total_shortfall": float(shortfalls["Shortfall"].sum()) if not shortfalls.empty else 0.0,
+        "shortfalls": shortfalls.head(50).to_dict(orient="records"),
+        "timings": {k: round(v, 6) for k, v in result.timings.items()},
+        "purchase_orders_path": po_path
+    }
+
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    return summary
+
+
 # MCP Protocol Implementation
 class MCPServer:
     def __init__(self):
         self.model = None
         self.encoders = {}
         self.model_trained = False
+        self.simulation_cache = OrderedDict()
+        self.simulation_executor = None
         
     async def handle_request(self, request: dict) -> dict:
         """Handle incoming MCP requests"""
@@ -153,6 +276,35 @@ class MCPServer:
                         },
                         "required": ["predictions"]
                     }
+                },
+                {
+                    "name": "run_simulation",
+                    "description": "Run the supply chain PO simulation; identical inputs are served from cache",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "harvest_csv_path": {
+                                "type": "string",
+                                "description": "Path to the supplier harvest CSV file"
+                            },
+                            "demand_csv_path": {
+                                "type": "string",
+                                "description": "Path to the customer demand CSV file"
+                            },
+                            "simulation_years": {
+                                "type": "array",
+                                "description": "Years to simulate (e.g., [2024, 2025])",
+                                "items": {"type": "integer"},
+                                "default": [2021]
+                            },
+                            "planning_lead_time": {
+                                "type": "integer",
+                                "description": "Planning lead time in months",
+                                "default": 3
+                            }
+                        },
+                        "required": ["harvest_csv_path", "demand_csv_path"]
+                    }
                 }
             ]
         }
@@ -170,6 +322,8 @@ class MCPServer:
             return await self.get_valid_values()
         elif tool_name == "batch_predict":
             return await self.batch_predict(arguments)
+        elif tool_name == "run_simulation":
+            return await self.run_simulation(arguments)
         else:
             raise ValueError(f"Unknown tool: {tool_name}")
     
@@ -427,6 +581,90 @@ class MCPServer:
             ]
         }
 
+    
+    def remember_simulation(self, cache_key: str, summary: dict):
+        """Keep a summary in the in-memory LRU, evicting the least recently used past the limit"""
+        self.simulation_cache[cache_key] = summary
+        self.simulation_cache.move_to_end(cache_key)
+        while len(self.simulation_cache) > SIMULATION_MEMORY_ENTRIES:
+            self.simulation_cache.popitem(last=False)
+    
+    def get_simulation_executor(self) -> ProcessPoolExecutor:
+        """Return the worker pool used for simulation runs, creating it on first use"""
+        if self.simulation_executor is None:
+            self.simulation_executor = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS)
+        return self.simulation_executor
+    
+    async def run_simulation(self, args: dict) -> dict:
+        """Run the supply chain simulation in a worker process, caching by input hash"""
+        try:
+            harvest_csv_path = args.get("harvest_csv_path")
+            demand_csv_path = args.get("demand_csv_path")
+            simulation_years = [int(year) for year in args.get("simulation_years", [2021])]
+            planning_lead_time = int(args.get("planning_lead_time", 3))
+            
+            for path in (harvest_csv_path, demand_csv_path):
+                if not path or not os.path.exists(path):
+                    raise FileNotFoundError(f"Input file not found: {path}")
+            
+            # Hashing whole input files would block the event loop
+            loop = asyncio.get_running_loop()
+            cache_key = await loop.run_in_executor(None, simulation_cache_key, harvest_csv_path,
+                                                   demand_csv_path, simulation_years, planning_lead_time)
+            output_dir = os.path.join(SIMULATION_CACHE_DIR, cache_key)
+            summary_path = os.path.join(output_dir, "summary.json")
+            
+            summary = self.simulation_cache.get(cache_key)
+            cached = summary is not None and os.path.exists(summary["purchase_orders_path"])
+            if cached:
+                self.simulation_cache.move_to_end(cache_key)
+            elif summary is not None:
+                # The PO table was removed from disk; run the simulation again
+                del self.simulation_cache[cache_key]
+            if not cached and os.path.exists(summary_path):
+                with open(summary_path) as f:
+                    summary = json.load(f)
+                cached = os.path.exists(summary["purchase_orders_path"])
+            
+            if not cached:
+                summary = await loop.run_in_executor(
+                    self.get_simulation_executor(),
+                    run_simulation_job,
+                    harvest_csv_path,
+                    demand_csv_path,
+                    simulation_years,
+                    planning_lead_time,
+                    output_dir
+                )
+            self.remember_simulation(cache_key, summary)
+            
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": json.dumps({
+                            "status": "success",
+                            "cached": cached,
+                            "cache_key": cache_key,
+                            **summary
+                        }, indent=2, default=str)
+                    }
+                ]
+            }
+        except Exception as e:
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": json.dumps({
+                            "status": "error",
+                            "message": str(e)
+                        })
+                    }
+                ],
+                "isError": True
+            }
+
 
 async def main():
     """Main server loop"""
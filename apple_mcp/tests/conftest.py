@@ -0,0 +1,35 @@
+"""
+Shared fixtures for the unit and integration tests
+"""
+
+import pytest
+import pandas as pd
+
+
+@pytest.fixture
+def simulation_csvs(tmp_path):
+    """Create small harvest and demand CSV files for the simulation"""
+    harvest = pd.DataFrame({
+        'SupplierID': ['S1', 'S1', 'S2'],
+        'Country': ['India', 'India', 'Chile'],
+        'Apple Variety': ['Fuji', 'Royal Gala', 'Fuji'],
+        'Harvest Month': ['January', 'January', 'February'],
+        'Harvest Quantity': [500, 400, 300]
+    })
+    months = ['January', 'February', 'March', 'April']
+    demand = pd.DataFrame({
+        'city': ['Berlin'] * 4,
+        'customer_id': ['EDEKA'] * 4,
+        'month': months,
+        'royal_gala': [150, 150, 150, 150],
+        'fuji': [80, 80, 80, 80],
+        'granny_smith': [0, 0, 0, 0],
+        'golden_delicious': [0, 0, 0, 0],
+        'pink_lady': [0, 0, 0, 0],
+        'total': [230, 230, 230, 230]
+    })
+    harvest_path = tmp_path / "harvest.csv"
+    demand_path = tmp_path / "demand.csv"
+    harvest.to_csv(harvest_path, index=False)
+    demand.to_csv(demand_path, index=False)
+    return str(harvest_path), str(demand_path)
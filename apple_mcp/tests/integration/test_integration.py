@@ -122,7 +122,7 @@ class TestCompleteWorkflow:
         response = mcp_client.send_request("tools/list")
 
         assert "result" in response
-        assert len(response["result"]["tools"]) == 4
+        assert len(response["result"]["tools"]) == 5
 
         # Step 3: Train model
         response = mcp_client.send_request("tools/call", {
@@ -9,11 +9,14 @@ import tempfile
 import os
 import pandas as pd
 import sys
+import time
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
+from tonnage_mcp import http_wrapper
 from tonnage_mcp.http_wrapper import app, mcp_server
+import tonnage_mcp_server
 
 
 @pytest.fixture
@@ -298,3 +301,152 @@ class TestMCPEndpoint:
         assert data["id"] == 2
         assert "result" in data
         assert "tools" in data["result"]
+
+
+class TestSimulationEndpoints:
+    """Test the asynchronous simulation job endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        """Point the simulation cache at a temporary directory"""
+        monkeypatch.setattr(tonnage_mcp_server, "SIMULATION_CACHE_DIR", str(tmp_path / "cache"))
+
+    def wait_for_job(self, client, job_id, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            data = client.get(f'/simulations/{job_id}').get_json()
+            if data['status'] in ('completed', 'failed'):
+                return data
+            time.sleep(0.1)
+        raise AssertionError(f"Simulation job {job_id} did not finish")
+
+    def test_submit_and_poll_simulation(self, client, simulation_csvs):
+        """Test a queued simulation completes with progress and paginated results"""
+        harvest_path, demand_path = simulation_csvs
+        response = client.post('/simulations',
+                               json={
+                                   'harvest_csv_path': harvest_path,
+                                   'demand_csv_path': demand_path,
+                                   'simulation_years': [2024, 2025],
+                                   'planning_lead_time': 1
+                               })
+        assert response.status_code == 202
+
+        job_id = response.get_json()['job_id']
+        data = self.wait_for_job(client, job_id)
+
+        assert data['status'] == 'completed'
+        assert data['progress']['months_completed'] == 24
+        assert data['progress']['months_total'] == 24
+        assert data['summary']['total_purchase_orders'] > 0
+
+        page = data['purchase_orders']
+        assert page['page'] == 1
+        assert page['total'] == data['summary']['total_purchase_orders']
+        assert len(page['rows']) == min(page['total'], page['page_size'])
+
+        # Second page of size 2 starts at the third purchase order
+        second = client.get(f'/simulations/{job_id}?page=2&page_size=2').get_json()
+        assert second['purchase_orders']['page_size'] == 2
+        assert second['purchase_orders']['rows'][0]['PO_ID'] == page['rows'][2]['PO_ID']
+
+    def test_stream_purchase_orders(self, client, simulation_csvs):
+        """Test the full purchase order table can be streamed as CSV"""
+        harvest_path, demand_path = simulation_csvs
+        job_id = client.post('/simulations',
+                             json={
+                                 'harvest_csv_path': harvest_path,
+                                 'demand_csv_path': demand_path
+                             }).get_json()['job_id']
+        data = self.wait_for_job(client, job_id)
+
+        response = client.get(f'/simulations/{job_id}/purchase-orders')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        lines = response.get_data(as_text=True).strip().splitlines()
+        assert lines[0].startswith('PO_ID')
+        assert len(lines) - 1 == data['summary']['total_purchase_orders']
+
+    def test_unknown_job(self, client):
+        """Test polling an unknown job ID"""
+        response = client.get('/simulations/does-not-exist')
+        assert response.status_code == 404
+
+    def test_missing_input_file(self, client):
+        """Test submitting a job with a missing input file"""
+        response = client.post('/simulations',
+                               json={
+                                   'harvest_csv_path': '/invalid/harvest.csv',
+                                   'demand_csv_path': '/invalid/demand.csv'
+                               })
+        assert response.status_code == 400
+
+    def test_queue_full(self, client, simulation_csvs, monkeypatch):
+        """Test submissions are rejected once the queue is full"""
+        monkeypatch.setattr(http_wrapper, "SIMULATION_MAX_PENDING", 0)
+        harvest_path, demand_path = simulation_csvs
+        response = client.post('/simulations',
+                               json={
+                                   'harvest_csv_path': harvest_path,
+                                   'demand_csv_path': demand_path
+                               })
+        assert response.status_code == 503
+
+    def test_identical_requests_share_a_job(self, client, simulation_csvs):
+        """Test a repeated request returns the job already in flight"""
+        harvest_path, demand_path = simulation_csvs
+        payload = {'harvest_csv_path': harvest_path, 'demand_csv_path': demand_path}
+        first = client.post('/simulations', json=payload).get_json()
+        second = client.post('/simulations', json=payload)
+        assert second.status_code == 202
+        assert second.get_json()['job_id'] == first['job_id']
+        assert second.get_json()['deduplicated'] is True
+        assert self.wait_for_job(client, first['job_id'])['status'] == 'completed'
+
+    def test_finished_jobs_are_pruned(self, client, simulation_csvs, monkeypatch):
+        """Test finished jobs past the TTL are forgotten on the next submission"""
+        harvest_path, demand_path = simulation_csvs
+        job_id = client.post('/simulations',
+                             json={
+                                 'harvest_csv_path': harvest_path,
+                                 'demand_csv_path': demand_path
+                             }).get_json()['job_id']
+        self.wait_for_job(client, job_id)
+
+        monkeypatch.setattr(http_wrapper, "SIMULATION_JOB_TTL", 0)
+        time.sleep(0.01)
+        response = client.post('/simulations',
+                               json={
+                                   'harvest_csv_path': harvest_path,
+                                   'demand_csv_path': demand_path,
+                                   'planning_lead_time': 1
+                               })
+        assert response.status_code == 202
+        assert client.get(f'/simulations/{job_id}').status_code == 404
+        self.wait_for_job(client, response.get_json()['job_id'])
+
+    def test_root_wrapper_has_simulation_routes(self):
+        """Test the top-level http_mcp_wrapper.py serves the same simulation routes"""
+        import http_mcp_wrapper
+        rules = {rule.rule for rule in http_mcp_wrapper.app.url_map.iter_rules()}
+        assert {'/simulations', '/simulations/<job_id>', '/simulations/<job_id>/purchase-orders'} <= rules
+
+    def test_pages_are_read_by_offset(self, client, simulation_csvs):
+        """Test the last, partial page is read from the row offset index"""
+        harvest_path, demand_path = simulation_csvs
+        job_id = client.post('/simulations',
+                             json={
+                                 'harvest_csv_path': harvest_path,
+                                 'demand_csv_path': demand_path
+                             }).get_json()['job_id']
+        data = self.wait_for_job(client, job_id)
+        total = data['summary']['total_purchase_orders']
+
+        with http_wrapper.simulation_jobs_lock:
+            path = http_wrapper.simulation_jobs[job_id]['summary']['purchase_orders_path']
+        assert os.path.exists(f"{path}.offsets.npy")
+
+        all_rows = pd.read_csv(path)
+        last = client.get(f'/simulations/{job_id}?page={total // 2 + 1}&page_size=2').get_json()
+        rows = last['purchase_orders']['rows']
+        assert [row['PO_ID'] for row in rows] == all_rows['PO_ID'].tolist()[(total // 2) * 2:]
@@ -14,6 +14,7 @@ import sys
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
+from tonnage_mcp import server as server_module
 from tonnage_mcp.server import MCPServer
 
 
@@ -91,13 +92,14 @@ class TestMCPServerInitialization:
         assert "tools" in response["result"]
 
         tools = response["result"]["tools"]
-        assert len(tools) == 4
+        assert len(tools) == 5
 
         tool_names = [tool["name"] for tool in tools]
         assert "train_model" in tool_names
         assert "predict_tonnage" in tool_names
         assert "get_valid_values" in tool_names
         assert "batch_predict" in tool_names
+        assert "run_simulation" in tool_names
 
 
 class TestModelTraining:
@@ -444,6 +446,137 @@ class TestBatchPredict:
             assert isinstance(pred["prediction"], (int, float))
 
 
+class TestRunSimulation:
+    """Test the run_simulation tool"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        """Point the simulation cache at a temporary directory"""
+        cache_dir = tmp_path / "cache"
+        monkeypatch.setattr(server_module, "SIMULATION_CACHE_DIR", str(cache_dir))
+        return cache_dir
+
+    async def call_run_simulation(self, server, arguments):
+        request = {
+            "jsonrpc": "2.0",
+            "id": 20,
+            "method": "tools/call",
+            "params": {
+                "name": "run_simulation",
+                "arguments": arguments
+            }
+        }
+        response = await server.handle_request(request)
+        return response, json.loads(response["result"]["content"][0]["text"])
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_success(self, server, simulation_csvs):
+        """Test a simulation run returns a summary and the PO table path"""
+        harvest_path, demand_path = simulation_csvs
+        response, result = await self.call_run_simulation(server, {
+            "harvest_csv_path": harvest_path,
+            "demand_csv_path": demand_path,
+            "simulation_years": [2024],
+            "planning_lead_time": 1
+        })
+
+        assert "isError" not in response["result"]
+        assert result["status"] == "success"
+        assert result["cached"] is False
+        assert result["total_purchase_orders"] > 0
+        assert result["shortfall_count"] > 0
+        assert os.path.exists(result["purchase_orders_path"])
+
+        po_df = pd.read_csv(result["purchase_orders_path"])
+        assert len(po_df) == result["total_purchase_orders"]
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_cached(self, server, simulation_csvs, cache_dir):
+        """Test identical calls are served from the cache"""
+        harvest_path, demand_path = simulation_csvs
+        arguments = {
+            "harvest_csv_path": harvest_path,
+            "demand_csv_path": demand_path,
+            "simulation_years": [2024]
+        }
+
+        _, first = await self.call_run_simulation(server, arguments)
+        _, second = await self.call_run_simulation(server, arguments)
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["cache_key"] == first["cache_key"]
+
+        # A fresh server instance still finds the results on disk
+        _, third = await self.call_run_simulation(MCPServer(), arguments)
+        assert third["cached"] is True
+
+        # Changing a parameter changes the cache key
+        _, other = await self.call_run_simulation(server, {**arguments, "planning_lead_time": 2})
+        assert other["cached"] is False
+        assert other["cache_key"] != first["cache_key"]
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_repository_data(self, server):
+        """Test the repository's own CSVs, with unit-suffixed headers, load through the schemas"""
+        data_dir = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data')
+        response, result = await self.call_run_simulation(server, {
+            "harvest_csv_path": os.path.join(data_dir, "supplier_harvest.csv"),
+            "demand_csv_path": os.path.join(data_dir, "customer_demand.csv"),
+            "simulation_years": [2021]
+        })
+
+        assert "isError" not in response["result"], result
+        assert result["total_purchase_orders"] > 0
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_memory_cache_is_bounded(self, server, simulation_csvs, monkeypatch):
+        """Test the in-memory summaries are evicted least recently used first"""
+        monkeypatch.setattr(server_module, "SIMULATION_MEMORY_ENTRIES", 2)
+        harvest_path, demand_path = simulation_csvs
+        keys = []
+        for lead_time in (1, 2, 3):
+            _, result = await self.call_run_simulation(server, {
+                "harvest_csv_path": harvest_path,
+                "demand_csv_path": demand_path,
+                "planning_lead_time": lead_time
+            })
+            keys.append(result["cache_key"])
+
+        assert list(server.simulation_cache) == keys[1:]
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_reruns_when_output_removed(self, server, simulation_csvs):
+        """Test an in-memory hit whose PO table was deleted runs the simulation again"""
+        harvest_path, demand_path = simulation_csvs
+        arguments = {"harvest_csv_path": harvest_path, "demand_csv_path": demand_path}
+
+        _, first = await self.call_run_simulation(server, arguments)
+        os.remove(first["purchase_orders_path"])
+        _, second = await self.call_run_simulation(server, arguments)
+
+        assert second["cached"] is False
+        assert os.path.exists(second["purchase_orders_path"])
+
+    def test_cache_key_includes_engine_version(self, simulation_csvs, monkeypatch):
+        """Test a new engine version changes the cache key"""
+        harvest_path, demand_path = simulation_csvs
+        before = server_module.simulation_cache_key(harvest_path, demand_path, [2024], 3)
+        monkeypatch.setattr(server_module, "engine_fingerprint", lambda: "engine-changed")
+        after = server_module.simulation_cache_key(harvest_path, demand_path, [2024], 3)
+        assert before != after
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_missing_file(self, server):
+        """Test a missing input file is reported as a tool error"""
+        response, result = await self.call_run_simulation(server, {
+            "harvest_csv_path": "/invalid/harvest.csv",
+            "demand_csv_path": "/invalid/demand.csv"
+        })
+
+        assert response["result"]["isError"] is True
+        assert result["status"] == "error"
+
+
 class TestErrorHandling:
     """Test error handling"""
 
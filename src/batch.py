@@ -0,0 +1,233 @@
+"""
+Batch execution of many simulation runs from a JSON manifest.
+
+Inputs are loaded, validated and encoded once, then every run in the
+manifest is executed in the same process or on a worker pool. Each run
+writes into its own partition of a single output directory, keyed by
+run ID, alongside a runs.json index of all runs.
+
+Manifest format::
+
+    {
+        "harvest_data": "path/to/harvest.csv",     (optional, sample data if omitted)
+        "demand_data": "path/to/demand.csv",       (optional, sample data if omitted)
+        "output_dir": "batch_output",              (optional)
+        "precheck": "flag",                        (optional: "off", "flag" or "skip")
+        "defaults": {"simulation_years": [2021], "planning_lead_time": 3},
+        "runs": [
+            {"run_id": "lead_2", "planning_lead_time": 2},
+            {"run_id": "two_years", "simulation_years": [2021, 2022]},
+            {"run_id": "growth", "simulation_years": [2021, 2022],
+             "demand_growth_rates": {"Royal Gala": 0.24}}
+        ]
+    }
+
+Unless precheck is "off", every run first gets a prefix-sum feasibility
+check; its unavoidable shortfall is recorded in the run summary, and with
+"skip" infeasible runs are not simulated at all.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import PLANNING_LEAD_TIME, get_output_path
+from data_utils import load_csv_data, save_csv_data
+from feasibility import feasibility_check, summarize_feasibility
+from sample_data import load_sample_data
+from simulation_api import prepare_inputs, simulate, SimulationConfig
+
+# Prepared inputs shared by every run executed in this process
+_worker_inputs = None
+
+PRECHECK_MODES = ("off", "flag", "skip")
+
+
+def load_manifest(manifest_path):
+    """Load and validate a batch manifest.
+
+    Args:
+        manifest_path (str): Path to the JSON manifest
+
+    Returns:
+        dict: Manifest with every run resolved to its full parameters, or None if invalid
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        print(f"Error loading manifest {manifest_path}: {e}")
+        return None
+
+    runs = manifest.get('runs')
+    if not runs:
+        print(f"Error: manifest {manifest_path} contains no runs.")
+        return None
+
+    defaults = {'simulation_years': [2021], 'planning_lead_time': PLANNING_LEAD_TIME}
+    defaults.update(manifest.get('defaults', {}))
+
+    resolved = []
+    seen = set()
+    for index, run in enumerate(runs):
+        params = {**defaults, **run}
+        run_id = str(params.get('run_id', f"run_{index:04d}"))
+        if run_id in seen:
+            print(f"Error: duplicate run_id '{run_id}' in manifest.")
+            return None
+        seen.add(run_id)
+        params['run_id'] = run_id
+        resolved.append(params)
+
+    manifest['runs'] = resolved
+    return manifest
+
+
+def _init_worker(prepared):
+    """Install the prepared inputs in a worker process."""
+    global _worker_inputs
+    _worker_inputs = prepared
+
+
+def _execute_run(params, output_dir, precheck="flag"):
+    """Execute a single manifest run and write its partition.
+
+    Args:
+        params (dict): Resolved run parameters including run_id
+        output_dir (str): Root of the partitioned output
+        precheck (str): "off", "flag" to record the unavoidable shortfall, or
+                        "skip" to also skip infeasible runs
+
+    Returns:
+        dict: Run summary for the runs.json index
+    """
+    start = time.perf_counter()
+    summary = {
+        'run_id': params['run_id'],
+        'simulation_years': list(params['simulation_years']),
+        'planning_lead_time': params['planning_lead_time'],
+    }
+    try:
+        if precheck != "off":
+            feasibility = summarize_feasibility(feasibility_check(
+                _worker_inputs, params['simulation_years'], params['planning_lead_time'],
+                supply_growth_rates=params.get('supply_growth_rates'),
+                demand_growth_rates=params.get('demand_growth_rates'),
+                variety_lead_times=params.get('variety_lead_times')
+            ))
+            summary.update({
+                'feasible': feasibility['feasible'],
+                'unavoidable_shortfall': feasibility['unavoidable_shortfall'],
+            })
+            if precheck == "skip" and not feasibility['feasible']:
+                summary.update({'status': 'skipped', 'purchase_orders': 0,
+                                'infeasible_months': feasibility['infeasible_months']})
+                summary['wall_time_s'] = round(time.perf_counter() - start, 6)
+                return summary
+
+        config = SimulationConfig(simulation_years=tuple(params['simulation_years']),
+                                  planning_lead_time=params['planning_lead_time'],
+                                  supply_growth_rates=params.get('supply_growth_rates'),
+                                  demand_growth_rates=params.get('demand_growth_rates'),
+                                  sourcing_weights=params.get('sourcing_weights'),
+                                  variety_lead_times=params.get('variety_lead_times'))
+        result = simulate(None, None, config, prepared_inputs=_worker_inputs)
+        if result is None:
+            raise ValueError("simulation inputs are invalid")
+
+        partition_dir = os.path.join(output_dir, f"run_id={params['run_id']}")
+        po_path = os.path.join(partition_dir, "purchase_orders.csv")
+        if result.po_count:
+            save_csv_data(result.purchase_orders, po_path, f"Error saving run {params['run_id']}")
+
+        shortfalls = result.shortfalls
+        summary.update({
+            'status': 'success',
+            'purchase_orders': result.po_count,
+            'shortfalls': len(shortfalls),
+            'total_shortfall': float(shortfalls['Shortfall'].sum()) if not shortfalls.empty else 0.0,
+            'path': po_path if result.po_count else None,
+        })
+    except Exception as e:
+        summary.update({'status': 'error', 'message': str(e)})
+
+    summary['wall_time_s'] = round(time.perf_counter() - start, 6)
+    return summary
+
+
+def run_batch(manifest_path, workers=1, output_dir=None, precheck=None):
+    """Run every simulation in a manifest, loading and encoding the inputs once.
+
+    Args:
+        manifest_path (str): Path to the JSON manifest
+        workers (int): Number of worker processes; 1 runs everything in-process
+        output_dir (str, optional): Output directory, overrides the manifest value
+        precheck (str, optional): Feasibility pre-check mode, overrides the manifest
+                                  value (default "flag")
+
+    Returns:
+        list: Run summaries, or None if the batch could not start
+    """
+    global _worker_inputs
+
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        return None
+
+    harvest_path = manifest.get('harvest_data')
+    demand_path = manifest.get('demand_data')
+    if harvest_path and demand_path:
+        print(f"Loading data from {harvest_path} and {demand_path}")
+        df_harvest = load_csv_data(harvest_path, schema="Harvest_By_Supplier")
+        df_demand = load_csv_data(demand_path, schema="CustomerDemand")
+    else:
+        print("Using sample data for simulation")
+        df_harvest, df_demand = load_sample_data()
+
+    if df_harvest is None or df_demand is None:
+        print("Error loading required data. Exiting.")
+        return None
+
+    prepared = prepare_inputs(df_harvest, df_demand)
+    if prepared is None:
+        return None
+
+    precheck = precheck or manifest.get('precheck', "flag")
+    if precheck not in PRECHECK_MODES:
+        print(f"Error: unknown precheck mode '{precheck}', expected one of {PRECHECK_MODES}.")
+        return None
+
+    output_dir = output_dir or manifest.get('output_dir') or get_output_path("batch_output")
+    os.makedirs(output_dir, exist_ok=True)
+
+    runs = manifest['runs']
+    print(f"Running {len(runs)} simulations with {workers} worker(s) into {os.path.abspath(output_dir)}")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(prepared,)) as executor:
+            summaries = list(executor.map(_execute_run, runs, [output_dir] * len(runs),
+                                          [precheck] * len(runs)))
+    else:
+        _worker_inputs = prepared
+        summaries = [_execute_run(run, output_dir, precheck) for run in runs]
+
+    failed = [s for s in summaries if s['status'] == 'error']
+    skipped = [s for s in summaries if s['status'] == 'skipped']
+    flagged = [s for s in summaries if s['status'] == 'success' and s.get('feasible') is False]
+    for s in skipped:
+        print(f"Skipped infeasible run {s['run_id']}: unavoidable shortfall {s['unavoidable_shortfall']:.0f}")
+    for s in flagged:
+        print(f"WARNING: run {s['run_id']} is infeasible: unavoidable shortfall {s['unavoidable_shortfall']:.0f}")
+    for s in failed:
+        print(f"WARNING: run {s['run_id']} failed: {s['message']}")
+
+    index_path = os.path.join(output_dir, "runs.json")
+    with open(index_path, "w") as f:
+        json.dump({'manifest': os.path.abspath(manifest_path), 'runs': summaries}, f, indent=2)
+    print(f"Batch complete: {len(summaries) - len(failed) - len(skipped)} succeeded, {len(skipped)} skipped, "
+          f"{len(failed)} failed. "
+          f"Index written to: {os.path.abspath(index_path)}")
+
+    return summaries
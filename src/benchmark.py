@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+Scaling benchmarks for the supply chain simulation engine.
+
+This script generates synthetic harvest and demand inputs at controlled
+scales (suppliers, varieties, years), runs the engine on each and records
+wall time, peak traced memory and purchase orders per second. Results are
+written as JSON and compared against a previous baseline, including the
+empirical scaling exponent along each dimension, so algorithmic
+regressions show up as a change in growth rate rather than just noise.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, MONTH_MAP, VARIETY_MAP
+from simulation_api import simulate, SimulationConfig
+
+# Named scale presets: (suppliers, varieties, years)
+SCALE_PRESETS = {
+    "smoke": [(4, 5, 1)],
+    "small": [(4, 5, 1), (40, 5, 1), (40, 10, 1), (40, 10, 5)],
+    "medium": [(40, 10, 1), (400, 10, 1), (400, 20, 1), (400, 20, 5), (400, 20, 10)],
+    "large": [(400, 20, 10), (2000, 50, 10), (2000, 50, 25), (10000, 200, 10)],
+    "full": [(4, 5, 1), (100, 5, 1), (1000, 5, 1), (10000, 5, 1),
+             (100, 50, 1), (100, 200, 1), (100, 5, 10), (100, 5, 100)],
+}
+
+DEMAND_CUSTOMERS = [
+    ("Berlin", "EDEKA"), ("Berlin", "LIDL"), ("Berlin", "REWE"),
+    ("Hamburg", "EDEKA"), ("Hamburg", "LIDL"), ("Hamburg", "REWE"),
+    ("Munich", "EDEKA"), ("Munich", "LIDL"), ("Munich", "REWE"),
+]
+
+BENCHMARK_FORMAT_VERSION = 1
+
+
+def case_id(suppliers, varieties, years):
+    """Return the identifier used for a benchmark case in result files."""
+    return f"s{suppliers}_v{varieties}_y{years}"
+
+
+def generate_synthetic_inputs(num_suppliers, num_varieties, seed=0, demand_ratio=0.9):
+    """Generate synthetic harvest and demand data at a given scale.
+
+    The first five varieties are the standard ones from VARIETY_MAP; extra
+    varieties are named variety_006, variety_007, ... in both inputs.
+
+    Args:
+        num_suppliers (int): Number of suppliers
+        num_varieties (int): Number of apple varieties
+        seed (int): Random seed
+        demand_ratio (float): Total yearly demand as a fraction of total supply
+
+    Returns:
+        tuple: (harvest_data, demand_data) as DataFrames
+    """
+    if num_suppliers <= 0 or num_varieties <= 0:
+        raise ValueError("num_suppliers and num_varieties must be positive")
+    rng = np.random.default_rng(seed)
+
+    demand_columns = list(VARIETY_MAP.keys())
+    variety_names = list(VARIETY_MAP.values())
+    for i in range(len(demand_columns), num_varieties):
+        demand_columns.append(f"variety_{i + 1:03d}")
+        variety_names.append(f"variety_{i + 1:03d}")
+    variety_names = variety_names[:num_varieties]
+
+    countries = list(COUNTRY_PORT_MAP.keys())
+    month_names = list(MONTH_MAP.keys())
+    varieties_per_supplier = min(5, num_varieties)
+    months_per_lot = 3
+
+    # Each supplier grows a few varieties, each harvested over consecutive months
+    supplier_idx = np.repeat(np.arange(num_suppliers), varieties_per_supplier)
+    variety_idx = np.concatenate([
+        rng.choice(num_varieties, size=varieties_per_supplier, replace=False)
+        for _ in range(num_suppliers)
+    ])
+    start_month = rng.integers(0, 12, size=len(supplier_idx))
+    supplier_idx = np.repeat(supplier_idx, months_per_lot)
+    variety_idx = np.repeat(variety_idx, months_per_lot)
+    month_idx = (np.repeat(start_month, months_per_lot) + np.tile(np.arange(months_per_lot), len(start_month))) % 12
+
+    harvest = pd.DataFrame({
+        'SupplierID': [f"S{i + 1}" for i in supplier_idx],
+        'Country': [countries[i % len(countries)] for i in supplier_idx],
+        'Apple Variety': [variety_names[i] for i in variety_idx],
+        'Harvest Month': [month_names[i] for i in month_idx],
+        'Harvest Quantity': rng.integers(100, 1000, size=len(supplier_idx)),
+    })
+
+    # Spread demand over customers and months in proportion to supply per variety
+    supply_per_variety = np.bincount(variety_idx, weights=harvest['Harvest Quantity'].to_numpy(),
+                                     minlength=num_varieties)
+    rows = []
+    for city, customer in DEMAND_CUSTOMERS:
+        for month in month_names:
+            weights = rng.uniform(0.5, 1.5, size=len(demand_columns))
+            row = {'city': city, 'customer_id': customer, 'month': month}
+            for i, column in enumerate(demand_columns):
+                base = supply_per_variety[i] if i < num_varieties else 0.0
+                row[column] = int(base * demand_ratio * weights[i] / (12 * len(DEMAND_CUSTOMERS)))
+            row['total'] = sum(row[column] for column in demand_columns)
+            rows.append(row)
+    demand = pd.DataFrame(rows)
+
+    return harvest, demand
+
+
+def run_case(suppliers, varieties, years, repeat=1, measure_memory=True, seed=0):
+    """Run one benchmark case and return its measurements.
+
+    Args:
+        suppliers (int): Number of suppliers
+        varieties (int): Number of varieties
+        years (int): Number of simulated years
+        repeat (int): Number of timed runs; the fastest is reported
+        measure_memory (bool): Whether to do an extra traced run for peak memory
+        seed (int): Random seed for the synthetic inputs
+
+    Returns:
+        dict: Case measurements
+    """
+    df_harvest, df_demand = generate_synthetic_inputs(suppliers, varieties, seed=seed)
+    config = SimulationConfig(simulation_years=tuple(range(2021, 2021 + years)))
+
+    wall_times = []
+    result = None
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = simulate(df_harvest.copy(), df_demand.copy(), config)
+        wall_times.append(time.perf_counter() - start)
+    if result is None:
+        raise RuntimeError(f"Simulation failed for case {case_id(suppliers, varieties, years)}")
+
+    peak_memory_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        simulate(df_harvest.copy(), df_demand.copy(), config)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_memory_mb = round(peak / (1024 * 1024), 3)
+
+    wall_time = min(wall_times)
+    return {
+        "suppliers": suppliers,
+        "varieties": varieties,
+        "years": years,
+        "harvest_rows": len(df_harvest),
+        "wall_time_s": round(wall_time, 6),
+        "peak_memory_mb": peak_memory_mb,
+        "purchase_orders": result.po_count,
+        "pos_per_second": round(result.po_count / wall_time, 2) if wall_time > 0 else None,
+        "phases": {name: round(seconds, 6) for name, seconds in result.timings.items()},
+        "counters": result.counters,
+    }
+
+
+def scaling_exponents(cases):
+    """Estimate how wall time grows along each scale dimension.
+
+    For every pair of cases that differ in exactly one dimension, the
+    exponent k in time ~ size**k is log(t2 / t1) / log(n2 / n1). An
+    exponent near 1 is linear scaling, near 2 is quadratic.
+
+    Args:
+        cases (dict): Case measurements keyed by case ID
+
+    Returns:
+        dict: Exponents keyed by "<dimension>:<case_a>-><case_b>"
+    """
+    dimensions = ("suppliers", "varieties", "years")
+    exponents = {}
+    ordered = sorted(cases.items(), key=lambda item: tuple(item[1][d] for d in dimensions))
+    for (id_a, a), (id_b, b) in itertools.combinations(ordered, 2):
+        differing = [d for d in dimensions if a[d] != b[d]]
+        if len(differing) != 1:
+            continue
+        dim = differing[0]
+        if a["wall_time_s"] <= 0 or b["wall_time_s"] <= 0:
+            continue
+        exponent = math.log(b["wall_time_s"] / a["wall_time_s"]) / math.log(b[dim] / a[dim])
+        exponents[f"{dim}:{id_a}->{id_b}"] = round(exponent, 3)
+    return exponents
+
+
+def compare_to_baseline(current, baseline, time_tolerance=0.25, memory_tolerance=0.25,
+                        exponent_tolerance=0.3):
+    """Compare benchmark results against a previous baseline.
+
+    Args:
+        current (dict): Current benchmark results
+        baseline (dict): Baseline benchmark results
+        time_tolerance (float): Allowed relative wall-time increase
+        memory_tolerance (float): Allowed relative peak-memory increase
+        exponent_tolerance (float): Allowed absolute scaling-exponent increase
+
+    Returns:
+        list: Regression records; empty if nothing regressed
+    """
+    regressions = []
+    for cid, case in current["cases"].items():
+        base = baseline.get("cases", {}).get(cid)
+        if base is None:
+            continue
+        checks = [("wall_time_s", time_tolerance), ("peak_memory_mb", memory_tolerance)]
+        for metric, tolerance in checks:
+            now, before = case.get(metric), base.get(metric)
+            if now is None or not before:
+                continue
+            ratio = now / before
+            if ratio > 1 + tolerance:
+                regressions.append({"case": cid, "metric": metric, "baseline": before,
+                                    "current": now, "ratio": round(ratio, 3)})
+
+    for key, exponent in current.get("scaling_exponents", {}).items():
+        before = baseline.get("scaling_exponents", {}).get(key)
+        if before is not None and exponent - before > exponent_tolerance:
+            regressions.append({"case": key, "metric": "scaling_exponent", "baseline": before,
+                                "current": exponent, "ratio": round(exponent - before, 3)})
+    return regressions
+
+
+def run_benchmarks(scales, repeat=1, measure_memory=True, seed=0):
+    """Run all benchmark cases and return the results document.
+
+    Args:
+        scales (list): (suppliers, varieties, years) tuples
+        repeat (int): Timed runs per case
+        measure_memory (bool): Whether to record peak traced memory
+        seed (int): Random seed for the synthetic inputs
+
+    Returns:
+        dict: Benchmark results
+    """
+    # Warm up imports and pandas caches so the first case is not penalised
+    warmup_harvest, warmup_demand = generate_synthetic_inputs(4, 5, seed=seed)
+    simulate(warmup_harvest, warmup_demand)
+
+    cases = {}
+    for suppliers, varieties, years in scales:
+        cid = case_id(suppliers, varieties, years)
+        print(f"Running {cid} ...", end=" ", flush=True)
+        cases[cid] = run_case(suppliers, varieties, years, repeat, measure_memory, seed)
+        case = cases[cid]
+        print(f"{case['wall_time_s']:.3f}s, {case['purchase_orders']} POs, "
+              f"{case['pos_per_second']} POs/s, peak {case['peak_memory_mb']} MB")
+
+    return {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "cases": cases,
+        "scaling_exponents": scaling_exponents(cases),
+    }
+
+
+def main():
+    """Command-line entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark the supply chain simulation engine")
+
+    parser.add_argument("--preset", choices=sorted(SCALE_PRESETS), default="small",
+                      help="Named set of scales to run (default: small)")
+
+    parser.add_argument("--suppliers", nargs="+", type=int,
+                      help="Supplier counts; with --varieties and --years runs the full grid instead of a preset")
+
+    parser.add_argument("--varieties", nargs="+", type=int, default=[5],
+                      help="Variety counts for a custom grid (default: 5)")
+
+    parser.add_argument("--years", nargs="+", type=int, default=[1],
+                      help="Simulated year counts for a custom grid (default: 1)")
+
+    parser.add_argument("--repeat", type=int, default=1,
+                      help="Timed runs per case; the fastest is recorded (default: 1)")
+
+    parser.add_argument("--no-memory", action="store_true",
+                      help="Skip the traced run used to measure peak memory")
+
+    parser.add_argument("--seed", type=int, default=0,
+                      help="Random seed for synthetic inputs (default: 0)")
+
+    parser.add_argument("--output", type=str, default="benchmark_results.json",
+                      help="Where to write this run's results (default: benchmark_results.json)")
+
+    parser.add_argument("--baseline", type=str,
+                      help="Baseline results file to compare against (optional)")
+
+    parser.add_argument("--update-baseline", action="store_true",
+                      help="Overwrite the baseline file with this run's results")
+
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                      help="Allowed relative slowdown or memory growth before flagging (default: 0.25)")
+
+    parser.add_argument("--fail-on-regression", action="store_true",
+                      help="Exit with status 1 if any regression is found")
+
+    args = parser.parse_args()
+
+    if args.suppliers:
+        scales = list(itertools.product(args.suppliers, args.varieties, args.years))
+    else:
+        scales = SCALE_PRESETS[args.preset]
+
+    results = run_benchmarks(scales, args.repeat, not args.no_memory, args.seed)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results saved to: {os.path.abspath(args.output)}")
+
+    if results["scaling_exponents"]:
+        print("\nScaling exponents (time ~ size**k):")
+        for key, exponent in results["scaling_exponents"].items():
+            print(f"  {key}: {exponent}")
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.tolerance)
+        if regressions:
+            print(f"\nWARNING: {len(regressions)} regression(s) against {args.baseline}:")
+            for r in regressions:
+                print(f"  {r['case']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['ratio']})")
+        else:
+            print(f"\nNo regressions against {args.baseline}.")
+    elif args.baseline:
+        print(f"\nBaseline {args.baseline} does not exist yet; nothing to compare.")
+
+    if args.baseline and (args.update_baseline or not os.path.exists(args.baseline)):
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to: {os.path.abspath(args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
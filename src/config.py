@@ -35,6 +35,15 @@ INV_MONTH_MAP = {v: k for k, v in MONTH_MAP.items()}
 # Planning lead time in months
 PLANNING_LEAD_TIME = 3
 
+# Annual growth rate per apple variety (from tonnage.txt)
+VARIETY_GROWTH_RATES = {
+    'Royal Gala': 0.24,
+    'Granny Smith': 0.18,
+    'Golden Delicious': 0.16,
+    'Pink Lady': 0.14,
+    'Fuji': 0.12
+}
+
 # Supplier port mapping
 COUNTRY_PORT_MAP = {
     'India': 'Jawaharlal Nehru Port Sheva Navi Mumbai',
@@ -43,6 +52,19 @@ COUNTRY_PORT_MAP = {
     'New Zealand': 'Ports of Auckland'
 }
 
+# Unloading capacity available to our shipments at Rotterdam (see port_queue.daily_capacity)
+PORT_CAPACITY = {
+    'berths': 2,
+    'berth_tons_per_day': 400,
+    'reefer_plugs': 120,
+    'dwell_days': 3,
+    'tons_per_container': 20
+}
+
+# CO2 emissions (kg) per metric ton-kilometre of sea freight, as in data/delivery.csv;
+# used by simulation.sourcing_attributes when there is no delivery history
+CO2_PER_TON_KM = 8.4e-06
+
 # Shipping port coordinates (latitude, longitude)
 PORT_COORDINATES = {
     'Jawaharlal Nehru Port Sheva Navi Mumbai': (18.9397, 72.9153),
@@ -94,6 +116,14 @@ WAYPOINTS = {
     ]
 }
 
+# Origin port -> route in WAYPOINTS used to compute its distance to Rotterdam
+PORT_ROUTE_MAP = {
+    'Jawaharlal Nehru Port Sheva Navi Mumbai': 'Mumbai',
+    'Port of Cape Town': 'Cape Town',
+    'Port of San Antonio': 'San Antonio',
+    'Ports of Auckland': 'Auckland'
+}
+
 # Default data paths
 DATA_DIR = "data"
 
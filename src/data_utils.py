@@ -10,14 +10,29 @@ import pandas as pd
 from io import StringIO
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from pandas.api.types import union_categoricals
 
-def load_csv_data(file_path, error_message=None):
+from schemas import get_schema
+
+def load_csv_data(file_path, error_message=None, schema=None, usecols=None, dtype=None,
+                  chunksize=None, parse_dates=False):
     """Load data from a CSV file with error handling.
-    
+
+    Without a schema the file is read with pandas type inference. With a
+    schema from the registry, headers are mapped to canonical column names
+    and every known column is parsed with its declared dtype, so nothing
+    is inferred. With chunksize the file is parsed chunk by chunk, so only
+    one chunk of raw text is held while parsing.
+
     Args:
         file_path (str): Path to the CSV file
         error_message (str, optional): Custom error message if loading fails
-        
+        schema (str or Schema, optional): Dataset schema, e.g. "Harvest_By_Supplier"
+        usecols (list, optional): Canonical names of the columns to load
+        dtype (dict, optional): Dtypes by canonical column name, overriding the schema
+        chunksize (int, optional): Rows parsed per chunk
+        parse_dates (bool): Convert the schema's date columns to datetimes
+
     Returns:
         pandas.DataFrame: Loaded data or None if loading fails
     """
@@ -25,9 +40,12 @@ def load_csv_data(file_path, error_message=None):
         if not os.path.exists(file_path):
             print(f"Warning: File {file_path} does not exist.")
             return None
-            
-        df = pd.read_csv(file_path)
-        return df
+
+        if schema is None and usecols is None and dtype is None and chunksize is None:
+            return pd.read_csv(file_path)
+
+        chunks = list(iter_csv_data(file_path, schema, usecols, dtype, chunksize, parse_dates))
+        return _concat_chunks(chunks)
     except Exception as e:
         if error_message:
             print(f"{error_message}: {e}")
@@ -35,6 +53,53 @@ def load_csv_data(file_path, error_message=None):
             print(f"Error loading {file_path}: {e}")
         return None
 
+def iter_csv_data(file_path, schema=None, usecols=None, dtype=None, chunksize=None, parse_dates=False):
+    """Parse a CSV file with declared dtypes, yielding one DataFrame per chunk.
+
+    Args:
+        file_path (str): Path to the CSV file
+        schema (str or Schema, optional): Dataset schema from the registry
+        usecols (list, optional): Canonical names of the columns to load
+        dtype (dict, optional): Dtypes by canonical column name, overriding the schema
+        chunksize (int, optional): Rows per chunk; the whole file is one chunk if omitted
+        parse_dates (bool): Convert the schema's date columns to datetimes
+
+    Yields:
+        pandas.DataFrame: Chunks with canonical column names
+    """
+    schema = get_schema(schema) if isinstance(schema, str) else schema
+    header = list(pd.read_csv(file_path, nrows=0).columns)
+    rename = schema.resolve(header) if schema is not None else {}
+    file_columns = {canonical: column for column, canonical in rename.items()}
+
+    declared = dict(schema.columns) if schema is not None else {}
+    declared.update(dtype or {})
+    columns = header if usecols is None else [file_columns.get(c, c) for c in usecols]
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"columns not found: {missing}")
+    read_dtypes = {column: declared[rename.get(column, column)]
+                   for column in columns if rename.get(column, column) in declared}
+
+    reader = pd.read_csv(file_path, usecols=columns, dtype=read_dtypes, chunksize=chunksize)
+    for chunk in ([reader] if chunksize is None else reader):
+        chunk = chunk.rename(columns=rename)
+        if parse_dates and schema is not None:
+            for column, date_format in schema.dates.items():
+                if column in chunk.columns:
+                    chunk[column] = pd.to_datetime(chunk[column], format=date_format, errors='coerce')
+        yield chunk
+
+def _concat_chunks(chunks):
+    """Concatenate parsed chunks, merging the categories of categorical columns."""
+    if len(chunks) == 1:
+        return chunks[0]
+    frame = pd.concat(chunks, ignore_index=True)
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype) and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = union_categoricals([chunk[column] for chunk in chunks])
+    return frame
+
 def save_csv_data(df, file_path, error_message=None):
     """Save DataFrame to a CSV file with error handling.
     
@@ -60,6 +125,124 @@ def save_csv_data(df, file_path, error_message=None):
             print(f"Error saving data to {file_path}: {e}")
         return False
 
+# File extension per output format
+TABLE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+def table_filename(filename, file_format="csv"):
+    """Return filename with the extension of an output format.
+
+    Args:
+        filename (str): Output filename, e.g. "simulated_purchase_orders.csv"
+        file_format (str): "csv", "parquet" or "arrow"
+
+    Returns:
+        str: Filename with the format's extension
+    """
+    if file_format not in TABLE_EXTENSIONS:
+        raise ValueError(f"Unknown output format '{file_format}', expected one of {sorted(TABLE_EXTENSIONS)}")
+    return os.path.splitext(filename)[0] + TABLE_EXTENSIONS[file_format]
+
+def save_table(df, file_path, file_format="csv", compression="zstd", partition_cols=None, error_message=None):
+    """Save a DataFrame as CSV, Parquet or Arrow IPC with error handling.
+
+    Parquet and Arrow need pyarrow. With partition_cols the table is written
+    as a hive-partitioned directory (column=value/...), so readers can load
+    only the partitions they need; columnar files also let them read only
+    the columns they need.
+
+    Args:
+        df (pandas.DataFrame): DataFrame to save
+        file_path (str): Output file, or directory when partitioning
+        file_format (str): "csv", "parquet" or "arrow"
+        compression (str, optional): Codec for Parquet/Arrow ("zstd", "lz4", "snappy" for Parquet), None for none
+        partition_cols (list, optional): Columns to partition Parquet/Arrow output by
+        error_message (str, optional): Custom error message if saving fails
+
+    Returns:
+        bool: True if saving was successful, False otherwise
+    """
+    if file_format == "csv":
+        if partition_cols:
+            print("Warning: CSV output is not partitioned; writing a single file.")
+        return save_csv_data(df, file_path, error_message)
+
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        print(f"Error: {file_format} output requires pyarrow (pip install pyarrow); use CSV output instead.")
+        return False
+
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if file_format == "parquet":
+            write_format = ds.ParquetFileFormat()
+            options = write_format.make_write_options(compression=compression or "none")
+        elif file_format == "arrow":
+            write_format = ds.IpcFileFormat()
+            options = write_format.make_write_options(
+                compression=pa.Codec(compression) if compression else None
+            )
+        else:
+            raise ValueError(f"Unknown output format '{file_format}'")
+
+        if partition_cols:
+            ds.write_dataset(table, file_path, format=write_format, file_options=options,
+                             partitioning=list(partition_cols), partitioning_flavor="hive",
+                             existing_data_behavior="delete_matching")
+        elif file_format == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, file_path, compression=compression or "none")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, file_path, compression=compression or "uncompressed")
+        print(f"Data successfully saved to: {os.path.abspath(file_path)}")
+        return True
+    except Exception as e:
+        if error_message:
+            print(f"{error_message}: {e}")
+        else:
+            print(f"Error saving data to {file_path}: {e}")
+        return False
+
+def load_table(file_path, columns=None, filters=None, error_message=None):
+    """Load a CSV, Parquet or Arrow table, reading only the columns and partitions needed.
+
+    Args:
+        file_path (str): File or partitioned directory written by save_table
+        columns (list, optional): Columns to read, all if omitted
+        filters (dict, optional): Column -> value or list of values; on partition
+                                  columns only the matching partitions are read
+        error_message (str, optional): Custom error message if loading fails
+
+    Returns:
+        pandas.DataFrame: Loaded data or None if loading fails
+    """
+    try:
+        if file_path.endswith(TABLE_EXTENSIONS['csv']):
+            df = pd.read_csv(file_path, usecols=columns)
+            for column, value in (filters or {}).items():
+                df = df[df[column].isin(value if isinstance(value, (list, tuple, set)) else [value])]
+            return df.reset_index(drop=True)
+
+        import pyarrow.dataset as ds
+        file_format = "ipc" if file_path.rstrip("/").endswith(TABLE_EXTENSIONS['arrow']) else "parquet"
+        dataset = ds.dataset(file_path, format=file_format,
+                             partitioning="hive" if os.path.isdir(file_path) else None)
+        expression = None
+        for column, value in (filters or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            condition = ds.field(column).isin(values)
+            expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+    except Exception as e:
+        if error_message:
+            print(f"{error_message}: {e}")
+        else:
+            print(f"Error loading {file_path}: {e}")
+        return None
+
 def validate_dataframe(df, required_columns, name="DataFrame"):
     """Validate that a DataFrame contains required columns and is not empty.
     
@@ -0,0 +1,288 @@
+"""
+Historical delivery delay model.
+
+Delays (actual minus expected delivery date, in days) are fitted from
+delivery history per supplier and per route. Most deliveries arrive on
+time and a few are late by a wide margin, so each group is modelled as a
+hurdle: the probability that a delivery is late, and a lognormal for the
+size of the delay when it is. Only sufficient statistics are kept per
+group (counts, sum and sum of squares of the log delay), so appending
+deliveries refits by adding the statistics of the new rows. Groups with
+few late deliveries fall back to their route and then to all deliveries.
+Fitted statistics can be cached in a JSON file chosen by the caller.
+"""
+
+import hashlib
+import json
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, DATA_DIR
+from port_queue import daily_capacity, queue_delays
+
+DELIVERY_DATE_FORMAT = "%d/%m/%y"
+DESTINATION = "Rotterdam"
+STAT_FIELDS = ("n", "late", "log_sum", "log_sq_sum", "delay_sum")
+
+
+def route_name(country):
+    """Return the shipping route name for a supplier country."""
+    return f"{COUNTRY_PORT_MAP.get(country, country)} -> {DESTINATION}"
+
+
+def delivery_statistics(df_delivery):
+    """Compute per-supplier and per-route sufficient statistics in one vectorized pass.
+
+    Args:
+        df_delivery (pandas.DataFrame): Delivery history with SupplierID, Country,
+                                        ExpectedDeliveryDate and ActualDeliveryDate
+
+    Returns:
+        dict: {"supplier": {id: stats}, "route": {name: stats}, "all": stats}
+    """
+    expected = pd.to_datetime(df_delivery['ExpectedDeliveryDate'], format=DELIVERY_DATE_FORMAT, errors='coerce')
+    actual = pd.to_datetime(df_delivery['ActualDeliveryDate'], format=DELIVERY_DATE_FORMAT, errors='coerce')
+    delay = (actual - expected).dt.days
+    valid = delay.notna()
+
+    late = (delay > 0) & valid
+    log_delay = np.log(delay.where(late, 1).astype(float))
+    frame = pd.DataFrame({
+        'supplier': df_delivery['SupplierID'].astype(str),
+        'route': df_delivery['Country'].map(route_name),
+        'n': valid.astype(np.int64),
+        'late': late.astype(np.int64),
+        'log_sum': log_delay.where(late, 0.0),
+        'log_sq_sum': (log_delay ** 2).where(late, 0.0),
+        'delay_sum': delay.clip(lower=0).where(valid, 0.0),
+    })
+
+    fields = list(STAT_FIELDS)
+    return {
+        'supplier': frame.groupby('supplier')[fields].sum().to_dict(orient='index'),
+        'route': frame.groupby('route')[fields].sum().to_dict(orient='index'),
+        'all': frame[fields].sum().to_dict(),
+    }
+
+
+def _merge_stats(left, right):
+    """Add two sets of sufficient statistics."""
+    return {field: float(left.get(field, 0)) + float(right.get(field, 0)) for field in STAT_FIELDS}
+
+
+class DelayModel:
+    """Per-supplier and per-route hurdle-lognormal delivery delay model.
+
+    Args:
+        stats (dict, optional): Sufficient statistics from delivery_statistics
+        min_late (int): Late deliveries a group needs before its own delay
+                        distribution is used instead of its parent's
+        prior_weight (float): Pseudo-deliveries pulling a group's late
+                              probability towards its parent's
+    """
+
+    def __init__(self, stats=None, min_late=3, prior_weight=5.0):
+        self.stats = stats or {'supplier': {}, 'route': {}, 'all': {}}
+        self.min_late = min_late
+        self.prior_weight = prior_weight
+        self.source = {}
+        self._params = None
+
+    def update(self, df_delivery):
+        """Add deliveries to the model without revisiting earlier ones.
+
+        Args:
+            df_delivery (pandas.DataFrame): New delivery rows
+        """
+        new = delivery_statistics(df_delivery)
+        for level in ('supplier', 'route'):
+            for key, values in new[level].items():
+                self.stats[level][key] = _merge_stats(self.stats[level].get(key, {}), values)
+        self.stats['all'] = _merge_stats(self.stats['all'], new['all'])
+        self._params = None
+
+    def _fit(self, stats, parent=None):
+        """Turn sufficient statistics into (late probability, log mean, log std)."""
+        n, late = stats.get('n', 0), stats.get('late', 0)
+        if parent is None:
+            p_late = late / n if n else 0.0
+        else:
+            p_late = (late + self.prior_weight * parent[0]) / (n + self.prior_weight)
+
+        if late >= self.min_late or parent is None:
+            mu = stats['log_sum'] / late if late else 0.0
+            var = stats['log_sq_sum'] / late - mu ** 2 if late else 0.0
+            return p_late, mu, float(np.sqrt(max(var, 0.0)))
+        return p_late, parent[1], parent[2]
+
+    def params(self):
+        """Return fitted parameters per supplier and route.
+
+        Returns:
+            dict: {"supplier": {id: (p_late, mu, sigma)}, "route": {...}, "all": (p_late, mu, sigma)}
+        """
+        if self._params is None:
+            overall = self._fit(self.stats['all'])
+            routes = {name: self._fit(s, overall) for name, s in self.stats['route'].items()}
+            self._params = {'all': overall, 'route': routes, 'supplier': {}}
+            # Suppliers are pooled towards the route they ship on, falling back to all deliveries
+            supplier_routes = self.source.get('supplier_routes', {})
+            for supplier, s in self.stats['supplier'].items():
+                parent = routes.get(supplier_routes.get(supplier), overall)
+                self._params['supplier'][supplier] = self._fit(s, parent)
+        return self._params
+
+    def sample(self, supplier_ids, countries=None, rng=None, size=None):
+        """Sample delivery delays in days for many orders at once.
+
+        Each order uses its supplier's distribution, then its route's, then
+        the overall one, whichever is fitted first.
+
+        Args:
+            supplier_ids (array-like): Supplier of each order
+            countries (array-like, optional): Supplier country of each order
+            rng (numpy.random.Generator, optional): Random generator
+            size (int, optional): Number of scenarios; adds a leading axis
+
+        Returns:
+            numpy.ndarray: Integer delays, shape (orders,) or (size, orders)
+        """
+        rng = rng or np.random.default_rng()
+        params = self.params()
+        supplier_ids = np.asarray(supplier_ids, dtype=object)
+        routes = (np.array([route_name(c) for c in countries], dtype=object)
+                  if countries is not None else np.full(len(supplier_ids), None, dtype=object))
+
+        table = np.array([
+            params['supplier'].get(s) or params['route'].get(r) or params['all']
+            for s, r in zip(supplier_ids, routes)
+        ], dtype=np.float64).reshape(-1, 3)
+        shape = (len(supplier_ids),) if size is None else (size, len(supplier_ids))
+
+        is_late = rng.random(shape) < table[:, 0]
+        delays = np.exp(table[:, 1] + table[:, 2] * rng.standard_normal(shape))
+        return np.where(is_late, np.maximum(np.rint(delays), 1), 0).astype(np.int64)
+
+    def summary(self):
+        """Return the fitted parameters as a DataFrame, one row per supplier and route.
+
+        Returns:
+            pandas.DataFrame: Level, key, deliveries, late share, mean delay and fitted parameters
+        """
+        params = self.params()
+        rows = []
+        for level in ('supplier', 'route'):
+            for key, stats in self.stats[level].items():
+                p_late, mu, sigma = params[level][key]
+                rows.append({
+                    'Level': level,
+                    'Key': key,
+                    'Deliveries': int(stats['n']),
+                    'LateDeliveries': int(stats['late']),
+                    'MeanDelayDays': stats['delay_sum'] / stats['n'] if stats['n'] else 0.0,
+                    'LateProbability': p_late,
+                    'LogMean': mu,
+                    'LogStd': sigma,
+                })
+        return pd.DataFrame(rows)
+
+
+def _file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fit_delay_model(delivery_path=None, cache_path=None, refit=False):
+    """Fit the delay model from delivery history, reusing cached statistics.
+
+    Without a cache path the model is fitted from all rows and nothing is
+    written. The cache records how many bytes of the delivery file it has consumed
+    and their digest. If the file still starts with those bytes, only the
+    appended rows are parsed and added; otherwise the model is refitted
+    from scratch.
+
+    Args:
+        delivery_path (str, optional): Delivery CSV, defaults to data/delivery.csv
+        cache_path (str, optional): Parameter cache file, none if omitted
+        refit (bool): Ignore the cache and fit from all rows
+
+    Returns:
+        DelayModel: Fitted model, or None if the delivery data cannot be read
+    """
+    delivery_path = delivery_path or os.path.join(DATA_DIR, "delivery.csv")
+    try:
+        with open(delivery_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Error loading delivery history {delivery_path}: {e}")
+        return None
+
+    model = DelayModel()
+    offset = 0
+    if cache_path and not refit and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            consumed = cached['bytes_consumed']
+            if len(data) >= consumed and _file_digest(data[:consumed]) == cached['digest']:
+                model.stats = cached['stats']
+                model.source = cached.get('source', {})
+                offset = consumed
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring unreadable delay model cache {cache_path}: {e}")
+
+    # Only parse complete lines past the consumed offset
+    end = data.rfind(b"\n") + 1 if not data.endswith(b"\n") else len(data)
+    end = max(end, offset)
+    if end > offset:
+        header_end = data.find(b"\n") + 1
+        chunk = data[offset:end] if offset == 0 else data[:header_end] + data[offset:end]
+        new_rows = pd.read_csv(BytesIO(chunk))
+        if not new_rows.empty:
+            model.update(new_rows)
+            routes = model.source.setdefault('supplier_routes', {})
+            for supplier, country in new_rows[['SupplierID', 'Country']].drop_duplicates().itertuples(index=False):
+                routes[str(supplier)] = route_name(country)
+            model._params = None
+
+    if cache_path and (end != offset or not os.path.exists(cache_path)):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump({'bytes_consumed': end, 'digest': _file_digest(data[:end]),
+                           'stats': model.stats, 'source': model.source}, f, indent=2)
+        except OSError as e:
+            print(f"Warning: could not write delay model cache {cache_path}: {e}")
+
+    return model
+
+
+def arrival_scenarios(po_df, model, runs=1000, seed=None, port_capacity=None):
+    """Monte Carlo arrival delays for a purchase order table.
+
+    Args:
+        po_df (pandas.DataFrame): Purchase orders with SupplierID, Country and ExpectedArrivalDate
+        model (DelayModel): Fitted delay model
+        runs (int): Number of scenarios
+        seed (int, optional): Random seed
+        port_capacity (dict, optional): Rotterdam unloading capacity; when given, each scenario's
+                                        arrivals also queue for berths and reefer plugs
+
+    Returns:
+        pandas.DataFrame: Per-PO mean, P90 and maximum delay and probability of any delay
+    """
+    delays = model.sample(po_df['SupplierID'], po_df['Country'], np.random.default_rng(seed), size=runs)
+    if port_capacity is not None:
+        planned = (pd.to_datetime(po_df['ExpectedArrivalDate']).to_numpy().astype('datetime64[D]')
+                   - np.datetime64('1970-01-01', 'D')).astype(np.int64)
+        delays = delays + queue_delays(planned + delays, po_df['QuantityOrdered'].to_numpy(),
+                                       daily_capacity(**port_capacity))
+    return pd.DataFrame({
+        'PO_ID': po_df['PO_ID'].to_numpy(),
+        'MeanDelayDays': delays.mean(axis=0),
+        'P90DelayDays': np.percentile(delays, 90, axis=0),
+        'MaxDelayDays': delays.max(axis=0),
+        'ProbabilityDelayed': (delays > 0).mean(axis=0),
+    })
@@ -0,0 +1,126 @@
+"""
+Supply and demand feasibility pre-check.
+
+The planning loop fills each month's demand from any harvest already
+available, and stock never expires, so the cumulative shortfall after
+planning month t is fixed by the totals alone:
+
+    U_t = max(0, max_{k<=t} (CumDemand_k - CumSupply_k))
+
+where CumSupply_k is all harvest available by planning month k and
+CumDemand_k the lead-time-shifted demand planned up to month k. Both are
+prefix sums over the projection cube, so the whole check is linear in
+the number of months and varieties and costs a fraction of a simulation.
+The increase of U_t in a month is the shortfall the engine will report
+for it, so infeasible scenarios can be skipped or flagged before they run.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from config import PLANNING_LEAD_TIME
+from projection import build_projection
+
+# Shortfalls below this many tons are rounding noise
+TOLERANCE = 1e-9
+
+
+def feasibility_check(prepared_inputs, simulation_years=(2021,), planning_lead_time=None,
+                      supply_growth_rates=None, demand_growth_rates=None, base_year=None,
+                      horizon_months=None, variety_lead_times=None):
+    """Compute the unavoidable shortfall of every planning month and variety.
+
+    Takes the same scenario parameters as simulate_purchase_orders.
+
+    Args:
+        prepared_inputs (dict): Output of prepare_simulation_inputs
+        simulation_years (list): Years to simulate
+        planning_lead_time (int, optional): Planning lead time in months, defaults to config value
+        supply_growth_rates (dict, optional): Annual harvest growth rate per variety
+        demand_growth_rates (dict, optional): Annual demand growth rate per variety
+        base_year (int, optional): Year in which the input quantities apply unscaled
+        horizon_months (int, optional): Only check the first horizon_months planning months
+        variety_lead_times (dict, optional): Planning lead time in months per variety
+
+    Returns:
+        pandas.DataFrame: One row per planning month and variety with demand, cumulative
+                          demand and supply, cumulative unavoidable shortfall and the
+                          shortfall arising in that month
+    """
+    planning_lead_time = planning_lead_time or PLANNING_LEAD_TIME
+    simulation_years = list(simulation_years)
+    max_lead_time = max([planning_lead_time, *(variety_lead_times or {}).values()])
+    last_target_year = (datetime(max(simulation_years), 12, 1) + relativedelta(months=max_lead_time)).year
+    projection = build_projection(
+        prepared_inputs['harvest'],
+        prepared_inputs['demand_melted'],
+        [min(simulation_years), last_target_year],
+        supply_growth_rates=supply_growth_rates,
+        demand_growth_rates=demand_growth_rates,
+        base_year=base_year if base_year is not None else simulation_years[0]
+    )
+    varieties = projection.varieties
+    first_year = int(projection.years[0])
+
+    # Planning months in engine order, as absolute month numbers
+    years = np.repeat(np.asarray(simulation_years, dtype=np.int64), 12)
+    months = np.tile(np.arange(12, dtype=np.int64), len(simulation_years))
+    if horizon_months is not None:
+        years, months = years[:horizon_months], months[:horizon_months]
+
+    # Supply available by each planning month: prefix sum over the pool years' harvest calendar
+    pool_years = np.asarray(sorted(set(simulation_years)), dtype=np.int64)
+    pool_supply = projection.supply[pool_years - first_year].reshape(-1, len(varieties))
+    cum_supply_calendar = np.cumsum(pool_supply, axis=0)
+    cum_supply = cum_supply_calendar[np.searchsorted(pool_years, years) * 12 + months]
+
+    # Demand targeted by each planning month, shifted by each variety's lead time
+    leads = np.array([(variety_lead_times or {}).get(v, planning_lead_time) for v in varieties], dtype=np.int64)
+    target = (years - first_year)[:, np.newaxis] * 12 + months[:, np.newaxis] + leads[np.newaxis, :]
+    in_range = target < len(projection.years) * 12
+    flat_demand = projection.demand_totals.reshape(-1, len(varieties))
+    variety_axis = np.broadcast_to(np.arange(len(varieties)), target.shape)
+    demand = np.where(in_range, flat_demand[np.minimum(target, len(flat_demand) - 1), variety_axis], 0)
+    demand = np.maximum(demand, 0)
+
+    cum_demand = np.cumsum(demand, axis=0)
+    cum_shortfall = np.maximum.accumulate(np.maximum(cum_demand - cum_supply, 0), axis=0)
+    shortfall = np.diff(cum_shortfall, axis=0, prepend=0)
+
+    target_year = first_year + target // 12
+    target_month = target % 12 + 1
+    count = len(years)
+    return pd.DataFrame({
+        'PlanningMonth': np.repeat([f"{y}-{m + 1:02d}" for y, m in zip(years, months)], len(varieties)),
+        'AppleVariety': np.tile(np.asarray(varieties, dtype=object), count),
+        'DemandMonthTarget': [f"{y}-{m:02d}" for y, m in zip(target_year.ravel(), target_month.ravel())],
+        'DemandQuantity': demand.ravel(),
+        'CumulativeDemand': cum_demand.ravel(),
+        'CumulativeSupply': cum_supply.ravel(),
+        'CumulativeShortfall': cum_shortfall.ravel(),
+        'Shortfall': shortfall.ravel(),
+    })
+
+
+def summarize_feasibility(report):
+    """Summarise a feasibility report.
+
+    Args:
+        report (pandas.DataFrame): Output of feasibility_check
+
+    Returns:
+        dict: Whether the scenario is feasible, its unavoidable shortfall in total and per
+              variety, and the infeasible (planning month, variety) pairs
+    """
+    infeasible = report[report['Shortfall'] > TOLERANCE]
+    by_variety = infeasible.groupby('AppleVariety')['Shortfall'].sum()
+    return {
+        'feasible': infeasible.empty,
+        'unavoidable_shortfall': float(infeasible['Shortfall'].sum()),
+        'shortfall_by_variety': {v: float(q) for v, q in by_variety.items()},
+        'infeasible_months': [f"{month} {variety}" for month, variety in
+                              zip(infeasible['PlanningMonth'], infeasible['AppleVariety'])],
+    }
@@ -0,0 +1,238 @@
+"""
+Binary cache of parsed simulation inputs.
+
+Parsing the harvest and demand CSVs (or the embedded sample strings) is
+repeated on every run although the sources rarely change. The cache
+stores each parsed, typed table as one .npy file per column in a
+directory keyed by a hash of the source bytes and the schema it was
+parsed with (its columns, dtypes, date formats and aliases). Numeric columns are stored as they are; categorical and
+string columns as integer codes plus their categories. A warm start
+hashes the source, memory-maps the column files and rebuilds the frame
+without parsing any CSV text.
+
+Layout::
+
+    <cache_dir>/<key>/meta.json      columns, dtypes and categories
+    <cache_dir>/<key>/<n>.npy        values or codes of the n-th column
+    <cache_dir>/<key>/<n>.values.npy distinct values of a string column
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from data_utils import load_csv_data, load_from_string
+from schemas import get_schema
+
+# Bump when the stored layout changes so old entries are ignored
+CACHE_VERSION = "1"
+META_FILE = "meta.json"
+
+
+def schema_spec(schema):
+    """Serialise everything about a schema that affects parsing.
+
+    repr keeps the categories of categorical dtypes, so editing a category
+    list, a dtype, a date format or an alias changes the spec.
+
+    Args:
+        schema (str or Schema, optional): Dataset schema
+
+    Returns:
+        str: JSON spec, empty for schema-less parsing
+    """
+    if schema is None:
+        return ""
+    schema = get_schema(schema) if isinstance(schema, str) else schema
+    return json.dumps({'name': schema.name,
+                       'columns': {column: repr(dtype) for column, dtype in schema.columns.items()},
+                       'dates': schema.dates, 'aliases': schema.aliases}, sort_keys=True)
+
+
+def source_key(data, schema=None):
+    """Build the cache key of an input source.
+
+    Args:
+        data (bytes or str): Raw content of the source
+        schema (str or Schema, optional): Schema the source is parsed with
+
+    Returns:
+        str: Hex cache key
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_VERSION}:{schema_spec(schema)}:".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _encode_column(series):
+    """Split a column into a storable array and the metadata needed to rebuild it.
+
+    Returns:
+        tuple: (values or codes, column metadata, distinct values of a string column or None)
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), {
+            'kind': 'categorical', 'categories': dtype.categories.tolist(),
+            'categories_dtype': str(dtype.categories.dtype), 'ordered': bool(dtype.ordered),
+        }, None
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return series.to_numpy().view(np.int64), {'kind': 'datetime', 'dtype': str(dtype)}, None
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return series.to_numpy(), {'kind': 'numeric'}, None
+    # Strings: codes into the distinct values, -1 for missing
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(np.int32), {'kind': 'factorized', 'dtype': str(dtype)}, np.asarray(uniques, dtype=str)
+
+
+def _decode_column(values, meta, uniques=None):
+    """Rebuild a column from its stored array, metadata and distinct values."""
+    kind = meta['kind']
+    if kind == 'numeric':
+        return values
+    if kind == 'datetime':
+        return values.view(meta['dtype'])
+    if kind == 'categorical':
+        categories = pd.Index(meta['categories'], dtype=meta['categories_dtype'])
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories, meta['ordered']))
+    column = pd.Index(uniques.astype(object), dtype=meta['dtype']).take(values, allow_fill=True, fill_value=np.nan)
+    # A Series pins the dtype; DataFrame would infer str for object columns
+    return pd.Series(column, dtype=meta['dtype'], copy=False)
+
+
+class InputCache:
+    """Directory of parsed input tables stored as memory-mappable column files.
+
+    Args:
+        cache_dir (str): Directory holding one subdirectory per cached table
+        mmap (bool): Memory-map numeric columns instead of reading them into memory
+    """
+
+    def __init__(self, cache_dir, mmap=True):
+        self.cache_dir = cache_dir
+        self.mmap = mmap
+        self.session = {"hits": 0, "misses": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Return the cached table for a key.
+
+        Args:
+            key (str): Cache key from source_key
+
+        Returns:
+            pandas.DataFrame: Cached table, or None on a miss
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, META_FILE)) as f:
+                meta = json.load(f)
+            columns = {}
+            for position, column in enumerate(meta['columns']):
+                # np.asarray keeps the mapping but drops the memmap subclass
+                values = np.asarray(np.load(os.path.join(entry_dir, f"{position}.npy"),
+                                            mmap_mode='r' if self.mmap else None))
+                uniques = None
+                if column['kind'] == 'factorized':
+                    uniques = np.load(os.path.join(entry_dir, f"{position}.values.npy"))
+                columns[column['name']] = _decode_column(values, column, uniques)
+            df = pd.DataFrame(columns, copy=False)
+        except FileNotFoundError:
+            self.session["misses"] += 1
+            return None
+        except Exception as e:
+            print(f"Warning: discarding unreadable input cache entry {key}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self.session["misses"] += 1
+            return None
+
+        self.session["hits"] += 1
+        return df
+
+    def put(self, key, df):
+        """Store a parsed table under a key.
+
+        The entry is written to a scratch directory and renamed into place,
+        so readers never see a partial entry.
+
+        Args:
+            key (str): Cache key from source_key
+            df (pandas.DataFrame): Parsed table to store
+
+        Returns:
+            bool: True if the entry was stored, False otherwise
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            meta = {'version': CACHE_VERSION, 'rows': len(df), 'columns': []}
+            for position, name in enumerate(df.columns):
+                values, column, uniques = _encode_column(df[name])
+                np.save(os.path.join(tmp_dir, f"{position}.npy"), np.ascontiguousarray(values))
+                if uniques is not None:
+                    np.save(os.path.join(tmp_dir, f"{position}.values.npy"), uniques)
+                meta['columns'].append({'name': name, **column})
+            with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+                json.dump(meta, f)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+            return True
+        except Exception as e:
+            print(f"Warning: could not store input cache entry {key}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+    def load_csv(self, file_path, schema=None):
+        """Load a CSV file through the cache.
+
+        Args:
+            file_path (str): Path to the CSV file
+            schema (str, optional): Dataset schema to parse with, as for load_csv_data
+
+        Returns:
+            pandas.DataFrame: Parsed data or None if loading fails
+        """
+        if not os.path.exists(file_path):
+            print(f"Warning: File {file_path} does not exist.")
+            return None
+        with open(file_path, "rb") as f:
+            key = source_key(f.read(), schema)
+        df = self.get(key)
+        if df is None:
+            df = load_csv_data(file_path, schema=schema)
+            if df is not None:
+                self.put(key, df)
+        return df
+
+    def load_string(self, csv_string):
+        """Load CSV text (such as the embedded sample data) through the cache.
+
+        Args:
+            csv_string (str): CSV data as a string
+
+        Returns:
+            pandas.DataFrame: Parsed data
+        """
+        key = source_key(csv_string)
+        df = self.get(key)
+        if df is None:
+            df = load_from_string(csv_string)
+            self.put(key, df)
+        return df
+
+    def report(self):
+        """Print a one-line summary of this session's hits and misses."""
+        print(f"Input cache: {self.session['hits']} hit(s), {self.session['misses']} miss(es) "
+              f"in {os.path.abspath(self.cache_dir)}")
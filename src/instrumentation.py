@@ -0,0 +1,289 @@
+"""
+Instrumentation module for the supply chain simulation.
+
+This module provides named phase timers and counters that can be threaded
+through the simulation pipeline. A disabled profiler hands out a shared
+no-op context manager, so leaving instrumentation in place costs next to
+nothing when profiling is switched off. MemoryProfiler additionally
+records per-phase peak memory and allocation sites with tracemalloc.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+
+class _NullPhase:
+    """No-op context manager returned by a disabled profiler."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """Context manager accumulating wall time for a named phase."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        stats = self.profiler.timings.get(self.name)
+        if stats is None:
+            self.profiler.timings[self.name] = [elapsed, 1]
+        else:
+            stats[0] += elapsed
+            stats[1] += 1
+        return False
+
+
+class PhaseProfiler:
+    """Collects named phase timings and counters for a simulation run.
+
+    Args:
+        enabled (bool): Whether timings and counters are recorded
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {}
+        self.counters = {}
+        self.metadata = {}
+
+    def phase(self, name):
+        """Return a context manager timing the named phase.
+
+        Args:
+            name (str): Name of the phase
+
+        Returns:
+            object: Context manager; a shared no-op when disabled
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def count(self, name, amount=1):
+        """Increment a named counter.
+
+        Args:
+            name (str): Name of the counter
+            amount (int): Amount to add
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def annotate(self, **metadata):
+        """Attach run metadata (parameters, input sizes) to the profile."""
+        if self.enabled:
+            self.metadata.update(metadata)
+
+    def to_dict(self):
+        """Return the collected profile as a JSON-serialisable dictionary.
+
+        Returns:
+            dict: Profile with metadata, phases and counters
+        """
+        return {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "metadata": self.metadata,
+            "phases": {
+                name: {"seconds": round(total, 6), "calls": calls}
+                for name, (total, calls) in self.timings.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def save(self, file_path):
+        """Write the profile to a JSON file.
+
+        Args:
+            file_path (str): Path of the JSON file to write
+
+        Returns:
+            bool: True if saving was successful, False otherwise
+        """
+        try:
+            directory = os.path.dirname(os.path.abspath(file_path))
+            os.makedirs(directory, exist_ok=True)
+            with open(file_path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2, default=str)
+            print(f"Profile successfully saved to: {os.path.abspath(file_path)}")
+            return True
+        except Exception as e:
+            print(f"Error saving profile to {file_path}: {e}")
+            return False
+
+
+class _MemoryPhase(_Phase):
+    """Context manager recording wall time, peak memory and allocation growth for a phase."""
+
+    __slots__ = ("snapshot", "peak_seen", "overhead")
+
+    def __init__(self, profiler, name):
+        super().__init__(profiler, name)
+        self.snapshot = None
+        self.peak_seen = 0
+        self.overhead = 0
+
+    def __enter__(self):
+        profiler = self.profiler
+        current, peak = tracemalloc.get_traced_memory()
+        if profiler._stack:
+            # Keep the enclosing phase's peak before resetting the tracker for this one
+            parent = profiler._stack[-1]
+            parent.peak_seen = max(parent.peak_seen, peak - profiler._overhead)
+
+        # The snapshot itself is traced; remember its size so peaks exclude it
+        if profiler._snapshot_counts.get(self.name, 0) < profiler.snapshot_calls:
+            self.snapshot = tracemalloc.take_snapshot()
+        self.overhead = max(tracemalloc.get_traced_memory()[0] - current, 0)
+        profiler._overhead += self.overhead
+        tracemalloc.reset_peak()
+        self.peak_seen = current - (profiler._overhead - self.overhead)
+        profiler._stack.append(self)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        profiler = self.profiler
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(peak - profiler._overhead, self.peak_seen)
+        stats = []
+        if self.snapshot is not None:
+            stats = tracemalloc.take_snapshot().compare_to(self.snapshot, "lineno")
+            profiler._snapshot_counts[self.name] = profiler._snapshot_counts.get(self.name, 0) + 1
+        profiler._record_memory(self.name, peak, stats)
+
+        profiler._stack.pop()
+        profiler._overhead -= self.overhead
+        if profiler._stack:
+            parent = profiler._stack[-1]
+            parent.peak_seen = max(parent.peak_seen, peak)
+        self.snapshot = None
+        return False
+
+
+class MemoryProfiler(PhaseProfiler):
+    """Phase profiler that also snapshots allocations per phase with tracemalloc.
+
+    For each phase it records the peak traced memory across all calls and
+    the allocation sites whose memory was still live when the phase ended.
+    Peaks are tracked on every call; allocation sites are only sampled on
+    the first snapshot_calls calls of each phase, because snapshots are
+    expensive. Wall timings collected by this profiler are inflated and
+    should not be compared with a plain PhaseProfiler.
+
+    Args:
+        top_n (int): Number of allocation sites reported per phase
+        frames (int): Traceback depth stored by tracemalloc
+        snapshot_calls (int): Calls per phase that take allocation snapshots
+    """
+
+    def __init__(self, top_n=10, frames=1, snapshot_calls=12):
+        super().__init__(enabled=True)
+        self.top_n = top_n
+        self.frames = frames
+        self.snapshot_calls = snapshot_calls
+        self.memory = {}
+        self._stack = []
+        self._overhead = 0
+        self._snapshot_counts = {}
+        self._started_tracing = False
+        # Allocations made by the profiler itself or by the import system are not reported
+        self._excluded_files = {
+            tracemalloc.__file__,
+            __file__,
+            "<frozen importlib._bootstrap>",
+            "<frozen importlib._bootstrap_external>",
+            "<unknown>",
+        }
+
+    def start(self):
+        """Start tracing allocations if tracemalloc is not already running."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracing if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def phase(self, name):
+        """Return a context manager timing and memory-profiling the named phase.
+
+        Args:
+            name (str): Name of the phase
+
+        Returns:
+            object: Context manager; only times the phase if tracing is off
+        """
+        if not tracemalloc.is_tracing():
+            return _Phase(self, name)
+        return _MemoryPhase(self, name)
+
+    def _record_memory(self, name, peak, stats):
+        """Merge one phase call's peak and allocation growth into the report."""
+        entry = self.memory.get(name)
+        if entry is None:
+            entry = self.memory[name] = {"peak_bytes": 0, "net_bytes": 0, "sites": {}}
+        entry["peak_bytes"] = max(entry["peak_bytes"], peak)
+        for stat in stats:
+            frame = stat.traceback[0]
+            if frame.filename in self._excluded_files:
+                continue
+            entry["net_bytes"] += stat.size_diff
+            if stat.size_diff <= 0:
+                continue
+            site = f"{frame.filename}:{frame.lineno}"
+            size, count = entry["sites"].get(site, (0, 0))
+            entry["sites"][site] = (size + stat.size_diff, count + max(stat.count_diff, 0))
+
+    def to_dict(self):
+        """Return the profile including the per-phase memory report.
+
+        Returns:
+            dict: Profile with metadata, phases, counters and memory
+        """
+        profile = super().to_dict()
+        memory = {}
+        for name, entry in self.memory.items():
+            top_sites = sorted(entry["sites"].items(), key=lambda item: item[1][0], reverse=True)
+            memory[name] = {
+                "peak_mb": round(entry["peak_bytes"] / (1024 * 1024), 3),
+                "calls_sampled": self._snapshot_counts.get(name, 0),
+                "net_mb": round(entry["net_bytes"] / (1024 * 1024), 3),
+                "top_allocations": [
+                    {"site": site, "size_kb": round(size / 1024, 1), "blocks": count}
+                    for site, (size, count) in top_sites[:self.top_n]
+                ],
+            }
+        profile["memory"] = memory
+        profile["memory_overall_peak_mb"] = max(
+            (entry["peak_mb"] for entry in memory.values()), default=0.0
+        )
+        return profile
+
+
+# Shared disabled profiler used when callers do not pass one
+NULL_PROFILER = PhaseProfiler(enabled=False)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Vectorized (s, S) inventory policy simulation per SKU.
+
+Every SKU (and, in a parameter sweep, every candidate policy for every
+SKU) is a row of the state arrays, so one pass over the time axis
+simulates all of them together. Each period, orders due that period are
+received, demand is served or backordered, and any row whose inventory
+position has fallen to its reorder point s orders up to its level S.
+Sweeps tile the candidate (s, S) pairs along the row axis in chunks and
+only keep accumulated costs, so memory stays bounded for large grids.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import VARIETY_GROWTH_RATES, get_output_path
+from data_utils import load_csv_data, save_csv_data
+from product_generator import generate_apple_product_data
+from projection import build_projection
+from sample_data import load_sample_data
+from simulation import prepare_simulation_inputs
+
+
+def sku_daily_demand(df_products, projection, seed=None):
+    """Derive daily demand per SKU from projected monthly variety demand.
+
+    Monthly demand for a variety is split evenly over the days of the month
+    and the SKUs of that variety, then sampled as Poisson counts.
+
+    Args:
+        df_products (pandas.DataFrame): Product master data with SKUID and Name ("<Variety> Apple")
+        projection (ProjectionCube): Projected demand from build_projection
+        seed (int, optional): Random seed
+
+    Returns:
+        tuple: (demand array of shape (skus, days), pandas.DatetimeIndex of the days)
+    """
+    years = projection.years
+    dates = pd.date_range(f"{years[0]}-01-01", f"{years[-1]}-12-31", freq="D")
+    varieties = df_products['Name'].str.replace(r'\s+Apple$', '', regex=True)
+    codes = projection.variety_codes(varieties)
+
+    # Daily rate per variety: (days, varieties)
+    year_idx = np.asarray(dates.year - years[0])
+    month_idx = np.asarray(dates.month - 1)
+    daily_rate = projection.demand_totals[year_idx, month_idx] / np.asarray(dates.days_in_month)[:, np.newaxis]
+
+    # Split each variety's rate evenly over its SKUs; unknown varieties get no demand
+    known = codes >= 0
+    sku_counts = np.bincount(codes[known], minlength=len(projection.varieties))
+    rates = np.zeros((len(codes), len(dates)))
+    rates[known] = daily_rate[:, codes[known]].T / sku_counts[codes[known], np.newaxis]
+
+    rng = np.random.default_rng(seed)
+    return rng.poisson(rates).astype(np.float64), dates
+
+
+def simulate_policies(demand, reorder_point, order_up_to, lead_time=1, initial_inventory=None,
+                      holding_cost=1.0, ordering_cost=50.0, backorder_cost=10.0,
+                      record=False, rows=None):
+    """Simulate (s, S) policies for many rows at once.
+
+    Args:
+        demand (numpy.ndarray): Demand per SKU and period, shape (skus, periods)
+        reorder_point (numpy.ndarray): Reorder point s per row
+        order_up_to (numpy.ndarray): Order-up-to level S per row (S >= s)
+        lead_time (int or numpy.ndarray): Periods between ordering and receipt (>= 1), scalar or per SKU
+        initial_inventory (numpy.ndarray, optional): Starting stock per row, defaults to S
+        holding_cost (float): Cost per unit held at the end of a period
+        ordering_cost (float): Fixed cost per order placed
+        backorder_cost (float): Cost per unit backordered at the end of a period
+        record (bool): Whether to keep the full on-hand, backorder and order trajectories
+        rows (numpy.ndarray, optional): SKU index of each row; defaults to one row per SKU
+
+    Returns:
+        dict: Per-row cost totals, order counts and fill rate, plus trajectories of
+              shape (rows, periods) when record is True
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    num_skus, num_periods = demand.shape
+    rows = np.arange(num_skus) if rows is None else np.asarray(rows, dtype=np.int64)
+    num_rows = len(rows)
+
+    s = np.broadcast_to(np.asarray(reorder_point, dtype=np.float64), (num_rows,))
+    S = np.broadcast_to(np.asarray(order_up_to, dtype=np.float64), (num_rows,))
+    if np.any(S < s):
+        raise ValueError("order_up_to must be greater than or equal to reorder_point for every row")
+
+    lead = np.broadcast_to(np.asarray(lead_time, dtype=np.int64), (num_skus,))[rows]
+    if np.any(lead < 1):
+        raise ValueError("lead_time must be at least one period")
+
+    # Ring buffer of outstanding orders indexed by arrival period
+    horizon = int(lead.max()) + 1
+    pipeline = np.zeros((num_rows, horizon))
+    row_index = np.arange(num_rows)
+
+    net = np.array(S if initial_inventory is None else
+                   np.broadcast_to(initial_inventory, (num_rows,)), dtype=np.float64)
+    on_order = np.zeros(num_rows)
+
+    holding = np.zeros(num_rows)
+    backordering = np.zeros(num_rows)
+    orders_placed = np.zeros(num_rows, dtype=np.int64)
+    served = np.zeros(num_rows)
+    demand_total = demand.sum(axis=1)[rows]
+
+    if record:
+        on_hand_trace = np.empty((num_rows, num_periods))
+        backorder_trace = np.empty((num_rows, num_periods))
+        order_trace = np.empty((num_rows, num_periods))
+
+    for t in range(num_periods):
+        slot = t % horizon
+        arrivals = pipeline[:, slot]
+        net += arrivals
+        on_order -= arrivals
+        pipeline[:, slot] = 0.0
+
+        period_demand = demand[rows, t]
+        served += np.minimum(period_demand, np.maximum(net, 0.0))
+        net -= period_demand
+
+        position = net + on_order
+        quantity = np.where(position <= s, S - position, 0.0)
+        ordering = quantity > 0
+        pipeline[row_index, (t + lead) % horizon] += quantity
+        on_order += quantity
+        orders_placed += ordering
+
+        on_hand = np.maximum(net, 0.0)
+        backorders = np.maximum(-net, 0.0)
+        holding += on_hand
+        backordering += backorders
+
+        if record:
+            on_hand_trace[:, t] = on_hand
+            backorder_trace[:, t] = backorders
+            order_trace[:, t] = quantity
+
+    result = {
+        'holding_cost': holding * holding_cost,
+        'backorder_cost': backordering * backorder_cost,
+        'ordering_cost': orders_placed * ordering_cost,
+        'orders_placed': orders_placed,
+        'fill_rate': np.divide(served, demand_total, out=np.ones(num_rows), where=demand_total > 0),
+    }
+    result['total_cost'] = result['holding_cost'] + result['backorder_cost'] + result['ordering_cost']
+    if record:
+        result.update({'on_hand': on_hand_trace, 'backorders': backorder_trace, 'orders': order_trace})
+    return result
+
+
+def cover_grid(demand, reorder_days, order_up_to_days):
+    """Build per-SKU candidate (s, S) levels expressed as days of mean demand.
+
+    Args:
+        demand (numpy.ndarray): Demand per SKU and period, shape (skus, periods)
+        reorder_days (list): Candidate reorder points in days of cover
+        order_up_to_days (list): Candidate order-up-to levels in days of cover
+
+    Returns:
+        tuple: (reorder points, order-up-to levels, pairs) where the levels have
+               shape (skus, candidates) and pairs lists the (s_days, S_days) used
+    """
+    pairs = [(s, S) for s in reorder_days for S in order_up_to_days if S > s]
+    if not pairs:
+        raise ValueError("No candidate pair with order_up_to_days greater than reorder_days")
+    cover = np.array(pairs, dtype=np.float64)
+    mean_demand = np.asarray(demand, dtype=np.float64).mean(axis=1)
+    return (np.ceil(mean_demand[:, np.newaxis] * cover[:, 0]),
+            np.ceil(mean_demand[:, np.newaxis] * cover[:, 1]),
+            pairs)
+
+
+def sweep_policies(demand, reorder_points, order_up_to_levels, lead_time=1, holding_cost=1.0,
+                   ordering_cost=50.0, backorder_cost=10.0, max_rows=200_000):
+    """Evaluate a grid of (s, S) candidates for every SKU and keep the cheapest.
+
+    Candidates are stacked along the row axis and simulated in chunks of at
+    most max_rows rows, so a sweep is a few array passes instead of one
+    simulation per SKU and candidate.
+
+    Args:
+        demand (numpy.ndarray): Demand per SKU and period, shape (skus, periods)
+        reorder_points (numpy.ndarray): Candidate s per SKU, shape (skus, candidates) or (candidates,)
+        order_up_to_levels (numpy.ndarray): Candidate S, same shape as reorder_points
+        lead_time (int or numpy.ndarray): Lead time in periods, scalar or per SKU
+        holding_cost (float): Cost per unit held at the end of a period
+        ordering_cost (float): Fixed cost per order placed
+        backorder_cost (float): Cost per unit backordered at the end of a period
+        max_rows (int): Maximum rows simulated in one pass
+
+    Returns:
+        tuple: (cost matrix of shape (skus, candidates), index of the best candidate per SKU)
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    num_skus = demand.shape[0]
+    s_grid = np.broadcast_to(np.asarray(reorder_points, dtype=np.float64), (num_skus, np.shape(reorder_points)[-1]))
+    S_grid = np.broadcast_to(np.asarray(order_up_to_levels, dtype=np.float64), s_grid.shape)
+    num_candidates = s_grid.shape[1]
+
+    costs = np.empty((num_skus, num_candidates))
+    per_chunk = max(1, max_rows // num_skus)
+    for start in range(0, num_candidates, per_chunk):
+        stop = min(start + per_chunk, num_candidates)
+        # Rows are candidate-major: all SKUs for candidate start, then start + 1, ...
+        rows = np.tile(np.arange(num_skus), stop - start)
+        result = simulate_policies(
+            demand,
+            s_grid[:, start:stop].T.ravel(),
+            S_grid[:, start:stop].T.ravel(),
+            lead_time=lead_time,
+            holding_cost=holding_cost,
+            ordering_cost=ordering_cost,
+            backorder_cost=backorder_cost,
+            rows=rows
+        )
+        costs[:, start:stop] = result['total_cost'].reshape(stop - start, num_skus).T
+
+    return costs, costs.argmin(axis=1)
+
+
+def optimize_policies(df_products, demand, reorder_days, order_up_to_days, lead_time=1,
+                      holding_cost=1.0, ordering_cost=50.0, backorder_cost=10.0):
+    """Find the cost-optimal (s, S) pair for every SKU over a days-of-cover grid.
+
+    Args:
+        df_products (pandas.DataFrame): Product master data, one row per demand row
+        demand (numpy.ndarray): Demand per SKU and period, shape (skus, periods)
+        reorder_days (list): Candidate reorder points in days of cover
+        order_up_to_days (list): Candidate order-up-to levels in days of cover
+        lead_time (int or numpy.ndarray): Lead time in periods, scalar or per SKU
+        holding_cost (float): Cost per unit held at the end of a period
+        ordering_cost (float): Fixed cost per order placed
+        backorder_cost (float): Cost per unit backordered at the end of a period
+
+    Returns:
+        pandas.DataFrame: Best policy, its cost breakdown and fill rate per SKU
+    """
+    s_grid, S_grid, pairs = cover_grid(demand, reorder_days, order_up_to_days)
+    _, best = sweep_policies(demand, s_grid, S_grid, lead_time, holding_cost, ordering_cost, backorder_cost)
+
+    sku_index = np.arange(len(best))
+    s_best = s_grid[sku_index, best]
+    S_best = S_grid[sku_index, best]
+    final = simulate_policies(demand, s_best, S_best, lead_time, holding_cost=holding_cost,
+                              ordering_cost=ordering_cost, backorder_cost=backorder_cost)
+
+    policies = df_products[['SKUID', 'Name', 'Grade', 'ShelfLife']].reset_index(drop=True).copy()
+    policies['ReorderPoint'] = s_best
+    policies['OrderUpTo'] = S_best
+    policies['ReorderDaysCover'] = [pairs[i][0] for i in best]
+    policies['OrderUpToDaysCover'] = [pairs[i][1] for i in best]
+    policies['MeanDailyDemand'] = demand.mean(axis=1)
+    policies['OrdersPlaced'] = final['orders_placed']
+    policies['HoldingCost'] = final['holding_cost']
+    policies['BackorderCost'] = final['backorder_cost']
+    policies['OrderingCost'] = final['ordering_cost']
+    policies['TotalCost'] = final['total_cost']
+    policies['FillRate'] = final['fill_rate']
+    return policies
+
+
+def main():
+    """Command-line entry point for the (s, S) policy sweep."""
+    parser = argparse.ArgumentParser(description="Find cost-optimal (s, S) inventory policies per SKU")
+    parser.add_argument("--products", type=str,
+                        help="Path to a product master CSV (default: generate --sku-count products)")
+    parser.add_argument("--sku-count", type=int, default=45,
+                        help="Number of products to generate when --products is not given (default: 45)")
+    parser.add_argument("--years", nargs="+", type=int, default=[2021],
+                        help="Years of daily demand to simulate (default: 2021)")
+    parser.add_argument("--growth-rates", action="store_true",
+                        help="Grow demand each year by the per-variety rates in config")
+    parser.add_argument("--lead-time", type=int, default=3,
+                        help="Replenishment lead time in days (default: 3)")
+    parser.add_argument("--reorder-days", nargs="+", type=float, default=[1, 2, 3, 4, 5, 7],
+                        help="Candidate reorder points in days of mean demand")
+    parser.add_argument("--order-up-to-days", nargs="+", type=float, default=[3, 5, 7, 10, 14, 21],
+                        help="Candidate order-up-to levels in days of mean demand")
+    parser.add_argument("--holding-cost", type=float, default=1.0,
+                        help="Cost per unit held per day (default: 1.0)")
+    parser.add_argument("--ordering-cost", type=float, default=50.0,
+                        help="Fixed cost per order (default: 50.0)")
+    parser.add_argument("--backorder-cost", type=float, default=10.0,
+                        help="Cost per unit backordered per day (default: 10.0)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed for demand sampling (default: 0)")
+    parser.add_argument("--output", type=str, default="inventory_policies.csv",
+                        help="Output filename for the policies (default: inventory_policies.csv)")
+    args = parser.parse_args()
+
+    if args.products:
+        df_products = load_csv_data(args.products, schema="Products")
+        if df_products is None:
+            return
+    else:
+        df_products = generate_apple_product_data(args.sku_count)
+
+    prepared = prepare_simulation_inputs(*load_sample_data())
+    if prepared is None:
+        return
+    rates = VARIETY_GROWTH_RATES if args.growth_rates else None
+    projection = build_projection(prepared['harvest'], prepared['demand_melted'], args.years,
+                                  demand_growth_rates=rates)
+
+    demand, dates = sku_daily_demand(df_products, projection, seed=args.seed)
+    print(f"Sweeping {len(args.reorder_days)}x{len(args.order_up_to_days)} (s, S) candidates for "
+          f"{len(df_products)} SKUs over {len(dates)} days...")
+    start = time.perf_counter()
+    policies = optimize_policies(df_products, demand, args.reorder_days, args.order_up_to_days,
+                                 lead_time=args.lead_time, holding_cost=args.holding_cost,
+                                 ordering_cost=args.ordering_cost, backorder_cost=args.backorder_cost)
+    print(f"Sweep finished in {time.perf_counter() - start:.2f}s")
+    print(policies.head().to_string())
+
+    save_csv_data(policies, get_output_path(args.output), "Error saving inventory policies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Landed cost, energy and CO2 ledger for purchase orders.
+
+Every PO is joined to its shipping route by integer keys: suppliers map
+to the route of their shipment port (supplier master data), falling back
+to their country's port, and route attributes are gathered with a single
+array take. Freight cost and energy per metric ton come from the route
+table (data/energy.csv), CO2 per metric ton from delivery history, so the
+ledger is pure vectorized arithmetic and scales to millions of POs.
+Rollups by month, supplier, variety and customer are group-by sums;
+customer figures split each PO in proportion to the customers' demand
+for its variety in its target month.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, INV_MONTH_MAP, VARIETY_MAP, DATA_DIR, get_output_path
+from data_utils import load_csv_data, save_csv_data
+from simulation import load_shipping_data, sourcing_attributes
+
+LEDGER_METRICS = ['QuantityOrdered', 'FreightCostEUR', 'PurchaseCostEUR', 'LandedCostEUR', 'EnergyKWh', 'CO2Kg']
+
+
+def route_table(df_energy=None, df_suppliers=None):
+    """Build the route table and the integer route key of every supplier and country.
+
+    Args:
+        df_energy (pandas.DataFrame, optional): Route energy and cost data, defaults to
+                                                data/energy.csv, then the built-in shipping data
+        df_suppliers (pandas.DataFrame, optional): Supplier master data with SupplierID and
+                                                   Shipment Port, defaults to data/supplier_master_data.csv
+
+    Returns:
+        dict: 'routes' (DataFrame indexed by route key), 'supplier' and 'country'
+              (Series of route keys, -1 where no route is known)
+    """
+    if df_energy is None:
+        energy_path = os.path.join(DATA_DIR, "energy.csv")
+        df_energy = load_csv_data(energy_path, schema="EnergyConsumption") if os.path.exists(energy_path) else None
+        if df_energy is None:
+            df_energy = load_shipping_data()
+    if df_suppliers is None:
+        suppliers_path = os.path.join(DATA_DIR, "supplier_master_data.csv")
+        if os.path.exists(suppliers_path):
+            df_suppliers = load_csv_data(suppliers_path, schema="Supplier_Master")
+
+    routes = pd.DataFrame({
+        'OriginPort': df_energy['Origin Port'].to_numpy(),
+        'DistanceKm': df_energy['Approximate Distance (km)'].to_numpy(dtype=np.float64),
+        'EnergyPerTonKWh': df_energy['Average Energy Consumption (kWh)'].to_numpy(dtype=np.float64),
+        'FreightPerTonEUR': df_energy['Average Cost (EUR)'].to_numpy(dtype=np.float64),
+    })
+    ports = pd.Index(routes['OriginPort'])
+
+    # Country fallback: first route whose origin port starts with the country's port name
+    country_route = {}
+    for country, port in COUNTRY_PORT_MAP.items():
+        matches = np.flatnonzero(ports.str.startswith(port))
+        country_route[country] = int(matches[0]) if len(matches) else -1
+
+    supplier_route = pd.Series(dtype=np.int64)
+    if df_suppliers is not None and 'Shipment Port' in df_suppliers.columns:
+        supplier_route = pd.Series(ports.get_indexer(df_suppliers['Shipment Port']),
+                                   index=df_suppliers['SupplierID'].astype(str))
+        supplier_route = supplier_route[~supplier_route.index.duplicated()]
+
+    return {
+        'routes': routes,
+        'supplier': supplier_route,
+        'country': pd.Series(country_route, dtype=np.int64),
+    }
+
+
+def build_ledger(po_df, routes=None, co2_per_ton=None, price_per_ton=None):
+    """Compute landed cost, energy and CO2 for every purchase order.
+
+    Args:
+        po_df (pandas.DataFrame): Purchase orders with SupplierID, Country, AppleVariety,
+                                  OrderDate, DemandMonthTarget and QuantityOrdered
+        routes (dict, optional): Output of route_table
+        co2_per_ton (pandas.Series, optional): CO2 kg per metric ton by country,
+                                               defaults to sourcing_attributes()
+        price_per_ton (dict, optional): Purchase price in EUR per metric ton by variety
+
+    Returns:
+        pandas.DataFrame: One row per PO with its route key and ledger figures
+    """
+    routes = routes or route_table()
+    if co2_per_ton is None:
+        co2_per_ton = sourcing_attributes()['CO2PerTonKg']
+
+    # Route key per PO: resolve the few distinct suppliers and countries, then broadcast by code
+    supplier_codes, suppliers = pd.factorize(po_df['SupplierID'].astype(str))
+    country_codes, countries = pd.factorize(po_df['Country'])
+    supplier_keys = routes['supplier'].reindex(suppliers).fillna(-1).to_numpy(dtype=np.int64)
+    country_keys = routes['country'].reindex(countries).fillna(-1).to_numpy(dtype=np.int64)
+    route_keys = np.where(supplier_keys[supplier_codes] >= 0,
+                          supplier_keys[supplier_codes], country_keys[country_codes])
+
+    # Route attributes with a trailing NaN row for POs without a route
+    table = routes['routes'][['FreightPerTonEUR', 'EnergyPerTonKWh']].to_numpy()
+    table = np.vstack([table, np.full((1, table.shape[1]), np.nan)])
+    per_ton = table[np.where(route_keys >= 0, route_keys, len(table) - 1)]
+
+    quantity = po_df['QuantityOrdered'].to_numpy(dtype=np.float64)
+    co2 = pd.Series(co2_per_ton).reindex(countries).to_numpy(dtype=np.float64)[country_codes]
+    variety_codes, varieties = pd.factorize(po_df['AppleVariety'])
+    price = pd.Series(price_per_ton or {}, dtype=np.float64).reindex(varieties).fillna(0.0).to_numpy()[variety_codes]
+    date_codes, order_dates = pd.factorize(po_df['OrderDate'].astype(str))
+
+    ledger = pd.DataFrame({
+        'PO_ID': po_df['PO_ID'].to_numpy(),
+        'OrderMonth': order_dates.str[:7].to_numpy()[date_codes],
+        'SupplierID': po_df['SupplierID'].to_numpy(),
+        'Country': po_df['Country'].to_numpy(),
+        'AppleVariety': po_df['AppleVariety'].to_numpy(),
+        'DemandMonthTarget': po_df['DemandMonthTarget'].to_numpy(),
+        'RouteID': route_keys,
+        'QuantityOrdered': quantity,
+        'FreightCostEUR': quantity * per_ton[:, 0],
+        'PurchaseCostEUR': quantity * price,
+    })
+    ledger['LandedCostEUR'] = ledger['FreightCostEUR'] + ledger['PurchaseCostEUR']
+    ledger['EnergyKWh'] = quantity * per_ton[:, 1]
+    ledger['CO2Kg'] = quantity * co2
+    return ledger
+
+
+def customer_shares(df_demand):
+    """Share of each customer in the demand for every (month name, variety).
+
+    Args:
+        df_demand (pandas.DataFrame): Customer demand with customer_id, month and variety columns
+
+    Returns:
+        pandas.DataFrame: month, AppleVariety, customer_id and Share
+    """
+    demand = df_demand.rename(columns=lambda c: c.replace('(metrictons)', ''))
+    demand = demand.melt(id_vars=['customer_id', 'month'],
+                         value_vars=[c for c in VARIETY_MAP if c in demand.columns],
+                         var_name='AppleVariety', value_name='Quantity')
+    demand['AppleVariety'] = demand['AppleVariety'].map(VARIETY_MAP)
+    demand = demand.groupby(['month', 'AppleVariety', 'customer_id'], as_index=False)['Quantity'].sum()
+    totals = demand.groupby(['month', 'AppleVariety'])['Quantity'].transform('sum')
+    demand['Share'] = (demand['Quantity'] / totals).fillna(0.0)
+    return demand.drop(columns='Quantity')
+
+
+def ledger_rollups(ledger, df_demand=None):
+    """Roll the ledger up by order month, supplier, variety and customer.
+
+    Args:
+        ledger (pandas.DataFrame): Output of build_ledger
+        df_demand (pandas.DataFrame, optional): Customer demand used to split POs by customer
+
+    Returns:
+        dict: Rollup name -> DataFrame of summed metrics
+    """
+    rollups = {
+        name: ledger.groupby(column, as_index=False)[LEDGER_METRICS].sum()
+        for name, column in (('month', 'OrderMonth'), ('supplier', 'SupplierID'), ('variety', 'AppleVariety'))
+    }
+    if df_demand is not None:
+        # Split per (target month, variety) totals, not per PO: the share table is tiny
+        totals = ledger.groupby(['DemandMonthTarget', 'AppleVariety'], as_index=False)[LEDGER_METRICS].sum()
+        totals['month'] = pd.to_datetime(totals['DemandMonthTarget']).dt.month.map(INV_MONTH_MAP)
+        split = totals.merge(customer_shares(df_demand), on=['month', 'AppleVariety'])
+        split[LEDGER_METRICS] = split[LEDGER_METRICS].mul(split['Share'], axis=0)
+        rollups['customer'] = split.groupby('customer_id', as_index=False)[LEDGER_METRICS].sum()
+    return rollups
+
+
+def save_ledger(ledger, rollups, po_filename):
+    """Save the ledger and its rollups next to the purchase order table.
+
+    Args:
+        ledger (pandas.DataFrame): Output of build_ledger
+        rollups (dict): Output of ledger_rollups
+        po_filename (str): Filename of the purchase order table
+
+    Returns:
+        bool: True if every file was saved
+    """
+    stem = os.path.splitext(po_filename)[0]
+    saved = save_csv_data(ledger, get_output_path(f"{stem}_ledger.csv"), "Error saving PO ledger")
+    for name, rollup in rollups.items():
+        saved = save_csv_data(rollup, get_output_path(f"{stem}_ledger_by_{name}.csv"),
+                              f"Error saving ledger rollup by {name}") and saved
+    return saved
@@ -8,195 +8,24 @@ the supply chain simulation with different parameters.
 
 import pandas as pd
 import argparse
+import cProfile
 import os
+import pstats
 from io import StringIO
 
-from config import PLANNING_LEAD_TIME
+from config import PLANNING_LEAD_TIME, VARIETY_GROWTH_RATES, PORT_CAPACITY, get_output_path
 from product_generator import generate_apple_product_data, save_product_data
-from data_utils import load_csv_data, load_from_string, save_csv_data
+from data_utils import load_csv_data, save_csv_data, table_filename
 from simulation import run_supply_chain_simulation, save_simulation_results
-from visualization import plot_shipping_routes_with_waypoints, save_and_display_map
-
-def load_sample_data():
-    """Load sample data for simulation from embedded strings.
-    
-    Returns:
-        tuple: (harvest_data, demand_data) as DataFrames
-    """
-    # Sample harvest data
-    harvest_csv = """SupplierID,Country,Apple Variety,Harvest Month,Harvest Quantity
-S1,India,Royal Gala,August,600
-S1,India,Royal Gala,September,600
-S1,India,Fuji,August,200
-S1,India,Fuji,September,200
-S1,India,Fuji,October,200
-S1,India,Golden Delicious,May,800
-S1,India,Granny Smith,September,450
-S1,India,Granny Smith,October,450
-S1,India,Pink Lady,September,350
-S1,India,Pink Lady,October,350
-S2,South Africa,Royal Gala,January,864
-S2,South Africa,Royal Gala,February,864
-S2,South Africa,Royal Gala,March,864
-S2,South Africa,Royal Gala,April,864
-S2,South Africa,Royal Gala,May,864
-S2,South Africa,Fuji,January,432
-S2,South Africa,Fuji,February,432
-S2,South Africa,Fuji,March,432
-S2,South Africa,Fuji,April,432
-S2,South Africa,Fuji,May,432
-S2,South Africa,Golden Delicious,January,576
-S2,South Africa,Golden Delicious,February,576
-S2,South Africa,Golden Delicious,March,576
-S2,South Africa,Golden Delicious,April,576
-S2,South Africa,Golden Delicious,May,576
-S2,South Africa,Granny Smith,January,648
-S2,South Africa,Granny Smith,February,648
-S2,South Africa,Granny Smith,March,648
-S2,South Africa,Granny Smith,April,648
-S2,South Africa,Granny Smith,May,648
-S2,South Africa,Pink Lady,January,504
-S2,South Africa,Pink Lady,February,504
-S2,South Africa,Pink Lady,March,504
-S2,South Africa,Pink Lady,April,504
-S2,South Africa,Pink Lady,May,504
-S3,Chile,Royal Gala,February,2640
-S3,Chile,Royal Gala,March,2640
-S3,Chile,Fuji,March,1320
-S3,Chile,Fuji,April,1320
-S3,Chile,Granny Smith,March,1980
-S3,Chile,Granny Smith,April,1980
-S3,Chile,Golden Delicious,February,1760
-S3,Chile,Golden Delicious,March,1760
-S3,Chile,Pink Lady,April,1540
-S3,Chile,Pink Lady,May,1540
-S4,New Zealand,Royal Gala,February,8400
-S4,New Zealand,Fuji,March,2100
-S4,New Zealand,Fuji,April,2100
-S4,New Zealand,Granny Smith,April,3150
-S4,New Zealand,Granny Smith,May,3150
-S4,New Zealand,Golden Delicious,February,2800
-S4,New Zealand,Golden Delicious,March,2800
-S4,New Zealand,Pink Lady,April,2450
-S4,New Zealand,Pink Lady,May,2450
-"""
-
-    # Sample demand data
-    demand_csv = """city,customer_id,month,royal_gala,fuji,granny_smith,golden_delicious,pink_lady,total
-Berlin,EDEKA,January,78,87,67,81,50,364
-Berlin,EDEKA,February,73,81,64,76,49,343
-Berlin,EDEKA,March,70,76,62,70,52,329
-Berlin,EDEKA,April,67,70,56,64,53,311
-Berlin,EDEKA,May,64,64,50,59,56,294
-Berlin,EDEKA,June,59,56,48,53,50,266
-Berlin,EDEKA,July,56,53,45,48,45,246
-Berlin,EDEKA,August,76,62,48,53,42,280
-Berlin,EDEKA,September,98,73,53,70,49,343
-Berlin,EDEKA,October,106,90,64,81,57,399
-Berlin,EDEKA,November,95,98,70,84,59,406
-Berlin,EDEKA,December,90,92,73,87,57,399
-Berlin,LIDL,January,70,78,60,73,45,325
-Berlin,LIDL,February,65,73,58,68,44,306
-Berlin,LIDL,March,63,68,55,63,46,294
-Berlin,LIDL,April,60,63,50,58,48,278
-Berlin,LIDL,May,58,58,45,53,50,263
-Berlin,LIDL,June,53,50,43,48,45,238
-Berlin,LIDL,July,50,48,40,43,40,220
-Berlin,LIDL,August,68,55,43,48,38,250
-Berlin,LIDL,September,88,65,48,63,44,306
-Berlin,LIDL,October,95,80,58,73,51,356
-Berlin,LIDL,November,85,88,63,75,53,363
-Berlin,LIDL,December,80,83,65,78,51,356
-Berlin,REWE,January,50,56,43,52,32,234
-Berlin,REWE,February,47,52,41,49,32,221
-Berlin,REWE,March,45,49,40,45,33,212
-Berlin,REWE,April,43,45,36,41,34,200
-Berlin,REWE,May,41,41,32,38,36,189
-Berlin,REWE,June,38,36,31,34,32,171
-Berlin,REWE,July,36,34,29,31,29,158
-Berlin,REWE,August,49,40,31,34,27,180
-Berlin,REWE,September,63,47,34,45,32,221
-Berlin,REWE,October,68,58,41,52,37,257
-Berlin,REWE,November,61,63,45,54,38,261
-Berlin,REWE,December,58,59,47,56,37,257
-Hamburg,EDEKA,January,42,48,36,45,27,198
-Hamburg,EDEKA,February,39,45,35,42,26,186
-Hamburg,EDEKA,March,38,42,33,39,29,180
-Hamburg,EDEKA,April,36,39,30,36,29,170
-Hamburg,EDEKA,May,35,36,27,33,30,161
-Hamburg,EDEKA,June,32,30,26,30,27,144
-Hamburg,EDEKA,July,30,29,24,27,24,134
-Hamburg,EDEKA,August,42,33,26,30,23,153
-Hamburg,EDEKA,September,54,39,29,39,26,186
-Hamburg,EDEKA,October,57,48,35,45,32,216
-Hamburg,EDEKA,November,51,54,38,47,32,221
-Hamburg,EDEKA,December,48,51,39,48,30,216
-Hamburg,LIDL,January,34,38,29,36,22,158
-Hamburg,LIDL,February,31,36,28,34,20,149
-Hamburg,LIDL,March,30,34,26,31,23,144
-Hamburg,LIDL,April,29,31,24,29,23,136
-Hamburg,LIDL,May,28,29,22,26,24,128
-Hamburg,LIDL,June,25,24,20,24,22,115
-Hamburg,LIDL,July,24,23,19,22,19,107
-Hamburg,LIDL,August,34,26,20,24,18,122
-Hamburg,LIDL,September,43,31,23,31,20,149
-Hamburg,LIDL,October,46,38,28,36,25,173
-Hamburg,LIDL,November,41,43,30,37,25,176
-Hamburg,LIDL,December,38,41,31,38,24,173
-Hamburg,REWE,January,24,27,20,26,15,112
-Hamburg,REWE,February,22,26,20,24,14,105
-Hamburg,REWE,March,21,24,19,22,16,102
-Hamburg,REWE,April,20,22,17,20,16,96
-Hamburg,REWE,May,20,20,15,19,17,91
-Hamburg,REWE,June,18,17,14,17,15,82
-Hamburg,REWE,July,17,16,14,15,14,76
-Hamburg,REWE,August,24,19,14,17,13,87
-Hamburg,REWE,September,31,22,16,22,14,105
-Hamburg,REWE,October,32,27,20,26,18,122
-Hamburg,REWE,November,29,31,21,26,18,125
-Hamburg,REWE,December,27,29,22,27,17,122
-Munich,EDEKA,January,34,40,29,37,23,164
-Munich,EDEKA,February,33,37,28,34,22,153
-Munich,EDEKA,March,31,34,26,33,23,147
-Munich,EDEKA,April,29,31,25,29,25,140
-Munich,EDEKA,May,28,29,22,26,26,132
-Munich,EDEKA,June,26,25,20,25,23,119
-Munich,EDEKA,July,25,23,19,22,22,110
-Munich,EDEKA,August,34,28,20,25,20,127
-Munich,EDEKA,September,43,33,23,33,22,153
-Munich,EDEKA,October,48,40,28,37,26,180
-Munich,EDEKA,November,43,45,31,39,28,186
-Munich,EDEKA,December,40,42,33,40,26,181
-Munich,LIDL,January,25,30,22,28,17,122
-Munich,LIDL,February,24,28,21,25,16,114
-Munich,LIDL,March,23,25,20,24,17,109
-Munich,LIDL,April,22,23,18,22,18,104
-Munich,LIDL,May,21,22,16,20,20,98
-Munich,LIDL,June,20,18,15,18,17,89
-Munich,LIDL,July,18,17,14,16,16,82
-Munich,LIDL,August,25,21,15,18,15,94
-Munich,LIDL,September,32,24,17,24,16,114
-Munich,LIDL,October,36,30,21,28,20,133
-Munich,LIDL,November,32,33,23,29,21,138
-Munich,LIDL,December,30,31,24,30,20,135
-Munich,REWE,January,22,26,19,24,15,106
-Munich,REWE,February,21,24,18,22,14,99
-Munich,REWE,March,20,22,17,21,15,95
-Munich,REWE,April,19,20,16,19,16,90
-Munich,REWE,May,18,19,14,17,17,85
-Munich,REWE,June,17,16,13,16,15,77
-Munich,REWE,July,16,15,12,14,14,71
-Munich,REWE,August,22,18,13,16,13,82
-Munich,REWE,September,28,21,15,21,14,99
-Munich,REWE,October,31,26,18,24,17,116
-Munich,REWE,November,28,29,20,25,18,120
-Munich,REWE,December,26,27,21,26,17,117
-"""
-    
-    df_harvest = load_from_string(harvest_csv)
-    df_demand = load_from_string(demand_csv)
-    
-    return df_harvest, df_demand
+from instrumentation import PhaseProfiler, MemoryProfiler
+from sample_data import load_sample_data
+from batch import run_batch
+from result_cache import ResultCache, result_key
+from input_cache import InputCache
+from delay_model import fit_delay_model, arrival_scenarios
+from ledger import build_ledger, ledger_rollups, route_table, save_ledger
+from store import SupplyChainStore
+from partitioned_writer import PartitionedWriter
 
 def main():
     """Main function to run the simulation."""
@@ -226,22 +55,121 @@ def main():
     parser.add_argument("--map", action="store_true",
                       help="Generate shipping routes map")
     
+    parser.add_argument("--growth-rates", action="store_true",
+                      help="Grow harvest and demand each year by the per-variety rates in config")
+    
+    parser.add_argument("--stochastic-delays", action="store_true",
+                      help="Sample a delivery delay per PO from the delay model fitted on delivery history")
+    
+    parser.add_argument("--delivery-data", type=str,
+                      help="Delivery history CSV for the delay model (default: data/delivery.csv)")
+    
+    parser.add_argument("--delay-model-cache", type=str,
+                      help="Cache the fitted delay model statistics in this JSON file and refit only appended deliveries (optional)")
+    
+    parser.add_argument("--delay-scenarios", type=int, default=0,
+                      help="Monte Carlo scenarios of PO arrival delays to summarise (default: 0, off)")
+    
+    parser.add_argument("--port-queue", action="store_true",
+                      help="Queue arrivals for Rotterdam berths and reefer plugs (capacity in config.PORT_CAPACITY)")
+    
+    parser.add_argument("--ledger", action="store_true",
+                      help="Write a landed cost, energy and CO2 ledger per PO with rollups next to the output")
+    
+    parser.add_argument("--cube", action="store_true",
+                      help="Also write a rollup cube (<output>_cube.npz) for fast date-range and drill-down totals")
+    
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                      help="Output format for purchase orders and products (Parquet and Arrow need pyarrow)")
+    
+    parser.add_argument("--partition", action="store_true",
+                      help="Partition Parquet/Arrow purchase orders by order year and variety into a directory")
+    
+    parser.add_argument("--compression", type=str, default="zstd",
+                      help="Compression codec for Parquet/Arrow output (default: zstd)")
+    
+    parser.add_argument("--seed", type=int,
+                      help="Random seed for sampled delays (optional)")
+    
+    parser.add_argument("--cache-dir", type=str,
+                      help="Reuse purchase orders of identical earlier runs from this cache directory; "
+                           "unseeded --stochastic-delays runs are not cached (optional)")
+    
+    parser.add_argument("--input-cache", type=str,
+                      help="Reuse parsed harvest and demand inputs from this directory, keyed by content hash (optional)")
+    
+    parser.add_argument("--append-dir", type=str,
+                      help="Also add purchase orders to this month-partitioned dataset instead of rewriting history (optional)")
+    
+    parser.add_argument("--append-mode", choices=["append", "new", "overwrite"], default="new",
+                      help="Rows added with --append-dir: all; only new ones (default), i.e. those dated after the latest "
+                           "date already written plus those on that date whose PO_ID is not written yet; "
+                           "or replacing the months they fall into")
+    
+    parser.add_argument("--store", type=str,
+                      help="Also write purchase orders to this SQLite store and read supplier master data from it (optional)")
+    
+    parser.add_argument("--cache-max-mb", type=float, default=256,
+                      help="Size limit of the result cache in MB; least recently used entries are evicted (default: 256)")
+    
+    parser.add_argument("--profile", type=str,
+                      help="Write a JSON profile of phase timings and counters to this path (optional)")
+    
+    parser.add_argument("--cprofile", type=str,
+                      help="Wrap the simulation run in cProfile and write pstats output to this path (optional)")
+    
+    parser.add_argument("--profile-memory", type=str,
+                      help="Snapshot allocations per phase with tracemalloc and write a JSON memory report to this path; "
+                           "not combinable with --profile (optional)")
+    
+    parser.add_argument("--profile-memory-top", type=int, default=10,
+                      help="Number of allocation sites reported per phase (default: 10)")
+    
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Run every simulation listed in a JSON manifest")
+    
+    batch_parser.add_argument("manifest", type=str,
+                            help="Path to the JSON manifest of runs")
+    
+    batch_parser.add_argument("--workers", type=int, default=1,
+                            help="Number of worker processes (default: 1, run in-process)")
+    
+    batch_parser.add_argument("--output-dir", type=str,
+                            help="Directory for the partitioned output (default: manifest output_dir or data/batch_output)")
+    
+    batch_parser.add_argument("--precheck", choices=["off", "flag", "skip"],
+                            help="Feasibility pre-check: record unavoidable shortfalls, or skip infeasible runs "
+                                 "(default: manifest precheck or flag)")
+    
     args = parser.parse_args()
+    if args.profile and args.profile_memory:
+        # tracemalloc slows every allocation, so one run cannot give both reports
+        parser.error("--profile and --profile-memory cannot be combined: tracemalloc inflates the "
+                     "phase timings, so profile time and memory in separate runs")
+    
+    if args.command == "batch":
+        run_batch(args.manifest, workers=args.workers, output_dir=args.output_dir, precheck=args.precheck)
+        return
     
     # Generate product data if requested
     if args.generate_products:
         print(f"Generating {args.products_count} product records...")
         product_data = generate_apple_product_data(args.products_count)
-        save_product_data(product_data)
+        save_product_data(product_data, table_filename("product_master.csv", args.format),
+                          file_format=args.format, compression=args.compression)
     
     # Load data
+    input_cache = InputCache(args.input_cache) if args.input_cache else None
+    load_csv = input_cache.load_csv if input_cache is not None else load_csv_data
     if args.harvest_data and args.demand_data:
         print(f"Loading data from {args.harvest_data} and {args.demand_data}")
-        df_harvest = load_csv_data(args.harvest_data)
-        df_demand = load_csv_data(args.demand_data)
+        df_harvest = load_csv(args.harvest_data, schema="Harvest_By_Supplier")
+        df_demand = load_csv(args.demand_data, schema="CustomerDemand")
     else:
         print("Using sample data for simulation")
-        df_harvest, df_demand = load_sample_data()
+        df_harvest, df_demand = load_sample_data(cache=input_cache)
+    if input_cache is not None:
+        input_cache.report()
     
     if df_harvest is None or df_demand is None:
         print("Error loading required data. Exiting.")
@@ -249,18 +177,118 @@ def main():
     
     # Run simulation
     print(f"Running simulation for years: {args.years} with lead time: {args.lead_time} months")
-    po_df = run_supply_chain_simulation(
-        df_harvest, 
-        df_demand,
-        simulation_years=args.years,
-        planning_lead_time=args.lead_time
-    )
+    if args.profile_memory:
+        profiler = MemoryProfiler(top_n=args.profile_memory_top)
+        profiler.start()
+    else:
+        profiler = PhaseProfiler(enabled=bool(args.profile))
+    cprofiler = cProfile.Profile() if args.cprofile else None
+    if cprofiler is not None:
+        cprofiler.enable()
+    growth_rates = VARIETY_GROWTH_RATES if args.growth_rates else None
+    delay_model = None
+    if args.stochastic_delays or args.delay_scenarios:
+        with profiler.phase('fit_delay_model'):
+            delay_model = fit_delay_model(args.delivery_data, cache_path=args.delay_model_cache)
+        if delay_model is None:
+            print("Error loading delivery history. Exiting.")
+            return
+    cache = None
+    po_df = None
+    if args.cache_dir and args.stochastic_delays and args.seed is None:
+        # Unseeded delays differ on every run, so a cached result would replay one draw
+        print("Result cache skipped: --stochastic-delays without --seed samples new delays every run")
+    elif args.cache_dir:
+        cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        cache_params = {
+            'simulation_years': list(args.years),
+            'planning_lead_time': args.lead_time,
+            'supply_growth_rates': growth_rates,
+            'demand_growth_rates': growth_rates,
+            'stochastic_delays': args.stochastic_delays,
+            'delay_stats': delay_model.stats if args.stochastic_delays else None,
+            'seed': args.seed,
+            'port_capacity': PORT_CAPACITY if args.port_queue else None
+        }
+        with profiler.phase('result_cache_lookup'):
+            cache_key = result_key(df_harvest, df_demand, cache_params)
+            po_df = cache.get(cache_key)
+        if po_df is not None:
+            print(f"Result cache hit ({cache_key[:12]}): reusing {len(po_df)} purchase orders")
+    if po_df is None:
+        with profiler.phase('run_supply_chain_simulation'):
+            po_df = run_supply_chain_simulation(
+                df_harvest, 
+                df_demand,
+                simulation_years=args.years,
+                planning_lead_time=args.lead_time,
+                profiler=profiler,
+                supply_growth_rates=growth_rates,
+                demand_growth_rates=growth_rates,
+                delay_model=delay_model if args.stochastic_delays else None,
+                delay_seed=args.seed,
+                port_capacity=PORT_CAPACITY if args.port_queue else None
+            )
+        if cache is not None and po_df is not None:
+            cache.put(cache_key, po_df, cache_params)
+    if cache is not None:
+        cache.report()
+    if cprofiler is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(args.cprofile)
+        print(f"cProfile stats saved to: {os.path.abspath(args.cprofile)}")
+        pstats.Stats(cprofiler).sort_stats("cumulative").print_stats(15)
     
     if po_df is not None and not po_df.empty:
-        save_simulation_results(po_df, args.output)
+        output = args.output if args.format == "csv" else table_filename(args.output, args.format)
+        save_simulation_results(po_df, output, profiler=profiler, cube=args.cube, file_format=args.format,
+                                compression=args.compression, partition=args.partition)
+    
+    if args.append_dir and po_df is not None and not po_df.empty:
+        with profiler.phase('append_partitions'):
+            writer = PartitionedWriter(args.append_dir)
+            written = writer.write(po_df, mode=args.append_mode)
+        stats = writer.stats()
+        print(f"Appended {sum(written.values())} purchase orders to {len(written)} partition(s) in "
+              f"{os.path.abspath(args.append_dir)}; {stats['rows']} rows from {stats['min_date']} to {stats['max_date']}")
+    
+    store = SupplyChainStore(args.store) if args.store else None
+    if store is not None and po_df is not None and not po_df.empty:
+        with profiler.phase('store_purchase_orders'):
+            written = store.write('simulated_purchase_orders', po_df, replace=True)
+        print(f"Stored {written} purchase orders in {os.path.abspath(args.store)}")
+    
+    if args.ledger and po_df is not None and not po_df.empty:
+        with profiler.phase('ledger'):
+            suppliers = store.read('suppliers') if store is not None else None
+            routes = route_table(df_suppliers=suppliers) if suppliers is not None and not suppliers.empty else None
+            ledger = build_ledger(po_df, routes=routes)
+            rollups = ledger_rollups(ledger, df_demand)
+        print(f"Ledger: {ledger['LandedCostEUR'].sum():,.0f} EUR landed, {ledger['EnergyKWh'].sum():,.0f} kWh, "
+              f"{ledger['CO2Kg'].sum():,.0f} kg CO2")
+        save_ledger(ledger, rollups, args.output)
+    if store is not None:
+        store.close()
+    
+    if args.delay_scenarios and po_df is not None and not po_df.empty:
+        with profiler.phase('arrival_scenarios'):
+            scenarios = arrival_scenarios(po_df, delay_model, runs=args.delay_scenarios, seed=args.seed,
+                                          port_capacity=PORT_CAPACITY if args.port_queue else None)
+        print(f"Arrival delays over {args.delay_scenarios} scenarios: mean {scenarios['MeanDelayDays'].mean():.2f} days, "
+              f"{(scenarios['ProbabilityDelayed'] > 0.5).sum()} of {len(scenarios)} POs more likely late than not")
+        save_csv_data(scenarios, get_output_path(f"{os.path.splitext(args.output)[0]}_delay_scenarios.csv"),
+                      "Error saving delay scenarios")
+    
+    if args.profile_memory:
+        profiler.stop()
+        profiler.save(args.profile_memory)
+    if args.profile:
+        profiler.save(args.profile)
     
     # Generate map if requested
     if args.map:
+        # Imported lazily so runs without a map do not pay for folium and IPython
+        from visualization import plot_shipping_routes_with_waypoints, save_and_display_map
         print("Generating shipping routes map...")
         shipping_map = plot_shipping_routes_with_waypoints()
         save_and_display_map(shipping_map, "shipping_routes.html")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""
+Multi-objective Pareto search over sourcing weightings.
+
+Each candidate is a weighting of cost, CO2 and freshness used by the
+engine to rank supply lots. Candidates are evaluated in parallel on a
+worker pool sharing the prepared inputs, and scored on four objectives:
+landed route cost, CO2, mean lot age at ordering and unmet demand.
+
+The search screens every candidate on a short horizon first. Weightings
+are grouped by the plan they produce, and groups whose plan is dominated
+by a margin on the screening horizon are pruned, so only the survivors
+run over the full horizon. The result is the non-dominated set of
+distinct plans with per-plan metrics.
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import PLANNING_LEAD_TIME, get_output_path
+from data_utils import load_csv_data, save_csv_data
+from sample_data import load_sample_data
+from simulation import sourcing_attributes
+from simulation_api import prepare_inputs, simulate, SimulationConfig
+
+OBJECTIVES = ['TotalCostEUR', 'TotalCO2Kg', 'MeanAgeMonths', 'UnmetDemandShare']
+WEIGHT_NAMES = ['cost', 'co2', 'freshness']
+
+# Prepared inputs shared by every evaluation in this process
+_worker_inputs = None
+
+
+def weight_grid(step=0.1):
+    """Return every weighting of cost, CO2 and freshness on a simplex grid.
+
+    Args:
+        step (float): Grid spacing; weights are multiples of step summing to one
+
+    Returns:
+        list: Weight dictionaries
+    """
+    ticks = int(round(1 / step))
+    return [
+        {'cost': i / ticks, 'co2': j / ticks, 'freshness': (ticks - i - j) / ticks}
+        for i, j in itertools.product(range(ticks + 1), repeat=2) if i + j <= ticks
+    ]
+
+
+def plan_metrics(result, sourcing):
+    """Compute the objective values of a simulated sourcing plan.
+
+    Args:
+        result (SimulationResult): Result of a simulation run
+        sourcing (pandas.DataFrame): Output of sourcing_attributes
+
+    Returns:
+        dict: Objective values plus PO count and quantities
+    """
+    po_df = result.purchase_orders
+    shortfall = float(result.shortfalls['Shortfall'].sum()) if result.has_shortfalls else 0.0
+    if po_df.empty:
+        return {'TotalCostEUR': 0.0, 'TotalCO2Kg': 0.0, 'MeanAgeMonths': 0.0,
+                'UnmetDemandShare': 1.0 if shortfall else 0.0, 'PurchaseOrders': 0,
+                'QuantityOrdered': 0.0, 'Shortfall': shortfall}
+
+    quantity = po_df['QuantityOrdered'].to_numpy(dtype=np.float64)
+    order_dates = pd.to_datetime(po_df['OrderDate'])
+    harvest_month = pd.to_datetime(po_df['HarvestMonth'], format='%B').dt.month
+    age_months = (order_dates.dt.year - po_df['HarvestYear']) * 12 + order_dates.dt.month - harvest_month
+    ordered = quantity.sum()
+    return {
+        'TotalCostEUR': float((quantity * po_df['Country'].map(sourcing['RouteCostEUR'])).sum()),
+        'TotalCO2Kg': float((quantity * po_df['Country'].map(sourcing['CO2PerTonKg'])).sum()),
+        'MeanAgeMonths': float((quantity * age_months).sum() / ordered),
+        'UnmetDemandShare': shortfall / (ordered + shortfall),
+        'PurchaseOrders': len(po_df),
+        'QuantityOrdered': float(ordered),
+        'Shortfall': shortfall,
+    }
+
+
+def _init_worker(prepared):
+    """Install the prepared inputs in a worker process."""
+    global _worker_inputs
+    _worker_inputs = prepared
+
+
+def _evaluate(weights, simulation_years, planning_lead_time, horizon_months):
+    """Simulate one weighting and return its metrics and plan signature."""
+    config = SimulationConfig(simulation_years=tuple(simulation_years),
+                              planning_lead_time=planning_lead_time,
+                              collect_timings=False,
+                              sourcing_weights=weights,
+                              horizon_months=horizon_months)
+    result = simulate(None, None, config, prepared_inputs=_worker_inputs)
+    metrics = plan_metrics(result, _worker_inputs['sourcing'])
+    # Weightings that produce identical orders are the same plan
+    orders = result.purchase_orders
+    signature = hashlib.sha1(
+        pd.util.hash_pandas_object(orders[['SourceHarvestID', 'QuantityOrdered']], index=False)
+        .to_numpy().tobytes() if not orders.empty else b""
+    ).hexdigest()
+    return metrics, signature
+
+
+def non_dominated(values, margin=0.0):
+    """Return a mask of rows not dominated by any other row (all objectives minimised).
+
+    A row is dominated when another row is no worse on every objective and
+    better on at least one. With a margin, "better" means better by at least
+    that fraction of the objective's range, so near-ties survive.
+
+    Args:
+        values (numpy.ndarray): Objective values, shape (candidates, objectives)
+        margin (float): Relative margin required to dominate
+
+    Returns:
+        numpy.ndarray: Boolean mask of non-dominated rows
+    """
+    values = np.asarray(values, dtype=np.float64)
+    spread = values.max(axis=0) - values.min(axis=0)
+    tolerance = margin * np.where(spread > 0, spread, 1.0)
+    # Pairwise comparison: dominates[i, j] means candidate i dominates candidate j
+    no_worse = (values[:, np.newaxis, :] <= values[np.newaxis, :, :]).all(axis=2)
+    strictly = (values[:, np.newaxis, :] < values[np.newaxis, :, :] - tolerance).any(axis=2)
+    dominates = no_worse & strictly
+    return ~dominates.any(axis=0)
+
+
+def pareto_search(df_harvest, df_demand, simulation_years=(2021,), planning_lead_time=PLANNING_LEAD_TIME,
+                  candidates=None, workers=None, screen_months=6, screen_margin=0.05):
+    """Search sourcing weightings for the cost / CO2 / freshness / fulfilment frontier.
+
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        df_demand (pandas.DataFrame): Raw demand data
+        simulation_years (tuple): Years to simulate
+        planning_lead_time (int): Planning lead time in months
+        candidates (list, optional): Weight dictionaries, defaults to weight_grid(0.1)
+        workers (int, optional): Worker processes, defaults to the CPU count; 1 runs in-process
+        screen_months (int): Months simulated in the screening stage (0 disables screening)
+        screen_margin (float): Relative margin for pruning on the screening horizon
+
+    Returns:
+        pandas.DataFrame: Non-dominated plans with their weights and metrics, or None if the inputs are invalid
+    """
+    global _worker_inputs
+
+    prepared = prepare_inputs(df_harvest, df_demand)
+    if prepared is None:
+        return None
+    prepared['sourcing'] = sourcing_attributes()
+
+    candidates = candidates or weight_grid(0.1)
+    workers = workers or os.cpu_count() or 1
+    full_months = len(simulation_years) * 12
+
+    def evaluate_all(weight_list, horizon):
+        args = ([w for w in weight_list], [tuple(simulation_years)] * len(weight_list),
+                [planning_lead_time] * len(weight_list), [horizon] * len(weight_list))
+        if executor is None:
+            return [_evaluate(*a) for a in zip(*args)]
+        return list(executor.map(_evaluate, *args, chunksize=max(1, len(weight_list) // (4 * workers))))
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prepared,))
+    else:
+        _worker_inputs = prepared
+
+    try:
+        survivors = list(candidates)
+        if 0 < screen_months < full_months:
+            start = time.perf_counter()
+            screened = evaluate_all(survivors, screen_months)
+            # Group weightings by the plan they produce, then prune plans dominated by a margin
+            plans = {}
+            for weights, (metrics, signature) in zip(survivors, screened):
+                plans.setdefault(signature, (metrics, []))[1].append(weights)
+            groups = list(plans.values())
+            mask = non_dominated([[metrics[o] for o in OBJECTIVES] for metrics, _ in groups], screen_margin)
+            survivors = [weights for (_, members), keep in zip(groups, mask) if keep for weights in members]
+            print(f"Screening ({screen_months} months): {len(candidates)} candidates, "
+                  f"{len(plans)} distinct plans, {len(survivors)} kept "
+                  f"({time.perf_counter() - start:.1f}s)")
+
+        start = time.perf_counter()
+        evaluated = evaluate_all(survivors, None)
+        print(f"Full horizon ({full_months} months): {len(survivors)} candidates "
+              f"({time.perf_counter() - start:.1f}s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    rows, seen = [], set()
+    for weights, (metrics, signature) in zip(survivors, evaluated):
+        if signature in seen:
+            continue
+        seen.add(signature)
+        rows.append({**{f"Weight_{name}": weights.get(name, 0.0) for name in WEIGHT_NAMES}, **metrics})
+    plans = pd.DataFrame(rows).drop_duplicates(subset=OBJECTIVES)
+    frontier = plans[non_dominated(plans[OBJECTIVES].to_numpy())]
+    return frontier.sort_values(OBJECTIVES).reset_index(drop=True)
+
+
+def main():
+    """Command-line entry point for the Pareto search."""
+    parser = argparse.ArgumentParser(description="Search the Pareto frontier of sourcing weightings")
+    parser.add_argument("--years", nargs="+", type=int, default=[2021],
+                        help="Years to simulate (default: 2021)")
+    parser.add_argument("--lead-time", type=int, default=PLANNING_LEAD_TIME,
+                        help=f"Planning lead time in months (default: {PLANNING_LEAD_TIME})")
+    parser.add_argument("--harvest-data", type=str,
+                        help="Path to harvest data CSV file (optional)")
+    parser.add_argument("--demand-data", type=str,
+                        help="Path to demand data CSV file (optional)")
+    parser.add_argument("--step", type=float, default=0.1,
+                        help="Grid spacing of the weightings (default: 0.1)")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--screen-months", type=int, default=6,
+                        help="Months in the screening stage; 0 disables screening (default: 6)")
+    parser.add_argument("--screen-margin", type=float, default=0.05,
+                        help="Relative margin for pruning during screening (default: 0.05)")
+    parser.add_argument("--output", type=str, default="pareto_frontier.csv",
+                        help="Output filename for the frontier (default: pareto_frontier.csv)")
+    args = parser.parse_args()
+
+    if args.harvest_data and args.demand_data:
+        df_harvest = load_csv_data(args.harvest_data, schema="Harvest_By_Supplier")
+        df_demand = load_csv_data(args.demand_data, schema="CustomerDemand")
+    else:
+        print("Using sample data for simulation")
+        df_harvest, df_demand = load_sample_data()
+    if df_harvest is None or df_demand is None:
+        print("Error loading required data. Exiting.")
+        return
+
+    frontier = pareto_search(df_harvest, df_demand, tuple(args.years), args.lead_time,
+                             candidates=weight_grid(args.step), workers=args.workers,
+                             screen_months=args.screen_months, screen_margin=args.screen_margin)
+    if frontier is None:
+        return
+    print(f"{len(frontier)} non-dominated plans:")
+    print(frontier.to_string())
+    save_csv_data(frontier, get_output_path(args.output), "Error saving Pareto frontier")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Incremental, date-partitioned output for long-running and rolling runs.
+
+save_csv_data rewrites a whole file, so a service that adds one month of
+purchase orders at a time would rewrite all history on every run. The
+writer instead splits rows by month of a date column into partition
+directories and only writes the partitions the new rows fall into:
+
+    <root>/OrderMonth=2021-03/part-00000.csv
+    <root>/OrderMonth=2021-03/part-00001.csv
+    <root>/_manifest.json
+
+Every part file is written under a temporary name and renamed into place,
+and the manifest is replaced the same way after the parts. Readers only
+open the parts the manifest lists, so a crash mid-write never exposes a
+half-written or unrecorded part. Overwrites write new part numbers and
+delete the replaced parts only after the manifest that drops them is
+saved, so every listed part exists with the content it was listed with.
+The manifest also keeps the row count and date range of every partition,
+so readers open only the partitions that overlap the dates they need.
+"""
+
+import json
+import os
+import time
+
+import pandas as pd
+
+MANIFEST_FILE = "_manifest.json"
+WRITE_MODES = ("append", "new", "overwrite")
+
+
+def _next_part(entry):
+    """Number of the next part file of a partition entry (None for a new partition)."""
+    if not entry:
+        return 0
+    return 1 + max((int(name[len("part-"):-len(".csv")]) for name in entry["files"]), default=-1)
+
+
+class PartitionedWriter:
+    """Month-partitioned CSV dataset with a manifest of partition statistics.
+
+    Args:
+        root (str): Dataset directory
+        date_column (str): Date column rows are partitioned by
+        key_column (str): Column identifying a row, used by "new" writes to skip
+                          rows on the watermark day that are already written
+    """
+
+    def __init__(self, root, date_column="OrderDate", key_column="PO_ID"):
+        self.root = root
+        self.date_column = date_column
+        self.key_column = key_column
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+
+    @property
+    def partition_column(self):
+        """str: Name of the partition key, e.g. OrderMonth for OrderDate."""
+        return self.date_column.replace("Date", "") + "Month"
+
+    def _load_manifest(self):
+        """Read the manifest, starting an empty one if there is none."""
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("date_column") != self.date_column:
+                raise ValueError(f"{self.root} is partitioned by {manifest.get('date_column')}, "
+                                 f"not {self.date_column}")
+            return manifest
+        return {"date_column": self.date_column, "watermark": None, "partitions": {}}
+
+    def _save_manifest(self):
+        """Write the manifest atomically."""
+        self.manifest["updated"] = time.time()
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _partition_dir(self, month):
+        return os.path.join(self.root, f"{self.partition_column}={month}")
+
+    def write(self, df, mode="new"):
+        """Write rows into their month partitions.
+
+        Args:
+            df (pandas.DataFrame): Rows with the date column as ISO dates
+            mode (str): "append" adds every row as a new part of its partition,
+                        "new" only adds rows dated after the dataset's watermark
+                        (the latest date written so far) and rows on the watermark
+                        day whose key is not written yet, and "overwrite" replaces
+                        the partitions the rows fall into
+
+        Returns:
+            dict: Rows written per partition month
+        """
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode '{mode}', expected one of {WRITE_MODES}")
+        dates = pd.to_datetime(df[self.date_column])
+        watermark = self.manifest["watermark"]
+        if mode == "new" and watermark is not None:
+            days = dates.dt.normalize()
+            keep = days > pd.Timestamp(watermark)
+            same_day = days == pd.Timestamp(watermark)
+            if same_day.any():
+                # Rows dated on the watermark day may arrive in more than one write
+                if self.key_column not in df.columns:
+                    raise ValueError(f"'new' writes need the key column '{self.key_column}'")
+                written = self.read(start=watermark, end=watermark)
+                seen = written[self.key_column].astype(str) if not written.empty else pd.Series(dtype=str)
+                keep |= same_day & ~df[self.key_column].astype(str).isin(seen)
+            keep = keep.to_numpy()
+            df, dates = df[keep], dates[keep]
+        if df.empty:
+            return {}
+
+        written = {}
+        stale = []
+        months = dates.dt.strftime("%Y-%m")
+        for month, rows in df.groupby(months.to_numpy(), sort=True):
+            row_dates = dates.loc[rows.index]
+            partition_dir = self._partition_dir(month)
+            previous = self.manifest["partitions"].get(month)
+            if mode == "overwrite" or previous is None:
+                entry = {"files": [], "rows": 0, "min_date": None, "max_date": None}
+                # Replaced parts stay on disk, and listed, until the new manifest is saved
+                stale.extend(os.path.join(partition_dir, name) for name in (previous or {}).get("files", []))
+            else:
+                entry = previous
+
+            # Part numbers are never reused, so a new part never overwrites a listed one
+            os.makedirs(partition_dir, exist_ok=True)
+            part = f"part-{_next_part(previous):05d}.csv"
+            tmp_path = os.path.join(partition_dir, f".{part}.tmp")
+            rows.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, os.path.join(partition_dir, part))
+
+            first, last = row_dates.min().strftime("%Y-%m-%d"), row_dates.max().strftime("%Y-%m-%d")
+            entry["files"].append(part)
+            entry["rows"] += len(rows)
+            entry["min_date"] = min(filter(None, [entry["min_date"], first]))
+            entry["max_date"] = max(filter(None, [entry["max_date"], last]))
+            self.manifest["partitions"][month] = entry
+            written[month] = len(rows)
+
+        latest = dates.max().strftime("%Y-%m-%d")
+        self.manifest["watermark"] = max(filter(None, [watermark, latest]))
+        self._save_manifest()
+        for path in stale:
+            if os.path.exists(path):
+                os.remove(path)
+        return written
+
+    def partitions(self, start=None, end=None):
+        """Months whose date range overlaps [start, end], using only the manifest.
+
+        Args:
+            start (str, optional): First ISO date
+            end (str, optional): Last ISO date
+
+        Returns:
+            list: Partition months in order
+        """
+        return [month for month, entry in sorted(self.manifest["partitions"].items())
+                if (start is None or entry["max_date"] >= str(start))
+                and (end is None or entry["min_date"] <= str(end))]
+
+    def read(self, start=None, end=None):
+        """Read the rows dated within [start, end], opening only overlapping partitions.
+
+        Args:
+            start (str, optional): First ISO date
+            end (str, optional): Last ISO date
+
+        Returns:
+            pandas.DataFrame: Matching rows in partition order
+        """
+        frames = [pd.read_csv(os.path.join(self._partition_dir(month), part))
+                  for month in self.partitions(start, end)
+                  for part in self.manifest["partitions"][month]["files"]]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        dates = df[self.date_column].astype(str)
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= dates >= str(start)
+        if end is not None:
+            keep &= dates.str[:10] <= str(end)
+        return df[keep].reset_index(drop=True)
+
+    def stats(self):
+        """Return row count, partition count and date range of the dataset."""
+        partitions = self.manifest["partitions"]
+        return {
+            "partitions": len(partitions),
+            "rows": sum(entry["rows"] for entry in partitions.values()),
+            "min_date": min((entry["min_date"] for entry in partitions.values()), default=None),
+            "max_date": self.manifest["watermark"],
+        }
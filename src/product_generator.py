@@ -8,7 +8,7 @@ import pandas as pd
 import random
 import os
 from config import APPLE_VARIETIES, SHELF_LIVES, GRADES, UNITS_OF_MEASURE, DATA_DIR, get_output_path
-from data_utils import save_csv_data
+from data_utils import save_table
 
 def generate_apple_product_data(num_records=100):
     """Generates synthetic data for an apple product table.
@@ -42,18 +42,20 @@ def generate_apple_product_data(num_records=100):
 
     return pd.DataFrame(data)
 
-def save_product_data(df, filename="product_master.csv"):
-    """Save product data to a CSV file.
+def save_product_data(df, filename="product_master.csv", file_format="csv", compression="zstd"):
+    """Save product data to a CSV, Parquet or Arrow IPC file.
     
     Args:
         df (pandas.DataFrame): Product data to save
         filename (str): Name of the output file
+        file_format (str): "csv", "parquet" or "arrow" (Parquet and Arrow need pyarrow)
+        compression (str, optional): Codec for Parquet/Arrow output
         
     Returns:
         bool: True if saving was successful, False otherwise
     """
     output_path = get_output_path(filename)
-    return save_csv_data(df, output_path, "Error saving product data")
+    return save_table(df, output_path, file_format, compression, error_message="Error saving product data")
 
 if __name__ == "__main__":
     # When run as a script, generate and save product data
@@ -0,0 +1,204 @@
+"""
+Multi-year supply and demand projection module.
+
+This module builds dense year x month x variety (x customer) cubes of
+projected supply and demand. Per-variety growth rates are applied as one
+broadcast multiplication of compound growth factors, so long horizons
+cost a single array computation instead of a DataFrame copy per year.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import INV_MONTH_MAP
+
+
+def growth_factors(years, varieties, growth_rates=None, base_year=None):
+    """Compute compound growth factors for every year and variety.
+
+    Args:
+        years (list): Projection years
+        varieties (list): Variety names, defining the column order
+        growth_rates (dict, optional): Annual growth rate per variety (0.24 for 24%);
+                                       varieties without a rate do not grow
+        base_year (int, optional): Year with factor 1.0, defaults to the first year
+
+    Returns:
+        numpy.ndarray: Factors of shape (len(years), len(varieties))
+    """
+    years = np.asarray(years, dtype=np.int64)
+    base_year = int(years[0]) if base_year is None else int(base_year)
+    rates = np.array([(growth_rates or {}).get(v, 0.0) for v in varieties], dtype=np.float64)
+    return np.power(1.0 + rates[np.newaxis, :], (years - base_year)[:, np.newaxis])
+
+
+class ProjectionCube:
+    """Dense projected supply and demand indexed by year, month and variety.
+
+    Attributes:
+        years (numpy.ndarray): Projection years (consecutive)
+        varieties (list): Variety names along the variety axis
+        customers (list): (city, customer_id) pairs along the customer axis
+        supply (numpy.ndarray): Projected harvest, shape (years, 12, varieties)
+        demand (numpy.ndarray): Projected demand, shape (years, 12, varieties, customers)
+        supply_factors (numpy.ndarray): Supply growth factors, shape (years, varieties)
+        demand_factors (numpy.ndarray): Demand growth factors, shape (years, varieties)
+    """
+
+    def __init__(self, years, varieties, customers, supply, demand, supply_factors, demand_factors):
+        self.years = np.asarray(years, dtype=np.int64)
+        self.varieties = list(varieties)
+        self.customers = list(customers)
+        self.supply = supply
+        self.demand = demand
+        self.supply_factors = supply_factors
+        self.demand_factors = demand_factors
+        self.demand_totals = demand.sum(axis=3)
+        self._variety_index = {v: i for i, v in enumerate(self.varieties)}
+
+    def year_index(self, year):
+        """Return the position of a year on the year axis, or None if out of range."""
+        index = int(year) - int(self.years[0])
+        return index if 0 <= index < len(self.years) else None
+
+    def variety_codes(self, varieties):
+        """Map variety names to positions on the variety axis (-1 if unknown).
+
+        Args:
+            varieties (array-like): Variety names
+
+        Returns:
+            numpy.ndarray: Integer codes
+        """
+        return np.array([self._variety_index.get(v, -1) for v in varieties], dtype=np.int64)
+
+    def demand_for(self, year, month):
+        """Return projected total demand per variety for one calendar month.
+
+        Args:
+            year (int): Demand year
+            month (int): Demand month (1-12)
+
+        Returns:
+            dict: {variety: quantity} for varieties with positive demand
+        """
+        index = self.year_index(year)
+        if index is None:
+            return {}
+        row = self.demand_totals[index, month - 1]
+        return {self.varieties[i]: row[i].item() for i in np.flatnonzero(row > 0)}
+
+    def supply_scale(self, years, varieties):
+        """Growth factors for harvest lots, looked up element-wise.
+
+        Args:
+            years (array-like): Year of each lot
+            varieties (array-like): Variety of each lot
+
+        Returns:
+            numpy.ndarray: Factor per lot (1.0 for years or varieties outside the cube)
+        """
+        year_idx = np.asarray(years, dtype=np.int64) - int(self.years[0])
+        variety_idx = self.variety_codes(varieties)
+        valid = (year_idx >= 0) & (year_idx < len(self.years)) & (variety_idx >= 0)
+        scale = np.ones(len(year_idx), dtype=np.float64)
+        scale[valid] = self.supply_factors[year_idx[valid], variety_idx[valid]]
+        return scale
+
+    def to_frame(self, kind="demand"):
+        """Flatten the supply or demand cube into a long DataFrame.
+
+        Args:
+            kind (str): "supply" or "demand"
+
+        Returns:
+            pandas.DataFrame: One row per non-zero cell
+        """
+        if kind == "supply":
+            y, m, v = np.nonzero(self.supply)
+            return pd.DataFrame({
+                'Year': self.years[y],
+                'Month': [INV_MONTH_MAP[i + 1] for i in m],
+                'Apple Variety': np.asarray(self.varieties, dtype=object)[v],
+                'SupplyQuantity': self.supply[y, m, v],
+            })
+        if kind == "demand":
+            y, m, v, c = np.nonzero(self.demand)
+            customers = np.asarray([f"{city}|{cust}" for city, cust in self.customers], dtype=object)
+            city_customer = pd.Series(customers[c]).str.split("|", expand=True)
+            return pd.DataFrame({
+                'Year': self.years[y],
+                'Month': [INV_MONTH_MAP[i + 1] for i in m],
+                'Apple Variety': np.asarray(self.varieties, dtype=object)[v],
+                'city': city_customer[0].to_numpy(),
+                'customer_id': city_customer[1].to_numpy(),
+                'DemandQuantity': self.demand[y, m, v, c],
+            })
+        raise ValueError(f"Unknown cube kind: {kind}")
+
+
+def _project(base, factors, growth_rates):
+    """Broadcast base-year quantities (month, variety, ...) across the year axis.
+
+    Without growth rates the base quantities are repeated unchanged, so
+    integer inputs keep their dtype.
+    """
+    if not growth_rates:
+        return np.repeat(base[np.newaxis], len(factors), axis=0)
+    shape = (len(factors), 1, factors.shape[1]) + (1,) * (base.ndim - 2)
+    return factors.reshape(shape) * base[np.newaxis]
+
+
+def build_projection(df_harvest, df_demand_melted, years, supply_growth_rates=None,
+                     demand_growth_rates=None, base_year=None):
+    """Build projected supply and demand cubes over a range of years.
+
+    Args:
+        df_harvest (pandas.DataFrame): Processed harvest data (with HarvestMonthNum)
+        df_demand_melted (pandas.DataFrame): Melted demand data from prepare_demand_data
+        years (list): Years to cover; the cube spans min(years)..max(years)
+        supply_growth_rates (dict, optional): Annual supply growth rate per variety
+        demand_growth_rates (dict, optional): Annual demand growth rate per variety
+        base_year (int, optional): Year whose quantities equal the input data
+
+    Returns:
+        ProjectionCube: Projected supply and demand
+    """
+    years = np.arange(min(years), max(years) + 1, dtype=np.int64)
+    varieties = sorted(set(df_harvest['Apple Variety'].dropna()) |
+                       set(df_demand_melted['Apple Variety'].dropna()))
+    variety_index = {v: i for i, v in enumerate(varieties)}
+
+    # Base-year supply per month and variety
+    harvest = df_harvest.dropna(subset=['HarvestMonthNum', 'Apple Variety'])
+    supply_quantity = harvest['Harvest Quantity'].fillna(0).to_numpy()
+    base_supply = np.zeros((12, len(varieties)), dtype=supply_quantity.dtype)
+    np.add.at(
+        base_supply,
+        (harvest['HarvestMonthNum'].to_numpy(dtype=np.int64) - 1,
+         harvest['Apple Variety'].map(variety_index).to_numpy(dtype=np.int64)),
+        supply_quantity
+    )
+
+    # Base-year demand per month, variety and customer
+    demand = df_demand_melted.dropna(subset=['MonthNum', 'Apple Variety'])
+    customer_keys = pd.MultiIndex.from_frame(demand[['city', 'customer_id']])
+    customer_codes, customers = pd.factorize(customer_keys)
+    demand_quantity = demand['DemandQuantity'].fillna(0).to_numpy()
+    base_demand = np.zeros((12, len(varieties), len(customers)), dtype=demand_quantity.dtype)
+    np.add.at(
+        base_demand,
+        (demand['MonthNum'].to_numpy(dtype=np.int64) - 1,
+         demand['Apple Variety'].map(variety_index).to_numpy(dtype=np.int64),
+         customer_codes),
+        demand_quantity
+    )
+
+    supply_factors = growth_factors(years, varieties, supply_growth_rates, base_year)
+    demand_factors = growth_factors(years, varieties, demand_growth_rates, base_year)
+
+    supply = _project(base_supply, supply_factors, supply_growth_rates)
+    demand_cube = _project(base_demand, demand_factors, demand_growth_rates)
+
+    return ProjectionCube(years, varieties, list(customers), supply, demand_cube,
+                          supply_factors, demand_factors)
@@ -0,0 +1,216 @@
+"""
+Disk-backed cache of simulation results.
+
+Purchase order tables are stored in a local directory under a key that
+hashes the harvest and demand content, the run parameters, the engine
+version and the config tables the engine reads (ports, routes, varieties
+and months), so identical runs return the stored table without running the
+engine. The directory is bounded in size: when it grows past its limit
+the least recently used entries are evicted. Hit, miss and eviction
+counts are kept both for the current session and across runs.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, MONTH_MAP, PORT_ROUTE_MAP, VARIETY_MAP, WAYPOINTS
+from simulation import ENGINE_VERSION
+
+INDEX_FILE = "index.json"
+
+# Config tables the engine's output depends on; editing one invalidates cached results
+ENGINE_SETTINGS = {
+    'country_port_map': COUNTRY_PORT_MAP,
+    'month_map': MONTH_MAP,
+    'port_route_map': PORT_ROUTE_MAP,
+    'variety_map': VARIETY_MAP,
+    'waypoints': WAYPOINTS,
+}
+
+
+def frame_digest(df):
+    """Hash the content of a DataFrame (columns, dtypes and values).
+
+    Args:
+        df (pandas.DataFrame): DataFrame to hash
+
+    Returns:
+        str: Hex digest of the DataFrame content
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(json.dumps([str(t) for t in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(df_harvest, df_demand, params):
+    """Build the cache key for a simulation run.
+
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        df_demand (pandas.DataFrame): Raw demand data
+        params (dict): Run parameters (years, lead time, growth rates)
+
+    Returns:
+        str: Hex cache key
+    """
+    digest = hashlib.sha256()
+    digest.update(ENGINE_VERSION.encode())
+    digest.update(json.dumps(ENGINE_SETTINGS, sort_keys=True, default=str).encode())
+    digest.update(frame_digest(df_harvest).encode())
+    digest.update(frame_digest(df_demand).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of purchase order tables on disk.
+
+    Args:
+        cache_dir (str): Directory holding the cached tables and the index
+        max_bytes (int): Maximum total size of cached tables
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.session = {"hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, INDEX_FILE)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        """Read the index of entries and lifetime statistics, starting fresh if it is unreadable."""
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            if index.get("engine_version") == ENGINE_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"engine_version": ENGINE_VERSION, "entries": {},
+                "stats": {"hits": 0, "misses": 0, "evictions": 0}}
+
+    def _save_index(self):
+        """Write the index atomically."""
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self._index_path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.csv")
+
+    def _record(self, event, amount=1):
+        self.session[event] += amount
+        self._index["stats"][event] += amount
+
+    def get(self, key):
+        """Return the cached purchase orders for a key.
+
+        Args:
+            key (str): Cache key from result_key
+
+        Returns:
+            pandas.DataFrame: Cached purchase orders, or None on a miss
+        """
+        entry = self._index["entries"].get(key)
+        path = self._entry_path(key)
+        if entry is None or not os.path.exists(path):
+            self._index["entries"].pop(key, None)
+            self._record("misses")
+            self._save_index()
+            return None
+
+        try:
+            po_df = pd.read_csv(path)
+        except Exception as e:
+            print(f"Warning: discarding unreadable cache entry {key}: {e}")
+            self._index["entries"].pop(key, None)
+            self._record("misses")
+            self._save_index()
+            return None
+
+        entry["last_access"] = time.time()
+        entry["hits"] = entry.get("hits", 0) + 1
+        self._record("hits")
+        self._save_index()
+        return po_df
+
+    def put(self, key, po_df, params=None):
+        """Store purchase orders under a key and evict old entries past the size limit.
+
+        Args:
+            key (str): Cache key from result_key
+            po_df (pandas.DataFrame): Purchase orders to store
+            params (dict, optional): Run parameters recorded with the entry
+
+        Returns:
+            bool: True if the entry was stored, False otherwise
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            po_df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Warning: could not store cache entry {key}: {e}")
+            return False
+
+        now = time.time()
+        self._index["entries"][key] = {
+            "size": os.path.getsize(path),
+            "created": now,
+            "last_access": now,
+            "hits": 0,
+            "params": params or {},
+        }
+        self._evict(keep=key)
+        self._save_index()
+        return True
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self._index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries.pop(key)["size"]
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            self._record("evictions")
+
+    def stats(self):
+        """Return cache statistics for this session and over the cache's lifetime.
+
+        Returns:
+            dict: Session and lifetime hit/miss/eviction counts, entry count and size
+        """
+        entries = self._index["entries"]
+        return {
+            "session": dict(self.session),
+            "lifetime": dict(self._index["stats"]),
+            "entries": len(entries),
+            "size_bytes": sum(entry["size"] for entry in entries.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+    def report(self):
+        """Print a one-line summary of the cache statistics."""
+        stats = self.stats()
+        session, lifetime = stats["session"], stats["lifetime"]
+        print(f"Result cache: {session['hits']} hit(s), {session['misses']} miss(es), "
+              f"{session['evictions']} eviction(s) this run; "
+              f"lifetime {lifetime['hits']}/{lifetime['misses']}/{lifetime['evictions']} "
+              f"(hits/misses/evictions); {stats['entries']} entries, "
+              f"{stats['size_bytes'] / (1024 * 1024):.2f} of {self.max_bytes / (1024 * 1024):.1f} MB")
@@ -0,0 +1,189 @@
+"""
+Precomputed rollup cube over purchase order output.
+
+POs are aggregated once into a dense day x supplier x variety array of
+ordered quantity and PO count, stored as prefix sums along the day axis.
+The total over any date range is then a difference of two prefix rows,
+O(1) per cell, and drill-down by supplier, country or variety touches
+only the k cells selected. Weekly, monthly and quarterly rollups are the
+same differences taken at period boundaries. Countries are not a
+separate axis: each supplier belongs to one country, so a country is a
+set of supplier slices.
+
+The cube is saved as <PO file>_cube.npz next to the PO table, so
+dashboards load it instead of rescanning raw POs.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ("QuantityOrdered", "PurchaseOrders")
+DIMENSIONS = ("SupplierID", "Country", "AppleVariety")
+
+
+class RollupCube:
+    """Prefix-summed PO aggregates by day, supplier and variety.
+
+    Attributes:
+        start (numpy.datetime64): First day on the time axis
+        suppliers (list): Supplier IDs along the supplier axis
+        countries (list): Country of each supplier
+        varieties (list): Varieties along the variety axis
+        prefix (numpy.ndarray): Cumulative sums, shape (days + 1, suppliers, varieties, measures);
+                                row d holds the totals of all days before start + d
+        date_column (str): PO column the time axis was built from
+    """
+
+    def __init__(self, start, suppliers, countries, varieties, prefix, date_column="OrderDate"):
+        self.start = np.datetime64(start, 'D')
+        self.suppliers = list(suppliers)
+        self.countries = list(countries)
+        self.varieties = list(varieties)
+        self.prefix = prefix
+        self.date_column = date_column
+
+    @classmethod
+    def from_purchase_orders(cls, po_df, date_column="OrderDate"):
+        """Aggregate a purchase order table into a cube in one pass.
+
+        Args:
+            po_df (pandas.DataFrame): Purchase orders with SupplierID, Country, AppleVariety,
+                                      QuantityOrdered and the date column
+            date_column (str): Date column to use as the time axis
+
+        Returns:
+            RollupCube: Cube over the date range of the POs
+        """
+        days = pd.to_datetime(po_df[date_column]).to_numpy().astype('datetime64[D]')
+        start = days.min()
+        day_index = (days - start).astype(np.int64)
+        supplier_codes, suppliers = pd.factorize(po_df['SupplierID'], sort=True)
+        variety_codes, varieties = pd.factorize(po_df['AppleVariety'], sort=True)
+        countries = (po_df.drop_duplicates('SupplierID').set_index('SupplierID')['Country']
+                     .reindex(suppliers).tolist())
+
+        cells = np.zeros((int(day_index.max()) + 2, len(suppliers), len(varieties), len(MEASURES)))
+        index = (day_index + 1, supplier_codes, variety_codes)
+        np.add.at(cells[..., 0], index, po_df['QuantityOrdered'].to_numpy(dtype=np.float64))
+        np.add.at(cells[..., 1], index, 1.0)
+        return cls(start, suppliers, countries, varieties, np.cumsum(cells, axis=0), date_column)
+
+    @property
+    def end(self):
+        """numpy.datetime64: Last day on the time axis."""
+        return self.start + (len(self.prefix) - 2)
+
+    def _day_bounds(self, dates, upper=False):
+        """Prefix rows for dates, clipped to the cube; upper bounds include their day."""
+        days = np.asarray(pd.to_datetime(dates).to_numpy().astype('datetime64[D]') - self.start, dtype=np.int64)
+        return np.clip(days + (1 if upper else 0), 0, len(self.prefix) - 1)
+
+    def _row(self, date, upper=False):
+        """Prefix row for a single date without going through pandas."""
+        day = int((np.datetime64(date, 'D') - self.start).astype(np.int64)) + (1 if upper else 0)
+        return min(max(day, 0), len(self.prefix) - 1)
+
+    def _selection(self, SupplierID=None, Country=None, AppleVariety=None):
+        """Index arrays of the supplier and variety slices matching the filters."""
+        def pick(labels, value):
+            if value is None:
+                return np.arange(len(labels))
+            values = [value] if isinstance(value, str) else list(value)
+            return np.flatnonzero(np.isin(np.asarray(labels, dtype=object), values))
+
+        suppliers = pick(self.suppliers, SupplierID)
+        if Country is not None:
+            suppliers = np.intersect1d(suppliers, pick(self.countries, Country))
+        return suppliers, pick(self.varieties, AppleVariety)
+
+    def total(self, start=None, end=None, measure="QuantityOrdered", **filters):
+        """Total of a measure over an inclusive date range, optionally filtered.
+
+        Args:
+            start (str or datetime, optional): First day, defaults to the start of the cube
+            end (str or datetime, optional): Last day, defaults to the end of the cube
+            measure (str): "QuantityOrdered" or "PurchaseOrders"
+            **filters: SupplierID, Country and/or AppleVariety, each a value or list of values
+
+        Returns:
+            float: Total over the range and selection
+        """
+        lo = 0 if start is None else self._row(start)
+        hi = len(self.prefix) - 1 if end is None else self._row(end, upper=True)
+        if hi <= lo:
+            return 0.0
+        suppliers, varieties = self._selection(**filters)
+        m = MEASURES.index(measure)
+        window = self.prefix[hi, :, :, m] - self.prefix[lo, :, :, m]
+        return float(window[np.ix_(suppliers, varieties)].sum())
+
+    def rollup(self, freq="M", by=(), measure="QuantityOrdered", start=None, end=None, **filters):
+        """Totals per period and per value of the drill-down dimensions.
+
+        Args:
+            freq (str): Pandas period frequency: "D", "W", "M", "Q" or "Y"
+            by (tuple): Dimensions to drill down by, from DIMENSIONS
+            measure (str): "QuantityOrdered" or "PurchaseOrders"
+            start (str or datetime, optional): First day, defaults to the start of the cube
+            end (str or datetime, optional): Last day, defaults to the end of the cube
+            **filters: SupplierID, Country and/or AppleVariety to restrict to
+
+        Returns:
+            pandas.DataFrame: One row per period and dimension value with the measure total
+        """
+        unknown = set(by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+        first = pd.Timestamp(start if start is not None else self.start)
+        last = pd.Timestamp(end if end is not None else self.end)
+        periods = pd.period_range(first, last, freq=freq)
+        lo = self._day_bounds(np.maximum(periods.start_time.normalize(), first))
+        hi = self._day_bounds(np.minimum(periods.end_time.normalize(), last), upper=True)
+
+        suppliers, varieties = self._selection(**filters)
+        m = MEASURES.index(measure)
+        cells = (self.prefix[hi, :, :, m] - self.prefix[lo, :, :, m])[:, suppliers][:, :, varieties]
+
+        # Collapse the selected cells onto the drill-down dimensions
+        labels = {'SupplierID': np.asarray(self.suppliers, dtype=object)[suppliers],
+                  'Country': np.asarray(self.countries, dtype=object)[suppliers],
+                  'AppleVariety': np.asarray(self.varieties, dtype=object)[varieties]}
+        frame = pd.DataFrame({
+            'Period': np.repeat(periods.astype(str), len(suppliers) * len(varieties)),
+            'SupplierID': np.tile(np.repeat(labels['SupplierID'], len(varieties)), len(periods)),
+            'Country': np.tile(np.repeat(labels['Country'], len(varieties)), len(periods)),
+            'AppleVariety': np.tile(labels['AppleVariety'], len(periods) * len(suppliers)),
+            measure: cells.ravel(),
+        })
+        return frame.groupby(['Period', *by], as_index=False, sort=True)[measure].sum()
+
+    def save(self, path):
+        """Write the cube to an .npz file.
+
+        Args:
+            path (str): Output path
+        """
+        np.savez(path, prefix=self.prefix, start=np.array(str(self.start)),
+                 suppliers=np.array(self.suppliers, dtype=str), countries=np.array(self.countries, dtype=str),
+                 varieties=np.array(self.varieties, dtype=str), date_column=np.array(self.date_column))
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by save.
+
+        Args:
+            path (str): Path of the .npz file
+
+        Returns:
+            RollupCube: The stored cube
+        """
+        with np.load(path) as data:
+            return cls(str(data['start']), data['suppliers'].tolist(), data['countries'].tolist(),
+                       data['varieties'].tolist(), data['prefix'], str(data['date_column']))
+
+
+def cube_path(po_path):
+    """Return the cube file stored next to a purchase order file."""
+    return f"{os.path.splitext(po_path)[0]}_cube.npz"
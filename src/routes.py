@@ -0,0 +1,124 @@
+"""
+Great-circle route geometry for shipping lanes.
+
+Routes are polylines of (latitude, longitude) waypoints, as in
+config.WAYPOINTS. Every set of routes is packed into one NaN-padded
+array, so the haversine distance of every leg of every route is computed
+in a single NumPy pass; thousands of candidate routes (for example
+detours around a closed canal) cost no more Python than one. Results are
+cached per waypoint-set hash, so repeated lookups of the same geometry
+are free.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, PORT_ROUTE_MAP, WAYPOINTS
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Route distances keyed by the hash of their waypoint set
+_distance_cache = {}
+
+
+def pack_routes(routes):
+    """Pack waypoint lists into one array padded with NaN.
+
+    Args:
+        routes (list): Waypoint lists, each a sequence of (latitude, longitude)
+
+    Returns:
+        numpy.ndarray: Coordinates in degrees, shape (routes, max waypoints, 2)
+    """
+    longest = max((len(r) for r in routes), default=0)
+    packed = np.full((len(routes), longest, 2), np.nan)
+    for i, waypoints in enumerate(routes):
+        if len(waypoints):
+            packed[i, :len(waypoints)] = waypoints
+    return packed
+
+
+def leg_distances(packed):
+    """Haversine distance of every leg of every route.
+
+    Args:
+        packed (numpy.ndarray): Coordinates from pack_routes, shape (routes, waypoints, 2)
+
+    Returns:
+        numpy.ndarray: Leg distances in km, shape (routes, waypoints - 1); NaN past a route's end
+    """
+    radians = np.radians(packed)
+    lat, lon = radians[..., 0], radians[..., 1]
+    dlat = np.diff(lat, axis=1)
+    dlon = np.diff(lon, axis=1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, :-1]) * np.cos(lat[:, 1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def waypoint_hash(waypoints):
+    """Return a stable digest of a waypoint list."""
+    return hashlib.sha1(np.asarray(waypoints, dtype=np.float64).tobytes()).hexdigest()
+
+
+def route_distances(routes=None):
+    """Total great-circle distance of each route, computed in one vectorized pass.
+
+    Only routes whose waypoint set has not been seen before are computed;
+    the rest come from the cache.
+
+    Args:
+        routes (dict or list, optional): Route name -> waypoints, or a list of
+                                         waypoint lists; defaults to config.WAYPOINTS
+
+    Returns:
+        pandas.Series: Distance in km per route name (or position for a list)
+    """
+    routes = WAYPOINTS if routes is None else routes
+    names = list(routes) if isinstance(routes, dict) else list(range(len(routes)))
+    waypoint_sets = list(routes.values()) if isinstance(routes, dict) else list(routes)
+
+    keys = [waypoint_hash(w) for w in waypoint_sets]
+    missing = {}
+    for key, waypoints in zip(keys, waypoint_sets):
+        if key not in _distance_cache:
+            missing.setdefault(key, waypoints)
+    if missing:
+        totals = np.nansum(leg_distances(pack_routes(list(missing.values()))), axis=1)
+        _distance_cache.update(zip(missing, totals.tolist()))
+
+    return pd.Series([_distance_cache[key] for key in keys], index=names, name='DistanceKm', dtype=np.float64)
+
+
+def route_legs(waypoints):
+    """Distance of each leg of one route.
+
+    Args:
+        waypoints (list): Sequence of (latitude, longitude)
+
+    Returns:
+        numpy.ndarray: Leg distances in km
+    """
+    return leg_distances(pack_routes([waypoints]))[0]
+
+
+def port_distances(ports=None, routes=None):
+    """Distance from each origin port to Rotterdam along its route.
+
+    Args:
+        ports (list, optional): Origin port names, defaults to the ports in COUNTRY_PORT_MAP
+        routes (dict, optional): Route name -> waypoints, defaults to config.WAYPOINTS
+
+    Returns:
+        pandas.Series: Distance in km per port (NaN for ports without a route)
+    """
+    ports = list(COUNTRY_PORT_MAP.values()) if ports is None else list(ports)
+    distances = route_distances(routes)
+    return pd.Series([distances.get(PORT_ROUTE_MAP.get(p), np.nan) for p in ports],
+                     index=ports, name='DistanceKm', dtype=np.float64)
+
+
+def clear_cache():
+    """Forget all cached route distances."""
+    _distance_cache.clear()
@@ -0,0 +1,140 @@
+"""
+Schema registry for the CSV datasets listed in csv_column_headers.txt.
+
+Each schema declares the canonical column names the code uses, their
+dtypes (categorical for low-cardinality keys), the date format of date
+columns and the aliases under which columns appear in files. Files name
+the same column in several ways ('Harvest Quantity(million metrictons)',
+'royal_gala(metrictons)', 'ShipmentPort'), so besides explicit aliases a
+header matches a canonical column when both agree after dropping unit
+suffixes in parentheses, case, spaces and underscores.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict
+
+import pandas as pd
+
+from config import VARIETY_MAP
+
+# Categories come from the data: a fixed category list would turn unlisted varieties
+# and misspelt months into NaN, hiding them from validation.py
+VARIETY_DTYPE = 'category'
+MONTH_DTYPE = 'category'
+VARIETY_COLUMNS = list(VARIETY_MAP)
+# Input quantities are parsed as text so one bad cell is reported by validation.py
+# instead of failing the whole load; prepare_harvest_data/prepare_demand_data convert them
+QUANTITY_DTYPE = 'str'
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Declared layout of one CSV dataset.
+
+    Attributes:
+        name (str): Dataset name as in csv_column_headers.txt
+        columns (dict): Canonical column name -> dtype
+        dates (dict): Date column -> strptime format
+        aliases (dict): Header in files -> canonical column name, for headers the
+                        normalised match does not cover
+    """
+
+    name: str
+    columns: Dict[str, object]
+    dates: Dict[str, str] = field(default_factory=dict)
+    aliases: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def categoricals(self):
+        """list: Columns stored as pandas categoricals."""
+        return [c for c, t in self.columns.items() if isinstance(t, pd.CategoricalDtype) or t == 'category']
+
+    def resolve(self, header):
+        """Map file headers to canonical column names.
+
+        Args:
+            header (list): Column names as they appear in the file
+
+        Returns:
+            dict: File header -> canonical name, for every recognised header
+        """
+        canonical = {normalize_name(c): c for c in self.columns}
+        mapping = {}
+        for column in header:
+            name = self.aliases.get(column) or canonical.get(normalize_name(column))
+            if name is not None:
+                mapping[column] = name
+        return mapping
+
+
+def normalize_name(column):
+    """Reduce a column header to a key for matching: no units, case, spaces or underscores."""
+    return re.sub(r'[^a-z0-9]', '', re.sub(r'\(.*?\)', '', str(column)).lower())
+
+
+SCHEMAS = {schema.name: schema for schema in [
+    Schema('Supplier_Master', {
+        'SupplierID': 'category', 'Country': 'category', 'Company': 'str', 'Address': 'str',
+        'Shipment Port': 'category', 'Website': 'str', 'Email': 'str', 'Phone': 'str',
+    }),
+    Schema('Harvest_By_Supplier', {
+        'SupplierID': 'category', 'Country': 'category', 'Apple Variety': VARIETY_DTYPE,
+        'Harvest Month': MONTH_DTYPE, 'Harvest Quantity': QUANTITY_DTYPE,
+    }),
+    Schema('Products', {
+        'SKUID': 'str', 'Name': 'category', 'ShelfLife': 'int64', 'Grade': 'category',
+        'UnitOfMeasure': 'category',
+    }),
+    Schema('CustomerMaster', {
+        'customer_id': 'category', 'warehouse_id': 'str', 'supermarket_chain': 'category',
+        'city': 'category', 'warehouse_name': 'str', 'address': 'str',
+    }),
+    Schema('CustomerDemand', {
+        'city': 'category', 'customer_id': 'category', 'month': MONTH_DTYPE,
+        **dict.fromkeys(VARIETY_COLUMNS, QUANTITY_DTYPE), 'total': QUANTITY_DTYPE,
+    }),
+    Schema('WarehouseMaster', {
+        'WarehouseID': 'str', 'Name_of_Storage_Facility': 'str', 'Address': 'str',
+        'Total_Energy_Consumed_per_Day': 'str', 'Backup_Energy_per_Day': 'str',
+        'Total_Capacity_Tonnage': 'str', 'Solar_Generation_Capacity': 'str',
+    }),
+    Schema('EnergyConsumption', {
+        'Origin Port': 'str', 'Destination Port': 'category', 'Approximate Distance (km)': 'float64',
+        'Average Energy Consumption (kWh)': 'float64', 'Average Cost (EUR)': 'float64',
+        'Average Shipping Time (Days)': 'float64',
+    }, aliases={
+        'AverageEnergyConsumption(kWh)/ton-km': 'Average Energy Consumption (kWh)',
+        'AverageCost(EUR)/Ton': 'Average Cost (EUR)',
+    }),
+    Schema('Order', {
+        'PO_ID': 'str', 'OrderDate': 'str', 'SupplierID': 'category', 'Country': 'category',
+        'AppleVariety': VARIETY_DTYPE, 'QuantityOrdered': 'float64', 'HarvestMonth': MONTH_DTYPE,
+        'HarvestYear': 'int64', 'ExpectedArrivalDate': 'str', 'DemandMonthTarget': 'str',
+        'SourceHarvestID': 'str',
+    }, dates={'OrderDate': '%Y-%m-%d', 'ExpectedArrivalDate': '%Y-%m-%d', 'DemandMonthTarget': '%Y-%m'}),
+    Schema('Delivery', {
+        'DEL_ID': 'str', 'PO_ID': 'str', 'OrderDate': 'str', 'SupplierID': 'category',
+        'Country': 'category', 'AppleVariety': VARIETY_DTYPE, 'QuantityOrdered(metrictons)': 'float64',
+        'QuantityDelivered(metrictons)': 'float64', 'ExpectedDeliveryDate': 'str',
+        'ActualDeliveryDate': 'str', 'DeliveryNote': 'str', 'Distance_km': 'float64',
+        'CO2_Emissions_kg': 'float64', 'OrderedQty(in pallets)': 'float64', 'DeliveredQty(in pallets)': 'float64',
+    }, dates={'OrderDate': '%d/%m/%y', 'ExpectedDeliveryDate': '%d/%m/%y', 'ActualDeliveryDate': '%d/%m/%y'}),
+]}
+
+
+def get_schema(name):
+    """Return a registered schema by dataset name.
+
+    Args:
+        name (str): Dataset name, e.g. "Harvest_By_Supplier"
+
+    Returns:
+        Schema: The registered schema
+
+    Raises:
+        ValueError: If no schema is registered under that name
+    """
+    if name not in SCHEMAS:
+        raise ValueError(f"Unknown dataset schema '{name}', expected one of {sorted(SCHEMAS)}")
+    return SCHEMAS[name]
@@ -4,20 +4,43 @@ Supply chain simulation module.
 This module contains the core simulation logic for the apple supply chain.
 """
 
+import numpy as np
 import pandas as pd
 import random
 import os
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-from config import INV_MONTH_MAP, MONTH_MAP, VARIETY_MAP, COUNTRY_PORT_MAP, PLANNING_LEAD_TIME, get_output_path
-from data_utils import validate_dataframe, save_csv_data, load_from_string
+from config import (INV_MONTH_MAP, MONTH_MAP, VARIETY_MAP, COUNTRY_PORT_MAP, PLANNING_LEAD_TIME, DATA_DIR,
+                    CO2_PER_TON_KM, get_output_path)
+from data_utils import validate_dataframe, save_csv_data, save_table, load_from_string, load_csv_data
+from instrumentation import NULL_PROFILER
+from projection import build_projection
+from port_queue import port_delays
+from routes import port_distances
+from rollup_cube import RollupCube, cube_path
+from validation import (validate_harvest, validate_demand, has_errors, print_validation_report,
+                        demand_varieties, quantity_columns)
 
-def prepare_harvest_data(df_harvest):
+# Columns partitioned Parquet/Arrow purchase order output is split by
+PO_PARTITION_COLS = ['OrderYear', 'AppleVariety']
+
+# Version of the engine's output; bump whenever a change alters the purchase orders produced
+ENGINE_VERSION = "2"
+
+def _to_quantity(values):
+    """Convert a validated quantity column to numbers, leaving numeric columns as they are."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    return pd.to_numeric(values, errors='coerce').astype('float64')
+
+def prepare_harvest_data(df_harvest, varieties=None, verbose=True):
     """Prepare harvest data for simulation.
     
     Args:
-        df_harvest (pandas.DataFrame): Raw harvest data
+        df_harvest (pandas.DataFrame): Raw harvest data, left unchanged
+        varieties (iterable, optional): Varieties the demand data names, for the variety check
+        verbose (bool): Whether to print the validation report
         
     Returns:
         pandas.DataFrame: Processed harvest data
@@ -26,9 +49,17 @@ def prepare_harvest_data(df_harvest):
     required_columns = ['SupplierID', 'Country', 'Apple Variety', 'Harvest Month', 'Harvest Quantity']
     if not validate_dataframe(df_harvest, required_columns, "Harvest data"):
         return None
+    errors = validate_harvest(df_harvest, varieties)
+    print_validation_report(errors, "Harvest data", log=print if verbose else _quiet)
+    if has_errors(errors):
+        return None
+    df_harvest = df_harvest.copy()
+    
+    # Schema-typed loads keep quantities as text until they are validated
+    df_harvest['Harvest Quantity'] = _to_quantity(df_harvest['Harvest Quantity'])
     
     # Add numeric month column
-    df_harvest['HarvestMonthNum'] = df_harvest['Harvest Month'].map(MONTH_MAP)
+    df_harvest['HarvestMonthNum'] = df_harvest['Harvest Month'].astype(object).map(MONTH_MAP)
     
     # Map shipping times to countries
     df_shipping = load_shipping_data()
@@ -38,33 +69,47 @@ def prepare_harvest_data(df_harvest):
     
     return df_harvest
 
-def prepare_demand_data(df_demand):
+def prepare_demand_data(df_demand, varieties=None, verbose=True):
     """Prepare demand data for simulation.
     
     Args:
-        df_demand (pandas.DataFrame): Raw demand data
+        df_demand (pandas.DataFrame): Raw demand data, left unchanged
+        varieties (iterable, optional): Apple varieties present in the harvest data
+        verbose (bool): Whether to print the validation report
         
     Returns:
         pandas.DataFrame: Processed demand data and demand dictionary
     """
     # Validate input
-    required_columns = ['month', 'royal_gala', 'fuji', 'granny_smith', 'golden_delicious', 'pink_lady']
+    required_columns = ['city', 'customer_id', 'month']
     if not validate_dataframe(df_demand, required_columns, "Demand data"):
         return None, None
+    errors = validate_demand(df_demand, varieties)
+    print_validation_report(errors, "Demand data", log=print if verbose else _quiet)
+    if has_errors(errors):
+        return None, None
+    
+    # VARIETY_MAP columns and columns named after a harvest variety hold quantities
+    id_columns = ['city', 'customer_id', 'month', 'MonthNum']
+    variety_columns = quantity_columns(df_demand, varieties)
+    df_demand = pd.concat([df_demand[['city', 'customer_id', 'month']],
+                           df_demand[variety_columns].apply(_to_quantity)], axis=1)
     
     # Add numeric month column
-    df_demand['MonthNum'] = df_demand['month'].map(MONTH_MAP)
+    df_demand['MonthNum'] = df_demand['month'].astype(object).map(MONTH_MAP)
     
     # Melt demand data for easier aggregation
     df_demand_melted = df_demand.melt(
-        id_vars=['city', 'customer_id', 'month', 'MonthNum'],
-        value_vars=['royal_gala', 'fuji', 'granny_smith', 'golden_delicious', 'pink_lady'],
+        id_vars=id_columns,
+        value_vars=variety_columns,
         var_name='Apple Variety',
         value_name='DemandQuantity'
     )
     
-    # Map apple variety names to match harvest data format
-    df_demand_melted['Apple Variety'] = df_demand_melted['Apple Variety'].map(VARIETY_MAP)
+    # Map apple variety names to match harvest data format (unknown varieties keep their column name)
+    df_demand_melted['Apple Variety'] = df_demand_melted['Apple Variety'].map(
+        lambda column: VARIETY_MAP.get(column, column)
+    )
     
     # Calculate total demand per variety per month
     monthly_demand = df_demand_melted.groupby(['MonthNum', 'Apple Variety'])['DemandQuantity'].sum().reset_index()
@@ -76,24 +121,39 @@ def prepare_demand_data(df_demand):
 def load_shipping_data():
     """Load and prepare shipping data.
     
+    Route distances are computed from the waypoints in config.WAYPOINTS;
+    the hand-entered figure is kept only for ports without a route.
+    
     Returns:
         pandas.DataFrame: Processed shipping data
     """
     # Sample shipping data (hardcoded for now, could be loaded from a file)
     shipping_csv = """Origin Port,Destination Port,Approximate Distance (km),Average Energy Consumption (kWh),Average Cost (EUR),Average Shipping Time (Days)
-    Jawaharlal Nehru Port Sheva Navi Mumbai,Albert Plesmanweg 240 Rotterdam,21700,325.5,534,30
-    Port of Cape Town,Albert Plesmanweg 240 Rotterdam,11100,166.5,250,25
-    Port of San Antonio,Albert Plesmanweg 240 Rotterdam,13900,208.5,702,26
-    Ports of Auckland,Albert Plesmanweg 240 Rotterdam,17600,264.0,860,58"""
+Jawaharlal Nehru Port Sheva Navi Mumbai,Albert Plesmanweg 240 Rotterdam,21700,325.5,534,30
+Port of Cape Town,Albert Plesmanweg 240 Rotterdam,11100,166.5,250,25
+Port of San Antonio,Albert Plesmanweg 240 Rotterdam,13900,208.5,702,26
+Ports of Auckland,Albert Plesmanweg 240 Rotterdam,17600,264.0,860,58"""
     
-    return load_from_string(shipping_csv)
+    df_shipping = load_from_string(shipping_csv)
+    if df_shipping is not None:
+        distances = port_distances(df_shipping['Origin Port']).to_numpy()
+        df_shipping['Approximate Distance (km)'] = np.where(
+            np.isnan(distances), df_shipping['Approximate Distance (km)'], np.round(distances, 1)
+        )
+    return df_shipping
 
-def create_available_supply_pool(df_harvest, simulation_years):
+def create_available_supply_pool(df_harvest, simulation_years, profiler=None, projection=None):
     """Create available supply pool for the simulation.
     
+    The harvest table is tiled once for all years instead of being copied
+    per year, and harvest IDs are built with vectorized string operations.
+    
     Args:
         df_harvest (pandas.DataFrame): Processed harvest data
         simulation_years (list): List of years to simulate
+        profiler (PhaseProfiler, optional): Profiler collecting counters
+        projection (ProjectionCube, optional): Projection whose supply growth
+                                               factors scale each year's harvest
         
     Returns:
         pandas.DataFrame: Available harvest data with quantities
@@ -102,91 +162,261 @@ def create_available_supply_pool(df_harvest, simulation_years):
     if df_harvest is None:
         return None
     
-    available_harvest_list = []
+    profiler = profiler or NULL_PROFILER
+    num_rows = len(df_harvest)
+    years = np.asarray(simulation_years, dtype=np.int64)
     
-    for year in simulation_years:
-        df_year_harvest = df_harvest.copy()
-        df_year_harvest['Year'] = year
-        df_year_harvest['AvailableQuantity'] = df_year_harvest['Harvest Quantity']
-        # Create a unique harvest identifier
-        df_year_harvest['HarvestID'] = df_year_harvest.apply(
-            lambda row: f"{row['SupplierID']}_{row['Apple Variety']}_{row['HarvestMonthNum']}_{row['Year']}", axis=1
+    available_harvest = df_harvest.iloc[np.tile(np.arange(num_rows), len(years))].reset_index(drop=True)
+    profiler.count('rows_copied', len(available_harvest))
+    available_harvest['Year'] = np.repeat(years, num_rows)
+    if projection is not None:
+        available_harvest['Harvest Quantity'] = available_harvest['Harvest Quantity'] * projection.supply_scale(
+            available_harvest['Year'], available_harvest['Apple Variety']
         )
-        available_harvest_list.append(df_year_harvest)
-
-    available_harvest = pd.concat(available_harvest_list, ignore_index=True)
+    available_harvest['AvailableQuantity'] = available_harvest['Harvest Quantity']
+    # Create a unique harvest identifier
+    available_harvest['HarvestID'] = (
+        available_harvest['SupplierID'].astype(str) + '_' +
+        available_harvest['Apple Variety'].astype(str) + '_' +
+        available_harvest['HarvestMonthNum'].astype(str) + '_' +
+        available_harvest['Year'].astype(str)
+    )
     available_harvest = available_harvest.set_index('HarvestID', drop=False)  # Set index for easy lookup and update
     
     return available_harvest
 
-def run_supply_chain_simulation(df_harvest, df_demand, simulation_years=[2021], planning_lead_time=None):
-    """Run the supply chain simulation.
+def sourcing_attributes(df_delivery=None):
+    """Per-country route cost and CO2 per metric ton used to rank sourcing options.
+    
+    CO2 per ton comes from delivery history where a country has deliveries,
+    and from the history's average CO2 per ton-kilometre times the route
+    distance otherwise. Without usable delivery history every country falls
+    back to config.CO2_PER_TON_KM times its route distance, so CO2 scores
+    still rank the routes.
+    
+    Args:
+        df_delivery (pandas.DataFrame, optional): Delivery history, defaults to data/delivery.csv
+        
+    Returns:
+        pandas.DataFrame: RouteCostEUR, DistanceKm and CO2PerTonKg indexed by Country
+    """
+    df_shipping = load_shipping_data().set_index('Origin Port')
+    countries = pd.Index(list(COUNTRY_PORT_MAP), name='Country')
+    ports = [COUNTRY_PORT_MAP[c] for c in countries]
+    sourcing = pd.DataFrame({
+        'RouteCostEUR': df_shipping.loc[ports, 'Average Cost (EUR)'].to_numpy(),
+        'DistanceKm': df_shipping.loc[ports, 'Approximate Distance (km)'].to_numpy(),
+    }, index=countries)
+    
+    if df_delivery is None:
+        df_delivery = load_csv_data(os.path.join(DATA_DIR, "delivery.csv"), schema="Delivery")
+    co2_per_ton = pd.Series(np.nan, index=countries)
+    co2_per_ton_km = np.nan
+    if df_delivery is not None and not df_delivery.empty:
+        delivered = df_delivery['QuantityDelivered(metrictons)'].where(lambda q: q > 0)
+        per_ton = df_delivery['CO2_Emissions_kg'] / delivered
+        co2_per_ton = per_ton.groupby(df_delivery['Country']).mean().reindex(countries)
+        co2_per_ton_km = (per_ton / df_delivery['Distance_km']).mean()
+    if pd.isna(co2_per_ton_km):
+        co2_per_ton_km = CO2_PER_TON_KM
+    sourcing['CO2PerTonKg'] = co2_per_ton.fillna(sourcing['DistanceKm'] * co2_per_ton_km)
+    return sourcing
+
+def add_sourcing_scores(available_harvest, sourcing):
+    """Attach normalised cost and CO2 scores (0-1) to every lot in the supply pool.
+    
+    Args:
+        available_harvest (pandas.DataFrame): Supply pool, updated in place
+        sourcing (pandas.DataFrame): Output of sourcing_attributes
+    """
+    for column, score in (('RouteCostEUR', 'CostScore'), ('CO2PerTonKg', 'CO2Score')):
+        values = available_harvest['Country'].map(sourcing[column])
+        available_harvest[score] = (values / sourcing[column].max()).fillna(1.0)
+
+def prepare_simulation_inputs(df_harvest, df_demand, profiler=None, verbose=True):
+    """Prepare harvest and demand data once so it can be reused across runs.
+    
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        df_demand (pandas.DataFrame): Raw demand data
+        profiler (PhaseProfiler, optional): Profiler collecting phase timings
+        verbose (bool): Whether to print validation reports
+        
+    Returns:
+        dict: Processed harvest data, melted demand and demand dictionary,
+              or None if the inputs are invalid
+    """
+    profiler = profiler or NULL_PROFILER
+    
+    with profiler.phase('prepare_harvest_data'):
+        df_harvest_processed = prepare_harvest_data(df_harvest, demand_varieties(df_demand), verbose)
+    if df_harvest_processed is None:
+        return None
+        
+    with profiler.phase('prepare_demand_data'):
+        df_demand_melted, demand_dict = prepare_demand_data(df_demand, df_harvest_processed['Apple Variety'].unique(),
+                                                            verbose)
+    if df_demand_melted is None or demand_dict is None:
+        return None
+    
+    return {
+        'harvest': df_harvest_processed,
+        'demand_melted': df_demand_melted,
+        'demand_dict': demand_dict
+    }
+
+def _quiet(*args, **kwargs):
+    """Discard console output when a run is not verbose."""
+    pass
+
+def simulate_purchase_orders(df_harvest, df_demand, simulation_years=[2021], planning_lead_time=None,
+                             profiler=None, verbose=True, progress_callback=None, prepared_inputs=None,
+                             supply_growth_rates=None, demand_growth_rates=None, base_year=None,
+                             delay_model=None, delay_seed=None, sourcing_weights=None, horizon_months=None,
+                             variety_lead_times=None, port_capacity=None):
+    """Run the month-by-month planning loop and return the raw simulation state.
     
     Args:
         df_harvest (pandas.DataFrame): Raw harvest data
         df_demand (pandas.DataFrame): Raw demand data
         simulation_years (list): List of years to simulate
         planning_lead_time (int, optional): Planning lead time in months, defaults to config value
+        profiler (PhaseProfiler, optional): Profiler collecting phase timings and counters
+        verbose (bool): Whether to print progress to the console
+        progress_callback (callable, optional): Called as progress_callback(months_completed, months_total)
+                                                before each simulated month and once at the end
+        prepared_inputs (dict, optional): Output of prepare_simulation_inputs; when given,
+                                          df_harvest and df_demand are ignored
+        supply_growth_rates (dict, optional): Annual harvest growth rate per variety
+        demand_growth_rates (dict, optional): Annual demand growth rate per variety
+        base_year (int, optional): Year in which the input quantities apply unscaled,
+                                   defaults to the first simulation year
+        delay_model (DelayModel, optional): Fitted delivery delay model; when given, every
+                                            PO gets a sampled delay and arrival date
+        delay_seed (int, optional): Random seed for the sampled delays
+        sourcing_weights (dict, optional): Weights for 'cost', 'co2' and 'freshness' used to rank
+                                           candidate lots; defaults to freshest harvest first
+        horizon_months (int, optional): Stop after this many simulated months
+        variety_lead_times (dict, optional): Planning lead time in months per variety;
+                                             varieties not listed use planning_lead_time
+        port_capacity (dict, optional): Rotterdam berth and reefer-plug capacity (see
+                                        config.PORT_CAPACITY); when given, clustered arrivals
+                                        queue and every PO gets an unloading date
         
     Returns:
-        pandas.DataFrame: Generated purchase orders
+        dict: Purchase order records, shortfall records, the final supply pool and
+              the projection cube, or None if the inputs are invalid
     """
     # Use default planning lead time if not specified
     planning_lead_time = planning_lead_time or PLANNING_LEAD_TIME
+    profiler = profiler or NULL_PROFILER
+    log = print if verbose else _quiet
+    profiler.annotate(simulation_years=list(simulation_years),
+                      planning_lead_time=planning_lead_time,
+                      supply_growth_rates=supply_growth_rates,
+                      demand_growth_rates=demand_growth_rates)
     
     # Prepare data
-    df_harvest_processed = prepare_harvest_data(df_harvest)
-    if df_harvest_processed is None:
-        return None
-        
-    df_demand_melted, demand_dict = prepare_demand_data(df_demand)
-    if df_demand_melted is None or demand_dict is None:
+    if prepared_inputs is None:
+        prepared_inputs = prepare_simulation_inputs(df_harvest, df_demand, profiler, verbose)
+    if prepared_inputs is None:
         return None
+    df_harvest_processed = prepared_inputs['harvest']
+    
+    # Project supply and demand over every year the planning loop can target
+    max_lead_time = max([planning_lead_time, *(variety_lead_times or {}).values()])
+    last_target_year = (datetime(max(simulation_years), 12, 1) + relativedelta(months=max_lead_time)).year
+    with profiler.phase('build_projection'):
+        projection = build_projection(
+            df_harvest_processed,
+            prepared_inputs['demand_melted'],
+            [min(simulation_years), last_target_year],
+            supply_growth_rates=supply_growth_rates,
+            demand_growth_rates=demand_growth_rates,
+            base_year=base_year if base_year is not None else simulation_years[0]
+        )
     
     # Create available supply pool
-    available_harvest = create_available_supply_pool(df_harvest_processed, simulation_years)
+    with profiler.phase('create_available_supply_pool'):
+        available_harvest = create_available_supply_pool(
+            df_harvest_processed, simulation_years, profiler,
+            projection=projection if supply_growth_rates else None
+        )
     if available_harvest is None:
         return None
+    if demand_growth_rates and not supply_growth_rates:
+        # Grown demand is fractional, so integer harvest quantities must accept fractional orders
+        available_harvest['AvailableQuantity'] = available_harvest['AvailableQuantity'].astype(np.float64)
+    profiler.annotate(harvest_rows=len(df_harvest_processed), supply_pool_rows=len(available_harvest))
+    
+    if sourcing_weights:
+        sourcing = prepared_inputs.get('sourcing')
+        if sourcing is None:
+            sourcing = sourcing_attributes()
+        add_sourcing_scores(available_harvest, sourcing)
     
     # Initialize simulation variables
     purchase_orders = []
+    shortfalls = []
     po_counter = 1
     
-    print(f"Starting PO Simulation for {simulation_years[0]}-{simulation_years[-1]}...")
-    print(f"Planning Lead Time: {planning_lead_time} months")
-    print("-" * 30)
+    log(f"Starting PO Simulation for {simulation_years[0]}-{simulation_years[-1]}...")
+    log(f"Planning Lead Time: {planning_lead_time} months")
+    if variety_lead_times:
+        log(f"Per-variety Lead Times: {variety_lead_times}")
+    log("-" * 30)
+
+    # Months to simulate, optionally cut short to the first horizon_months
+    months = [(year, sim_month) for year in simulation_years for sim_month in range(1, 13)]
+    if horizon_months is not None:
+        months = months[:horizon_months]
+    months_total = len(months)
+    months_completed = 0
 
     # Simulate month by month
-    for year in simulation_years:
-        for sim_month in range(1, 13):
-            sim_date = datetime(year, sim_month, 1)
-            target_demand_date = sim_date + relativedelta(months=planning_lead_time)
-            target_month = target_demand_date.month
-            target_year = target_demand_date.year
-
-            print(f"--- Simulating Month: {sim_date.strftime('%Y-%m')} ---")
-            print(f"Planning for Demand Month: {target_demand_date.strftime('%Y-%m')}")
-
-            # Get demand for the target month
-            target_demands = {
-                variety: qty for (m, variety), qty
-                in demand_dict.items() if m == target_month
+    for year, sim_month in months:
+        if progress_callback is not None:
+            progress_callback(months_completed, months_total)
+        months_completed += 1
+        sim_date = datetime(year, sim_month, 1)
+        target_demand_date = sim_date + relativedelta(months=planning_lead_time)
+        target_month = target_demand_date.month
+        target_year = target_demand_date.year
+
+        log(f"--- Simulating Month: {sim_date.strftime('%Y-%m')} ---")
+        log(f"Planning for Demand Month: {target_demand_date.strftime('%Y-%m')}")
+
+        # Get projected demand for the target month (per variety when lead times differ)
+        if variety_lead_times:
+            target_dates = {
+                variety: sim_date + relativedelta(months=variety_lead_times.get(variety, planning_lead_time))
+                for variety in projection.varieties
             }
+            target_demands = {}
+            for variety, date in target_dates.items():
+                qty = projection.demand_for(date.year, date.month).get(variety)
+                if qty:
+                    target_demands[variety] = qty
+        else:
+            target_demands = projection.demand_for(target_year, target_month)
+            target_dates = dict.fromkeys(target_demands, target_demand_date)
 
-            if not target_demands:
-                # This handles cases where target month goes beyond Dec (e.g., planning in Nov/Dec 2024 for 2025)
-                # Or if demand data is missing for a future month we calculate.
-                print(f"No demand data found or required for target month {target_demand_date.strftime('%Y-%m')}. Skipping.")
-                continue
+        if not target_demands:
+            # This handles cases where target month goes beyond Dec (e.g., planning in Nov/Dec 2024 for 2025)
+            # Or if demand data is missing for a future month we calculate.
+            log(f"No demand data found or required for target month {target_demand_date.strftime('%Y-%m')}. Skipping.")
+            continue
 
-            for variety, needed_qty in target_demands.items():
-                if needed_qty <= 0: 
-                    continue
+        for variety, needed_qty in target_demands.items():
+            if needed_qty <= 0: 
+                continue
+            target_demand_date = target_dates[variety]
 
-                fulfilled_qty = 0
-                print(f"  Target Demand for {variety}: {needed_qty}")
+            fulfilled_qty = 0
+            log(f"  Target Demand for {variety}: {needed_qty}")
 
-                # Find potential supply: Harvested *before or during* sim_month, correct variety, quantity > 0
+            # Find potential supply: Harvested *before or during* sim_month, correct variety, quantity > 0
+            with profiler.phase('filter_supply'):
                 potential_supply = available_harvest[
                     (available_harvest['Apple Variety'] == variety) &
                     (available_harvest['AvailableQuantity'] > 0) &
@@ -195,21 +425,40 @@ def run_supply_chain_simulation(df_harvest, df_demand, simulation_years=[2021],
                       ((available_harvest['Year'] == year) & 
                        (available_harvest['HarvestMonthNum'] <= sim_month)) )
                 ].copy()  # Copy to avoid SettingWithCopyWarning
+            profiler.count('rows_copied', len(potential_supply))
+            profiler.count('candidate_lots_scanned', len(potential_supply))
 
-                # Sort by harvest date: most recent first (fresher)
-                potential_supply = potential_supply.sort_values(
-                    by=['Year', 'HarvestMonthNum'], 
-                    ascending=[False, False]
-                )
+            # Sort by harvest date: most recent first (fresher), or by weighted sourcing score
+            with profiler.phase('sort_supply'):
+                if sourcing_weights:
+                    age_months = (year - potential_supply['Year']) * 12 + sim_month - potential_supply['HarvestMonthNum']
+                    potential_supply['SourcingScore'] = (
+                        sourcing_weights.get('cost', 0.0) * potential_supply['CostScore'] +
+                        sourcing_weights.get('co2', 0.0) * potential_supply['CO2Score'] +
+                        sourcing_weights.get('freshness', 0.0) * age_months / 12
+                    )
+                    potential_supply = potential_supply.sort_values(
+                        by=['SourcingScore', 'Year', 'HarvestMonthNum'],
+                        ascending=[True, False, False]
+                    )
+                else:
+                    potential_supply = potential_supply.sort_values(
+                        by=['Year', 'HarvestMonthNum'], 
+                        ascending=[False, False]
+                    )
 
-                if potential_supply.empty:
-                    print(f"    WARNING: No available supply found for {variety} harvested by "
-                          f"{sim_date.strftime('%Y-%m')} to meet demand for "
-                          f"{target_demand_date.strftime('%Y-%m')}")
-                    continue
+            if potential_supply.empty:
+                log(f"    WARNING: No available supply found for {variety} harvested by "
+                    f"{sim_date.strftime('%Y-%m')} to meet demand for "
+                    f"{target_demand_date.strftime('%Y-%m')}")
+                shortfalls.append(_shortfall_record(variety, sim_date, target_demand_date,
+                                                    needed_qty, fulfilled_qty))
+                continue
 
-                # Process each potential supply source until demand is met
-                _create_purchase_orders(
+            # Process each potential supply source until demand is met
+            orders_before = len(purchase_orders)
+            with profiler.phase('create_purchase_orders'):
+                final_fulfilled = _create_purchase_orders(
                     potential_supply, 
                     needed_qty, 
                     fulfilled_qty, 
@@ -218,44 +467,152 @@ def run_supply_chain_simulation(df_harvest, df_demand, simulation_years=[2021],
                     sim_date, 
                     target_demand_date,
                     purchase_orders, 
-                    po_counter
+                    po_counter,
+                    log
                 )
+            profiler.count('purchase_orders_created', len(purchase_orders) - orders_before)
+
+            # Update PO counter
+            po_counter += len(potential_supply)
+            
+            # Check if demand was fully met
+            if final_fulfilled < needed_qty:
+                log(f"    WARNING: Could not fully meet demand for {variety} for "
+                    f"{target_demand_date.strftime('%Y-%m')}. Shortfall: "
+                    f"{needed_qty - final_fulfilled:.0f} units.")
+                shortfalls.append(_shortfall_record(variety, sim_date, target_demand_date,
+                                                    needed_qty, final_fulfilled))
 
-                # Update PO counter
-                po_counter += len(potential_supply)
-                
-                # Check if demand was fully met
-                final_fulfilled = sum([po['QuantityOrdered'] for po in purchase_orders 
-                                    if po['AppleVariety'] == variety and 
-                                       po['DemandMonthTarget'] == target_demand_date.strftime('%Y-%m')])
-                                       
-                if final_fulfilled < needed_qty:
-                    print(f"    WARNING: Could not fully meet demand for {variety} for "
-                          f"{target_demand_date.strftime('%Y-%m')}. Shortfall: "
-                          f"{needed_qty - final_fulfilled:.0f} units.")
+    if progress_callback is not None:
+        progress_callback(months_completed, months_total)
+
+    if delay_model is not None and purchase_orders:
+        with profiler.phase('sample_delays'):
+            _apply_sampled_delays(purchase_orders, delay_model, delay_seed)
+    if port_capacity is not None and purchase_orders:
+        with profiler.phase('port_queue'):
+            _apply_port_queue(purchase_orders, port_capacity)
+
+    return {
+        'purchase_orders': purchase_orders,
+        'shortfalls': shortfalls,
+        'available_harvest': available_harvest,
+        'projection': projection
+    }
+
+def run_supply_chain_simulation(df_harvest, df_demand, simulation_years=[2021], planning_lead_time=None,
+                                profiler=None, verbose=True, supply_growth_rates=None, demand_growth_rates=None,
+                                delay_model=None, delay_seed=None, port_capacity=None):
+    """Run the supply chain simulation.
+    
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        df_demand (pandas.DataFrame): Raw demand data
+        simulation_years (list): List of years to simulate
+        planning_lead_time (int, optional): Planning lead time in months, defaults to config value
+        profiler (PhaseProfiler, optional): Profiler collecting phase timings and counters
+        verbose (bool): Whether to print progress to the console
+        supply_growth_rates (dict, optional): Annual harvest growth rate per variety
+        demand_growth_rates (dict, optional): Annual demand growth rate per variety
+        delay_model (DelayModel, optional): Fitted delivery delay model for sampled arrivals
+        delay_seed (int, optional): Random seed for the sampled delays
+        port_capacity (dict, optional): Rotterdam unloading capacity for the berth queue
+        
+    Returns:
+        pandas.DataFrame: Generated purchase orders
+    """
+    profiler = profiler or NULL_PROFILER
+    log = print if verbose else _quiet
+    
+    state = simulate_purchase_orders(df_harvest, df_demand, simulation_years, planning_lead_time,
+                                     profiler=profiler, verbose=verbose,
+                                     supply_growth_rates=supply_growth_rates,
+                                     demand_growth_rates=demand_growth_rates,
+                                     delay_model=delay_model, delay_seed=delay_seed,
+                                     port_capacity=port_capacity)
+    if state is None:
+        return None
 
     # Create DataFrame from purchase orders
-    po_df = pd.DataFrame(purchase_orders)
+    with profiler.phase('build_po_table'):
+        po_df = pd.DataFrame(state['purchase_orders'])
 
-    print("\n" + "=" * 30)
-    print("Simulation Complete.")
-    print(f"Total Purchase Orders Generated: {len(po_df)}")
-    print("=" * 30 + "\n")
+    log("\n" + "=" * 30)
+    log("Simulation Complete.")
+    log(f"Total Purchase Orders Generated: {len(po_df)}")
+    log("=" * 30 + "\n")
 
     # Display sample purchase orders
     if not po_df.empty:
-        print("Sample Purchase Orders Generated:")
-        print(po_df.head().to_string())
-        print("...")
-        print(po_df.tail().to_string())
+        log("Sample Purchase Orders Generated:")
+        log(po_df.head().to_string())
+        log("...")
+        log(po_df.tail().to_string())
     else:
-        print("No purchase orders were generated.")
+        log("No purchase orders were generated.")
         
     return po_df
 
+def _apply_sampled_delays(purchase_orders, delay_model, seed=None):
+    """Sample a delivery delay for every purchase order in one batch.
+    
+    Args:
+        purchase_orders (list): Purchase order records, updated in place with
+                                SampledDelayDays and SampledArrivalDate
+        delay_model (DelayModel): Fitted delivery delay model
+        seed (int, optional): Random seed
+    """
+    delays = delay_model.sample(
+        [po['SupplierID'] for po in purchase_orders],
+        [po['Country'] for po in purchase_orders],
+        np.random.default_rng(seed)
+    )
+    arrivals = pd.to_datetime([po['ExpectedArrivalDate'] for po in purchase_orders]) + pd.to_timedelta(delays, unit='D')
+    for po, delay, arrival in zip(purchase_orders, delays, arrivals.strftime('%Y-%m-%d')):
+        po['SampledDelayDays'] = int(delay)
+        po['SampledArrivalDate'] = arrival
+
+def _apply_port_queue(purchase_orders, port_capacity):
+    """Queue purchase orders for unloading at Rotterdam in one vectorized pass.
+    
+    Args:
+        purchase_orders (list): Purchase order records, updated in place with
+                                BerthDelayDays and UnloadedDate
+        port_capacity (dict): Keyword arguments for port_queue.daily_capacity
+    """
+    arrival_column = 'SampledArrivalDate' if 'SampledArrivalDate' in purchase_orders[0] else 'ExpectedArrivalDate'
+    arrivals = pd.to_datetime([po[arrival_column] for po in purchase_orders])
+    delays = port_delays(arrivals, [po['QuantityOrdered'] for po in purchase_orders], port_capacity)
+    unloaded = (arrivals + pd.to_timedelta(delays, unit='D')).strftime('%Y-%m-%d')
+    for po, delay, date in zip(purchase_orders, delays, unloaded):
+        po['BerthDelayDays'] = int(delay)
+        po['UnloadedDate'] = date
+
+def _shortfall_record(variety, sim_date, target_demand_date, needed_qty, fulfilled_qty):
+    """Build a shortfall record for demand that could not be fully met.
+    
+    Args:
+        variety (str): Apple variety being ordered
+        sim_date (datetime): Current simulation date
+        target_demand_date (datetime): Target demand date
+        needed_qty (float): Quantity needed to fulfill demand
+        fulfilled_qty (float): Quantity actually ordered
+        
+    Returns:
+        dict: Shortfall record
+    """
+    return {
+        'AppleVariety': variety,
+        'PlanningMonth': sim_date.strftime('%Y-%m'),
+        'DemandMonthTarget': target_demand_date.strftime('%Y-%m'),
+        'DemandQuantity': needed_qty,
+        'FulfilledQuantity': fulfilled_qty,
+        'Shortfall': needed_qty - fulfilled_qty
+    }
+
 def _create_purchase_orders(potential_supply, needed_qty, fulfilled_qty, variety,
                            available_harvest, sim_date, target_demand_date,
-                           purchase_orders, po_counter):
+                           purchase_orders, po_counter, log=print):
     """Helper function to create purchase orders from potential supply.
     
     Args:
@@ -268,9 +625,10 @@ def _create_purchase_orders(potential_supply, needed_qty, fulfilled_qty, variety
         target_demand_date (datetime): Target demand date
         purchase_orders (list): List to append purchase orders to
         po_counter (int): Purchase order counter
+        log (callable): Function used for console output
         
     Returns:
-        None: Updates purchase_orders list in place
+        float: Quantity fulfilled after placing orders; purchase_orders is updated in place
     """
     for idx, (harvest_id, supply_row) in enumerate(potential_supply.iterrows()):
         if fulfilled_qty >= needed_qty:
@@ -305,16 +663,25 @@ def _create_purchase_orders(potential_supply, needed_qty, fulfilled_qty, variety
             available_harvest.loc[harvest_id, 'AvailableQuantity'] -= order_qty
             fulfilled_qty += order_qty
 
-            print(f"    Placed PO {po_record['PO_ID']}: {order_qty:.0f} units of {variety} "
-                  f"from {supplier_id} ({country}) - Harvested {po_record['HarvestMonth']}/"
-                  f"{po_record['HarvestYear']}. Arrival ~{po_record['ExpectedArrivalDate']}")
+            log(f"    Placed PO {po_record['PO_ID']}: {order_qty:.0f} units of {variety} "
+                f"from {supplier_id} ({country}) - Harvested {po_record['HarvestMonth']}/"
+                f"{po_record['HarvestYear']}. Arrival ~{po_record['ExpectedArrivalDate']}")
+
+    return fulfilled_qty
 
-def save_simulation_results(po_df, filename="simulated_purchase_orders.csv"):
-    """Save simulation results to a CSV file.
+def save_simulation_results(po_df, filename="simulated_purchase_orders.csv", profiler=None, cube=False,
+                            file_format="csv", compression="zstd", partition=False):
+    """Save simulation results to a CSV, Parquet or Arrow IPC file.
     
     Args:
         po_df (pandas.DataFrame): Purchase order data
         filename (str): Name of the output file
+        profiler (PhaseProfiler, optional): Profiler timing the save phase
+        cube (bool): Also write the prefix-summed rollup cube next to the output
+        file_format (str): "csv", "parquet" or "arrow" (Parquet and Arrow need pyarrow)
+        compression (str, optional): Codec for Parquet/Arrow output
+        partition (bool): Partition Parquet/Arrow output by order year and variety
+                          into a directory named after filename
         
     Returns:
         bool: True if saving was successful, False otherwise
@@ -323,5 +690,24 @@ def save_simulation_results(po_df, filename="simulated_purchase_orders.csv"):
         print("No purchase orders to save.")
         return False
         
+    profiler = profiler or NULL_PROFILER
     output_path = get_output_path(filename)
-    return save_csv_data(po_df, output_path, "Error saving purchase orders")
+    with profiler.phase('save_simulation_results'):
+        if file_format == "csv":
+            saved = save_csv_data(po_df, output_path, "Error saving purchase orders")
+        else:
+            table = po_df
+            if partition:
+                table = po_df.assign(OrderYear=po_df['OrderDate'].astype(str).str[:4].astype(int))
+            saved = save_table(table, output_path, file_format, compression,
+                               partition_cols=PO_PARTITION_COLS if partition else None,
+                               error_message="Error saving purchase orders")
+    if saved and cube:
+        with profiler.phase('build_rollup_cube'):
+            try:
+                RollupCube.from_purchase_orders(po_df).save(cube_path(output_path))
+                print(f"Rollup cube saved to: {cube_path(output_path)}")
+            except Exception as e:
+                print(f"Error saving rollup cube: {e}")
+                return False
+    return saved
@@ -0,0 +1,222 @@
+"""
+Embeddable API for the supply chain simulation.
+
+This module wraps the simulation engine behind a typed configuration
+object and a result object whose views (purchase orders, shortfalls,
+monthly inventory, timings) are only materialised when accessed.
+Runs are silent by default so the engine can be called from services.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from config import PLANNING_LEAD_TIME
+from instrumentation import PhaseProfiler
+from simulation import prepare_simulation_inputs, simulate_purchase_orders
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Parameters for a single simulation run.
+
+    Attributes:
+        simulation_years (tuple): Years to simulate
+        planning_lead_time (int): Planning lead time in months
+        verbose (bool): Whether the engine prints progress to the console
+        collect_timings (bool): Whether phase timings and counters are recorded
+        supply_growth_rates (dict): Annual harvest growth rate per variety (None for flat supply)
+        demand_growth_rates (dict): Annual demand growth rate per variety (None for flat demand)
+        sourcing_weights (dict): Weights for 'cost', 'co2' and 'freshness' ranking candidate lots
+                                 (None for freshest harvest first)
+        horizon_months (int): Stop after this many simulated months (None for all years)
+        variety_lead_times (dict): Planning lead time in months per variety, overriding
+                                   planning_lead_time for the varieties listed
+    """
+
+    simulation_years: Tuple[int, ...] = (2021,)
+    planning_lead_time: int = PLANNING_LEAD_TIME
+    verbose: bool = False
+    collect_timings: bool = True
+    supply_growth_rates: Optional[Dict[str, float]] = None
+    demand_growth_rates: Optional[Dict[str, float]] = None
+    sourcing_weights: Optional[Dict[str, float]] = None
+    horizon_months: Optional[int] = None
+    variety_lead_times: Optional[Dict[str, int]] = None
+
+    def __post_init__(self):
+        years = tuple(int(year) for year in self.simulation_years)
+        if not years:
+            raise ValueError("simulation_years must contain at least one year")
+        if int(self.planning_lead_time) <= 0:
+            raise ValueError("planning_lead_time must be a positive integer")
+        for field in ("supply_growth_rates", "demand_growth_rates"):
+            rates = getattr(self, field)
+            if rates is not None and any(float(rate) <= -1 for rate in rates.values()):
+                raise ValueError(f"{field} must be greater than -1 for every variety")
+        if self.sourcing_weights is not None:
+            unknown = set(self.sourcing_weights) - {"cost", "co2", "freshness"}
+            if unknown:
+                raise ValueError(f"Unknown sourcing weights: {sorted(unknown)}")
+            if any(float(weight) < 0 for weight in self.sourcing_weights.values()):
+                raise ValueError("sourcing_weights must be non-negative")
+        if self.horizon_months is not None and int(self.horizon_months) <= 0:
+            raise ValueError("horizon_months must be a positive integer")
+        if self.variety_lead_times is not None and any(int(lead) <= 0 for lead in self.variety_lead_times.values()):
+            raise ValueError("variety_lead_times must be positive integers")
+        object.__setattr__(self, "simulation_years", years)
+        object.__setattr__(self, "planning_lead_time", int(self.planning_lead_time))
+
+
+class SimulationResult:
+    """Result of a simulation run with lazily materialised views.
+
+    Args:
+        config (SimulationConfig): Configuration the run was executed with
+        state (dict): Raw engine state from simulate_purchase_orders
+        profiler (PhaseProfiler): Profiler that recorded the run
+    """
+
+    def __init__(self, config, state, profiler):
+        self.config = config
+        self._purchase_order_records = state["purchase_orders"]
+        self._shortfall_records = state["shortfalls"]
+        self._supply_pool = state["available_harvest"]
+        self._profiler = profiler
+
+    @property
+    def po_count(self):
+        """int: Number of purchase orders generated, without building the table."""
+        return len(self._purchase_order_records)
+
+    @property
+    def has_shortfalls(self):
+        """bool: Whether any demand could not be fully met."""
+        return bool(self._shortfall_records)
+
+    @cached_property
+    def purchase_orders(self):
+        """pandas.DataFrame: Generated purchase orders."""
+        return pd.DataFrame(self._purchase_order_records)
+
+    @cached_property
+    def shortfalls(self):
+        """pandas.DataFrame: Demand that could not be fully met, one row per variety and target month."""
+        columns = ['AppleVariety', 'PlanningMonth', 'DemandMonthTarget',
+                   'DemandQuantity', 'FulfilledQuantity', 'Shortfall']
+        return pd.DataFrame(self._shortfall_records, columns=columns)
+
+    @cached_property
+    def monthly_inventory(self):
+        """pandas.DataFrame: Harvested, ordered and closing inventory per simulated month and variety.
+
+        Inventory is derived from the supply pool and the purchase orders, so
+        the engine never has to snapshot it while running.
+        """
+        pool = self._supply_pool
+        varieties = sorted(pool['Apple Variety'].unique())
+        months = pd.MultiIndex.from_product(
+            [self.config.simulation_years, range(1, 13)], names=['Year', 'Month']
+        )
+
+        harvested = (
+            pool.groupby(['Year', 'HarvestMonthNum', 'Apple Variety'])['Harvest Quantity'].sum()
+            .unstack('Apple Variety')
+            .rename_axis(['Year', 'Month'])
+            .reindex(index=months, columns=varieties, fill_value=0)
+            .fillna(0)
+        )
+
+        ordered = pd.DataFrame(0.0, index=months, columns=varieties)
+        if self._purchase_order_records:
+            po_df = self.purchase_orders
+            order_dates = pd.to_datetime(po_df['OrderDate'])
+            ordered = (
+                po_df.groupby([order_dates.dt.year.rename('Year'),
+                               order_dates.dt.month.rename('Month'),
+                               'AppleVariety'])['QuantityOrdered'].sum()
+                .unstack('AppleVariety')
+                .reindex(index=months, columns=varieties, fill_value=0)
+                .fillna(0)
+            )
+
+        closing = harvested.cumsum() - ordered.cumsum()
+        inventory = pd.concat(
+            {'Harvested': harvested.stack(), 'Ordered': ordered.stack(), 'ClosingInventory': closing.stack()},
+            axis=1
+        )
+        inventory.index = inventory.index.set_names(['Year', 'Month', 'AppleVariety'])
+        return inventory.reset_index()
+
+    @property
+    def timings(self):
+        """dict: Phase timings in seconds keyed by phase name (empty if timings were not collected)."""
+        return {name: total for name, (total, calls) in self._profiler.timings.items()}
+
+    @property
+    def counters(self):
+        """dict: Engine counters such as rows copied and purchase orders created."""
+        return dict(self._profiler.counters)
+
+    def profile(self):
+        """Return the full JSON-serialisable profile of the run.
+
+        Returns:
+            dict: Profile with metadata, phases and counters
+        """
+        return self._profiler.to_dict()
+
+
+def prepare_inputs(df_harvest, df_demand, verbose=True):
+    """Validate and encode harvest and demand data once for many runs.
+
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        df_demand (pandas.DataFrame): Raw demand data
+        verbose (bool): Whether to print validation reports
+
+    Returns:
+        dict: Prepared inputs to pass to simulate(), or None if the inputs are invalid
+    """
+    return prepare_simulation_inputs(df_harvest, df_demand, verbose=verbose)
+
+
+def simulate(df_harvest, df_demand, config: Optional[SimulationConfig] = None, progress_callback=None,
+             prepared_inputs=None):
+    """Run the supply chain simulation and return a lazy result object.
+
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data (ignored when prepared_inputs is given)
+        df_demand (pandas.DataFrame): Raw demand data (ignored when prepared_inputs is given)
+        config (SimulationConfig, optional): Run configuration, defaults to SimulationConfig()
+        progress_callback (callable, optional): Called as progress_callback(months_completed, months_total)
+        prepared_inputs (dict, optional): Output of prepare_inputs(), reused across runs
+
+    Returns:
+        SimulationResult: Result of the run, or None if the inputs are invalid
+    """
+    config = config or SimulationConfig()
+    profiler = PhaseProfiler(enabled=config.collect_timings)
+
+    with profiler.phase('simulate'):
+        state = simulate_purchase_orders(
+            df_harvest,
+            df_demand,
+            simulation_years=list(config.simulation_years),
+            planning_lead_time=config.planning_lead_time,
+            profiler=profiler,
+            verbose=config.verbose,
+            progress_callback=progress_callback,
+            prepared_inputs=prepared_inputs,
+            supply_growth_rates=config.supply_growth_rates,
+            demand_growth_rates=config.demand_growth_rates,
+            sourcing_weights=config.sourcing_weights,
+            horizon_months=config.horizon_months,
+            variety_lead_times=config.variety_lead_times
+        )
+    if state is None:
+        return None
+
+    return SimulationResult(config, state, profiler)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+Embedded SQLite store for master and transactional tables.
+
+Master data (suppliers, customers, warehouses, products) and transactions
+(purchase orders, deliveries, customer delivery documents) live in one
+SQLite file instead of loose CSVs. Each table has a primary key and
+indexes on its ID, date and variety columns, so lookups and date-range
+reads touch only the matching rows. Rows are ingested in bulk with
+executemany inside one transaction; rows whose key already exists are
+replaced, so new transactions are appended without rewriting history.
+
+CSV headers are mapped to canonical column names through the schema
+registry, and day-first delivery dates are stored as ISO dates so they
+sort and compare correctly.
+
+Usage::
+
+    python store.py import                   # load every CSV in data/ into data/supply_chain.db
+    python store.py query purchase_orders --where AppleVariety=Fuji --from 2023-01-01 --to 2023-03-31
+"""
+
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_DIR
+from data_utils import load_csv_data
+from schemas import get_schema
+
+DEFAULT_STORE = os.path.join(DATA_DIR, "supply_chain.db")
+
+# Table -> source CSV, schema, primary key, indexed columns and the date column of range reads
+TABLES = {
+    'suppliers': {'file': "supplier_master_data.csv", 'schema': "Supplier_Master",
+                  'key': "SupplierID", 'indexes': ["Country"], 'date': None},
+    'customers': {'file': "customer_master.csv", 'schema': "CustomerMaster",
+                  'key': "warehouse_id", 'indexes': ["customer_id", "city"], 'date': None},
+    'warehouses': {'file': "warehouse_master.csv", 'schema': "WarehouseMaster",
+                   'key': "WarehouseID", 'indexes': [], 'date': None},
+    'products': {'file': "product_master.csv", 'schema': "Products",
+                 'key': "SKUID", 'indexes': ["Name"], 'date': None},
+    'purchase_orders': {'file': "purchase_orders.csv", 'schema': "Order", 'key': "PO_ID",
+                        'indexes': ["OrderDate", "SupplierID", "AppleVariety"], 'date': "OrderDate"},
+    'simulated_purchase_orders': {'file': None, 'schema': "Order", 'key': "PO_ID",
+                                  'indexes': ["OrderDate", "SupplierID", "AppleVariety"], 'date': "OrderDate"},
+    'deliveries': {'file': "delivery.csv", 'schema': "Delivery", 'key': "DEL_ID",
+                   'indexes': ["PO_ID", "ActualDeliveryDate", "AppleVariety"], 'date': "ActualDeliveryDate"},
+    'customer_deliveries': {'file': "customer_delivery_documents.csv", 'schema': None, 'key': "order_number",
+                            'indexes': ["customer_id", "order_date"], 'date': "order_date"},
+}
+
+# Rows per executemany batch
+BATCH_ROWS = 50000
+
+
+def _quote(name):
+    """Quote an identifier; column names contain spaces and parentheses."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    """SQLite column type for a pandas dtype."""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _iso_dates(df, schema):
+    """Convert the schema's day-first date columns to ISO strings."""
+    if schema is None:
+        return df
+    converted = {}
+    for column, date_format in get_schema(schema).dates.items():
+        if column in df.columns and '%d' in date_format and date_format != '%Y-%m-%d':
+            converted[column] = pd.to_datetime(df[column], format=date_format, errors='coerce').dt.strftime('%Y-%m-%d')
+    return df.assign(**converted) if converted else df
+
+
+def _rows(df):
+    """Plain Python rows for executemany: numpy scalars become ints/floats, missing values NULL."""
+    values = df.astype(object).to_numpy()
+    values[pd.isna(values)] = None
+    return map(tuple, values)
+
+
+class SupplyChainStore:
+    """SQLite store of master and transactional supply chain tables.
+
+    Args:
+        path (str): SQLite database file, created if it does not exist
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spec(self, table):
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}', expected one of {sorted(TABLES)}")
+        return TABLES[table]
+
+    def _columns(self, table):
+        """Columns of an existing table, empty if it does not exist yet."""
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    def _ensure_table(self, table, df):
+        """Create the table and its indexes, or add columns the DataFrame brings."""
+        spec = self._spec(table)
+        existing = self._columns(table)
+        if not existing:
+            if spec['key'] not in df.columns:
+                raise ValueError(f"{table} rows need the key column '{spec['key']}'")
+            columns = ", ".join(
+                f"{_quote(c)} {_sql_type(df[c].dtype)}{' PRIMARY KEY' if c == spec['key'] else ''}"
+                for c in df.columns
+            )
+            self.conn.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+            for column in spec['indexes']:
+                if column in df.columns:
+                    self.conn.execute(f"CREATE INDEX {_quote(f'idx_{table}_{column}')} "
+                                      f"ON {_quote(table)} ({_quote(column)})")
+            return
+        for column in df.columns:
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} "
+                                  f"{_sql_type(df[column].dtype)}")
+
+    def write(self, table, df, replace=False):
+        """Insert rows in bulk, replacing rows whose key already exists.
+
+        Args:
+            table (str): Table name from TABLES
+            df (pandas.DataFrame): Rows with canonical column names
+            replace (bool): Delete all existing rows first
+
+        Returns:
+            int: Number of rows written
+        """
+        spec = self._spec(table)
+        df = _iso_dates(df, spec['schema'])
+        with self.conn:
+            self._ensure_table(table, df)
+            if replace:
+                self.conn.execute(f"DELETE FROM {_quote(table)}")
+            sql = (f"INSERT OR REPLACE INTO {_quote(table)} ({', '.join(_quote(c) for c in df.columns)}) "
+                   f"VALUES ({', '.join('?' * len(df.columns))})")
+            for start in range(0, len(df), BATCH_ROWS):
+                self.conn.executemany(sql, _rows(df.iloc[start:start + BATCH_ROWS]))
+        return len(df)
+
+    def import_csv(self, table, file_path=None, replace=False):
+        """Load a CSV file into a table.
+
+        Args:
+            table (str): Table name from TABLES
+            file_path (str, optional): CSV to load, defaults to the table's file in data/
+            replace (bool): Delete all existing rows first
+
+        Returns:
+            int: Number of rows written, or None if the file could not be loaded
+        """
+        spec = self._spec(table)
+        file_path = file_path or os.path.join(DATA_DIR, spec['file'])
+        df = load_csv_data(file_path, schema=spec['schema'])
+        if df is None:
+            return None
+        return self.write(table, df, replace=replace)
+
+    def import_data_dir(self, data_dir=DATA_DIR):
+        """Load every table whose CSV exists in a data directory.
+
+        Args:
+            data_dir (str): Directory holding the CSV files
+
+        Returns:
+            dict: Rows written per table
+        """
+        counts = {}
+        for table, spec in TABLES.items():
+            if spec['file'] and os.path.exists(os.path.join(data_dir, spec['file'])):
+                counts[table] = self.import_csv(table, os.path.join(data_dir, spec['file']))
+        return counts
+
+    def read(self, table, columns=None, where=None, start=None, end=None):
+        """Read rows, filtering on indexed columns in SQL.
+
+        Args:
+            table (str): Table name from TABLES
+            columns (list, optional): Columns to read, all if omitted
+            where (dict, optional): Column -> value or list of values
+            start (str, optional): First ISO date (inclusive) of the table's date column
+            end (str, optional): Last ISO date (inclusive) of the table's date column
+
+        Returns:
+            pandas.DataFrame: Matching rows, empty if the table does not exist yet
+        """
+        spec = self._spec(table)
+        if not self._columns(table):
+            return pd.DataFrame(columns=columns or [])
+        conditions, params = [], []
+        for column, value in (where or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set, np.ndarray)) else [value]
+            conditions.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if (start is not None or end is not None) and spec['date'] is None:
+            raise ValueError(f"{table} has no date column to filter on")
+        if start is not None:
+            conditions.append(f"{_quote(spec['date'])} >= ?")
+            params.append(str(start))
+        if end is not None:
+            # Dates may carry a time or be year-months; compare on the leading characters
+            conditions.append(f"substr({_quote(spec['date'])}, 1, {len(str(end))}) <= ?")
+            params.append(str(end))
+        sql = f"SELECT {', '.join(_quote(c) for c in columns) if columns else '*'} FROM {_quote(table)}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def get(self, table, key):
+        """Look up one row by primary key.
+
+        Args:
+            table (str): Table name from TABLES
+            key (str): Primary key value
+
+        Returns:
+            dict: The row, or None if there is no such key
+        """
+        rows = self.read(table, where={self._spec(table)['key']: key})
+        return rows.iloc[0].to_dict() if not rows.empty else None
+
+    def counts(self):
+        """Return the number of rows in every existing table."""
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]
+                for table in TABLES if self._columns(table)}
+
+
+def main():
+    """Command-line entry point for importing CSVs and querying the store."""
+    parser = argparse.ArgumentParser(description="SQLite store for supply chain tables")
+    parser.add_argument("--store", type=str, default=DEFAULT_STORE,
+                        help="SQLite database file (default: data/supply_chain.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Load CSV files into the store")
+    import_parser.add_argument("--data-dir", type=str, default=DATA_DIR)
+
+    query_parser = subparsers.add_parser("query", help="Print rows of a table")
+    query_parser.add_argument("table", choices=sorted(TABLES))
+    query_parser.add_argument("--where", nargs="*", default=[], metavar="COLUMN=VALUE")
+    query_parser.add_argument("--from", dest="start", type=str, help="First date (YYYY-MM-DD)")
+    query_parser.add_argument("--to", dest="end", type=str, help="Last date (YYYY-MM-DD)")
+
+    args = parser.parse_args()
+
+    with SupplyChainStore(args.store) as store:
+        if args.command == "import":
+            counts = store.import_data_dir(args.data_dir)
+            print(f"Imported into {os.path.abspath(args.store)}: {counts}")
+            return
+        where = dict(condition.split("=", 1) for condition in args.where)
+        rows = store.read(args.table, where=where, start=args.start, end=args.end)
+        print(rows.to_string(index=False) if not rows.empty else "No rows found.")
+
+
+if __name__ == "__main__":
+    main()
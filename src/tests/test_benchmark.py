@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests that the benchmark's synthetic inputs pass the simulation's input validation
+"""
+
+import os
+import sys
+
+import pytest
+
+# The simulation modules are imported flat, as the scripts in src/ do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import benchmark
+from simulation import prepare_simulation_inputs
+
+PRESET_SCALES = sorted({(suppliers, varieties)
+                        for cases in benchmark.SCALE_PRESETS.values()
+                        for suppliers, varieties, _ in cases})
+
+
+@pytest.fixture(scope="module")
+def small_cases():
+    """One-year cases of the small preset"""
+    return [case for case in benchmark.SCALE_PRESETS["small"] if case[2] == 1]
+
+
+@pytest.mark.parametrize("suppliers,varieties", PRESET_SCALES)
+def test_preset_scale_validates(suppliers, varieties, capsys):
+    """Test every preset's supplier and variety counts, including generic varieties"""
+    df_harvest, df_demand = benchmark.generate_synthetic_inputs(suppliers, varieties)
+    assert prepare_simulation_inputs(df_harvest, df_demand) is not None
+    # Generic varieties have matching demand columns, so nothing is reported
+    assert "validation found" not in capsys.readouterr().out
+
+
+def test_small_preset_runs(small_cases):
+    """Test the one-year cases of the small preset run end to end"""
+    for suppliers, varieties, years in small_cases:
+        case = benchmark.run_case(suppliers, varieties, years, measure_memory=False)
+        assert case["purchase_orders"] > 0
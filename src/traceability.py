@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""
+Pallet-level traceability store.
+
+Pallets, purchase orders and harvest lots are stored as NumPy structured
+arrays linked by integer foreign keys (pallet -> PO -> lot -> supplier,
+pallet -> customer warehouse); strings live once in small key tables.
+Arrays are saved as .npy files and opened memory-mapped, so a store with
+millions of pallets opens instantly and queries only touch the rows they
+need. Pallets are sorted by PO, so a recall resolves the lots to POs on
+the small tables and then reads one contiguous pallet range per PO.
+
+Delivery history records pallets per PO but not which customer received
+them, so each PO's pallets are allocated to customer warehouses in
+proportion to the customers' demand for that variety in the PO's target
+demand month.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import MONTH_MAP, INV_MONTH_MAP, VARIETY_MAP, DATA_DIR
+
+LOT_DTYPE = np.dtype([('supplier', '<u2'), ('variety', 'u1'), ('harvest_month', 'u1'), ('harvest_year', '<u2')])
+PO_DTYPE = np.dtype([('lot', '<i4'), ('order_day', '<i4'), ('arrival_day', '<i4'),
+                     ('pallets', '<i4'), ('first_pallet', '<i8')])
+PALLET_DTYPE = np.dtype([('po', '<i4'), ('warehouse', '<u2')])
+
+KEYS_FILE = "keys.json"
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def _to_days(dates, date_format=None):
+    """Convert date strings to int32 days since 1970-01-01."""
+    parsed = pd.to_datetime(dates, format=date_format).to_numpy().astype('datetime64[D]')
+    return (parsed - EPOCH).astype(np.int32)
+
+
+def _from_day(day):
+    """Convert days since 1970-01-01 to an ISO date string."""
+    return str(EPOCH + np.timedelta64(int(day), 'D'))
+
+
+def _allocate(pallets, shares):
+    """Split integer pallet counts over destinations without losing pallets.
+
+    Args:
+        pallets (numpy.ndarray): Pallets per PO, shape (pos,)
+        shares (numpy.ndarray): Destination shares per PO summing to 1, shape (pos, destinations)
+
+    Returns:
+        numpy.ndarray: Integer pallets per PO and destination, rows summing to pallets
+    """
+    cumulative = np.floor(np.cumsum(shares, axis=1) * pallets[:, np.newaxis] + 1e-9).astype(np.int64)
+    cumulative[:, -1] = pallets
+    return np.diff(cumulative, axis=1, prepend=0)
+
+
+def build_store(store_dir, df_delivery, df_purchase_orders, df_demand, df_customers):
+    """Build a traceability store from delivery, PO, demand and customer master data.
+
+    Args:
+        store_dir (str): Directory to write the store to
+        df_delivery (pandas.DataFrame): Delivery history (PO_ID, DeliveredQty(in pallets), ActualDeliveryDate)
+        df_purchase_orders (pandas.DataFrame): Purchase orders with SourceHarvestID and DemandMonthTarget
+        df_demand (pandas.DataFrame): Customer demand per city, customer and month
+        df_customers (pandas.DataFrame): Customer master data mapping customer and city to warehouse
+
+    Returns:
+        dict: Row counts of the stored tables
+    """
+    pos = df_purchase_orders.merge(
+        df_delivery[['PO_ID', 'DeliveredQty(in pallets)', 'ActualDeliveryDate']], on='PO_ID', how='inner'
+    ).sort_values('PO_ID').reset_index(drop=True)
+
+    # Key tables and integer codes
+    supplier_codes, suppliers = pd.factorize(pos['SupplierID'].astype(str), sort=True)
+    variety_codes, varieties = pd.factorize(pos['AppleVariety'], sort=True)
+    lot_keys = pd.MultiIndex.from_arrays([supplier_codes, variety_codes,
+                                          pos['HarvestMonth'].map(MONTH_MAP).to_numpy(),
+                                          pos['HarvestYear'].to_numpy()])
+    lot_codes, lot_index = pd.factorize(lot_keys, sort=True)
+
+    lots = np.empty(len(lot_index), dtype=LOT_DTYPE)
+    for field, level in zip(LOT_DTYPE.names, range(4)):
+        lots[field] = lot_index.get_level_values(level)
+
+    # Demand share of every customer warehouse per (target month, variety)
+    demand = df_demand.rename(columns=lambda c: c.replace('(metrictons)', ''))
+    demand = demand.melt(id_vars=['city', 'customer_id', 'month'],
+                         value_vars=[c for c in VARIETY_MAP if c in demand.columns],
+                         var_name='variety', value_name='quantity')
+    demand['variety'] = demand['variety'].map(VARIETY_MAP)
+    demand = demand.merge(df_customers[['customer_id', 'city', 'warehouse_id']], on=['customer_id', 'city'])
+    warehouse_codes, warehouses = pd.factorize(demand['warehouse_id'], sort=True)
+    demand['warehouse'] = warehouse_codes
+    share_table = demand.pivot_table(index=['month', 'variety'], columns='warehouse',
+                                     values='quantity', aggfunc='sum', fill_value=0)
+    share_table = share_table.reindex(columns=range(len(warehouses)), fill_value=0)
+    share_table = share_table.div(share_table.sum(axis=1), axis=0).fillna(1.0 / len(warehouses))
+
+    target_month = pd.to_datetime(pos['DemandMonthTarget']).dt.month.map(INV_MONTH_MAP)
+    share_keys = pd.MultiIndex.from_arrays([target_month, pos['AppleVariety']])
+    shares = share_table.reindex(share_keys).fillna(1.0 / len(warehouses)).to_numpy()
+
+    pallet_counts = pos['DeliveredQty(in pallets)'].fillna(0).to_numpy(dtype=np.int64)
+    per_warehouse = _allocate(pallet_counts, shares)
+
+    po_table = np.empty(len(pos), dtype=PO_DTYPE)
+    po_table['lot'] = lot_codes
+    po_table['order_day'] = _to_days(pos['OrderDate'])
+    po_table['arrival_day'] = _to_days(pos['ActualDeliveryDate'], '%d/%m/%y')
+    po_table['pallets'] = pallet_counts
+    po_table['first_pallet'] = np.concatenate([[0], np.cumsum(pallet_counts)[:-1]])
+
+    # Pallets sorted by PO, then warehouse: one contiguous range per PO
+    pallets = np.empty(int(pallet_counts.sum()), dtype=PALLET_DTYPE)
+    flat_counts = per_warehouse.ravel()
+    pallets['po'] = np.repeat(np.repeat(np.arange(len(pos), dtype=np.int32), len(warehouses)), flat_counts)
+    pallets['warehouse'] = np.repeat(np.tile(np.arange(len(warehouses), dtype=np.uint16), len(pos)), flat_counts)
+
+    warehouse_info = (df_customers.set_index('warehouse_id')
+                      .reindex(warehouses)[['customer_id', 'city']]
+                      .fillna('').to_dict(orient='index'))
+    keys = {
+        'suppliers': list(suppliers),
+        'varieties': list(varieties),
+        'pos': list(pos['PO_ID']),
+        'warehouses': [{'warehouse_id': w, **warehouse_info[w]} for w in warehouses],
+    }
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "lots.npy"), lots)
+    np.save(os.path.join(store_dir, "pos.npy"), po_table)
+    np.save(os.path.join(store_dir, "pallets.npy"), pallets)
+    with open(os.path.join(store_dir, KEYS_FILE), "w") as f:
+        json.dump(keys, f)
+
+    return {'lots': len(lots), 'pos': len(po_table), 'pallets': len(pallets), 'warehouses': len(warehouses)}
+
+
+class TraceabilityStore:
+    """Memory-mapped pallet traceability store.
+
+    Args:
+        store_dir (str): Directory written by build_store
+    """
+
+    def __init__(self, store_dir):
+        self.lots = np.load(os.path.join(store_dir, "lots.npy"), mmap_mode='r')
+        self.pos = np.load(os.path.join(store_dir, "pos.npy"), mmap_mode='r')
+        self.pallets = np.load(os.path.join(store_dir, "pallets.npy"), mmap_mode='r')
+        with open(os.path.join(store_dir, KEYS_FILE)) as f:
+            keys = json.load(f)
+        self.suppliers = keys['suppliers']
+        self.varieties = keys['varieties']
+        self.po_ids = keys['pos']
+        self.warehouses = keys['warehouses']
+
+    def find_lots(self, supplier=None, variety=None, harvest_month=None, harvest_year=None):
+        """Return the codes of lots matching every given criterion.
+
+        Args:
+            supplier (str, optional): Supplier ID, e.g. "S2"
+            variety (str, optional): Apple variety, e.g. "Fuji"
+            harvest_month (int or str, optional): Harvest month number or name
+            harvest_year (int, optional): Harvest year
+
+        Returns:
+            numpy.ndarray: Matching lot codes
+        """
+        mask = np.ones(len(self.lots), dtype=bool)
+        for field, value, table in (('supplier', supplier, self.suppliers), ('variety', variety, self.varieties)):
+            if value is not None:
+                if value not in table:
+                    return np.empty(0, dtype=np.int64)
+                mask &= self.lots[field] == table.index(value)
+        if harvest_month is not None:
+            month = MONTH_MAP.get(harvest_month, harvest_month)
+            mask &= self.lots['harvest_month'] == int(month)
+        if harvest_year is not None:
+            mask &= self.lots['harvest_year'] == int(harvest_year)
+        return np.flatnonzero(mask)
+
+    def recall(self, supplier=None, variety=None, harvest_month=None, harvest_year=None):
+        """Find the customer warehouses that received pallets from matching lots.
+
+        Args:
+            supplier (str, optional): Supplier ID
+            variety (str, optional): Apple variety
+            harvest_month (int or str, optional): Harvest month number or name
+            harvest_year (int, optional): Harvest year
+
+        Returns:
+            pandas.DataFrame: One row per warehouse with pallet count, PO count and delivery window
+        """
+        lots = self.find_lots(supplier, variety, harvest_month, harvest_year)
+        po_codes = np.flatnonzero(np.isin(self.pos['lot'], lots))
+
+        counts = np.zeros(len(self.warehouses), dtype=np.int64)
+        po_counts = np.zeros(len(self.warehouses), dtype=np.int64)
+        first_day = np.full(len(self.warehouses), np.iinfo(np.int32).max, dtype=np.int64)
+        last_day = np.full(len(self.warehouses), np.iinfo(np.int32).min, dtype=np.int64)
+        for po in po_codes:
+            start = int(self.pos['first_pallet'][po])
+            destinations = self.pallets['warehouse'][start:start + int(self.pos['pallets'][po])]
+            per_warehouse = np.bincount(destinations, minlength=len(self.warehouses))
+            received = per_warehouse > 0
+            counts += per_warehouse
+            po_counts += received
+            day = int(self.pos['arrival_day'][po])
+            first_day[received] = np.minimum(first_day[received], day)
+            last_day[received] = np.maximum(last_day[received], day)
+
+        hit = np.flatnonzero(counts)
+        return pd.DataFrame({
+            'WarehouseID': [self.warehouses[i]['warehouse_id'] for i in hit],
+            'CustomerID': [self.warehouses[i]['customer_id'] for i in hit],
+            'City': [self.warehouses[i]['city'] for i in hit],
+            'Pallets': counts[hit],
+            'PurchaseOrders': po_counts[hit],
+            'FirstArrival': [_from_day(first_day[i]) for i in hit],
+            'LastArrival': [_from_day(last_day[i]) for i in hit],
+        })
+
+    def trace_pallet(self, pallet_id):
+        """Follow one pallet back to its PO, lot and supplier and forward to its warehouse.
+
+        Args:
+            pallet_id (int): Row number of the pallet
+
+        Returns:
+            dict: Pallet lineage
+        """
+        pallet = self.pallets[int(pallet_id)]
+        po = self.pos[int(pallet['po'])]
+        lot = self.lots[int(po['lot'])]
+        warehouse = self.warehouses[int(pallet['warehouse'])]
+        return {
+            'pallet_id': int(pallet_id),
+            'po_id': self.po_ids[int(pallet['po'])],
+            'supplier_id': self.suppliers[int(lot['supplier'])],
+            'variety': self.varieties[int(lot['variety'])],
+            'harvest_month': INV_MONTH_MAP[int(lot['harvest_month'])],
+            'harvest_year': int(lot['harvest_year']),
+            'arrival_date': _from_day(po['arrival_day']),
+            'warehouse_id': warehouse['warehouse_id'],
+            'customer_id': warehouse['customer_id'],
+            'city': warehouse['city'],
+        }
+
+
+def main():
+    """Command-line entry point for building and querying the store."""
+    parser = argparse.ArgumentParser(description="Pallet-level traceability store")
+    parser.add_argument("--store", type=str, default=os.path.join(DATA_DIR, "traceability"),
+                        help="Store directory (default: data/traceability)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the store from delivery and PO history")
+    build_parser.add_argument("--delivery-data", type=str, default=os.path.join(DATA_DIR, "delivery.csv"))
+    build_parser.add_argument("--purchase-orders", type=str, default=os.path.join(DATA_DIR, "purchase_orders.csv"))
+    build_parser.add_argument("--demand-data", type=str, default=os.path.join(DATA_DIR, "customer_demand.csv"))
+    build_parser.add_argument("--customers", type=str, default=os.path.join(DATA_DIR, "customer_master.csv"))
+
+    recall_parser = subparsers.add_parser("recall", help="Find customers that received pallets from a lot")
+    recall_parser.add_argument("--supplier", type=str, help="Supplier ID, e.g. S2")
+    recall_parser.add_argument("--variety", type=str, help="Apple variety, e.g. Fuji")
+    recall_parser.add_argument("--harvest-month", type=str, help="Harvest month name, e.g. January")
+    recall_parser.add_argument("--harvest-year", type=int, help="Harvest year")
+
+    trace_parser = subparsers.add_parser("trace", help="Show the lineage of one pallet")
+    trace_parser.add_argument("pallet_id", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        frames = [pd.read_csv(path) for path in
+                  (args.delivery_data, args.purchase_orders, args.demand_data, args.customers)]
+        start = time.perf_counter()
+        counts = build_store(args.store, *frames)
+        print(f"Built store in {os.path.abspath(args.store)} in {time.perf_counter() - start:.2f}s: {counts}")
+        return
+
+    store = TraceabilityStore(args.store)
+    start = time.perf_counter()
+    if args.command == "recall":
+        result = store.recall(args.supplier, args.variety, args.harvest_month, args.harvest_year)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(result.to_string(index=False) if not result.empty else "No pallets found for this lot.")
+        print(f"Recall answered in {elapsed:.1f} ms")
+    else:
+        print(json.dumps(store.trace_pallet(args.pallet_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Vectorized validation of harvest and demand inputs.
+
+validate_dataframe only checks that required columns exist. Bad month
+names, negative or non-numeric quantities and countries without a
+shipping port used to surface as NaNs or crashes deep inside the engine.
+The checks here each run as one vectorized pass over a column (isin,
+to_numeric, duplicated), so validating millions of rows takes seconds,
+and they collect every problem into one error table rather than stopping
+at the first:
+
+    Row       index label of the offending row, None for column-level problems
+    Column    column checked
+    Check     required, missing, domain, numeric, range or unique
+    Severity  "error" blocks the simulation, "warning" is reported only
+    Value     offending value
+    Message   explanation
+
+Usage::
+
+    errors = validate_harvest(df_harvest)
+    if has_errors(errors):
+        print_validation_report(errors, "Harvest data")
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_PORT_MAP, MONTH_MAP, VARIETY_MAP
+
+ERROR_COLUMNS = ['Row', 'Column', 'Check', 'Severity', 'Value', 'Message']
+
+HARVEST_COLUMNS = ['SupplierID', 'Country', 'Apple Variety', 'Harvest Month', 'Harvest Quantity']
+DEMAND_ID_COLUMNS = ['city', 'customer_id', 'month']
+
+
+def _errors(df, mask, column, check, message, severity="error"):
+    """Error rows for every row where mask is True."""
+    rows = np.flatnonzero(np.asarray(mask, dtype=bool))
+    return pd.DataFrame({
+        'Row': df.index[rows],
+        'Column': column,
+        'Check': check,
+        'Severity': severity,
+        'Value': df[column].to_numpy()[rows].astype(object),
+        'Message': message,
+    }, columns=ERROR_COLUMNS)
+
+
+def check_required(df, columns):
+    """Report required columns that are missing."""
+    return pd.DataFrame([{'Row': None, 'Column': column, 'Check': 'required', 'Severity': 'error',
+                          'Value': None, 'Message': "required column is missing"}
+                         for column in columns if column not in df.columns], columns=ERROR_COLUMNS)
+
+
+def check_domain(df, column, allowed, message):
+    """Report values of a column outside an allowed set (missing values included)."""
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Test each category once and look the result up by code
+        known = np.append(values.cat.categories.isin(list(allowed)), False)
+        invalid = ~known[values.cat.codes.to_numpy()]
+    else:
+        invalid = ~values.isin(list(allowed)).to_numpy()
+    return _errors(df, invalid, column, 'domain', message)
+
+
+def check_quantity(df, column, minimum=0):
+    """Report missing or non-numeric quantities and quantities below a minimum."""
+    numbers = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+    not_numeric = np.isnan(numbers)
+    below = ~not_numeric & (numbers < minimum)
+    return pd.concat([
+        _errors(df, not_numeric, column, 'numeric', "quantity is missing or not a number"),
+        _errors(df, below, column, 'range', f"quantity is below {minimum}"),
+    ], ignore_index=True)
+
+
+def check_unique(df, columns, severity="warning"):
+    """Report rows whose key columns repeat another row."""
+    duplicated = df.duplicated(columns, keep='first').to_numpy()
+    errors = _errors(df, duplicated, columns[-1], 'unique',
+                     f"duplicate of an earlier row on {', '.join(columns)}", severity)
+    errors['Column'] = ", ".join(columns)
+    if len(columns) > 1 and not errors.empty:
+        # Report the whole key, built column-wise on the duplicate rows only
+        keys = df.loc[duplicated, columns].astype(str)
+        value = keys[columns[0]]
+        for column in columns[1:]:
+            value = value + " / " + keys[column]
+        errors['Value'] = value.to_numpy(dtype=object)
+    return errors
+
+
+def _concat(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def demand_varieties(df_demand):
+    """Harvest variety names of the demand columns that are not identifiers or the total."""
+    return [VARIETY_MAP.get(c, c) for c in df_demand.columns if c not in DEMAND_ID_COLUMNS and c != 'total']
+
+
+def quantity_columns(df_demand, varieties=None):
+    """Demand columns holding quantities: VARIETY_MAP columns and columns named after a harvest variety.
+
+    Args:
+        df_demand (pandas.DataFrame): Demand data
+        varieties (iterable, optional): Apple varieties present in the harvest data
+
+    Returns:
+        list: Quantity columns in file order; other columns (notes, helper columns) are ignored
+    """
+    known = set(VARIETY_MAP) | set(varieties if varieties is not None else [])
+    return [c for c in df_demand.columns if c in known and c not in DEMAND_ID_COLUMNS]
+
+
+def validate_harvest(df_harvest, varieties=None):
+    """Validate harvest data.
+
+    Checks months against MONTH_MAP, countries against COUNTRY_PORT_MAP (every
+    supplier country needs a shipping port), non-negative numeric quantities
+    and one row per supplier, variety and month. Varieties outside VARIETY_MAP
+    that no demand column is named after are warned about once each; the
+    engine accepts any name, but such a variety is usually a typo.
+
+    Args:
+        df_harvest (pandas.DataFrame): Raw harvest data
+        varieties (iterable, optional): Varieties the demand data names, see demand_varieties
+
+    Returns:
+        pandas.DataFrame: Error table with ERROR_COLUMNS, empty if the data is valid
+    """
+    missing = check_required(df_harvest, HARVEST_COLUMNS)
+    if not missing.empty:
+        return missing
+    known = set(VARIETY_MAP.values()) | set(varieties if varieties is not None else [])
+    unknown = pd.DataFrame([{'Row': None, 'Column': 'Apple Variety', 'Check': 'domain', 'Severity': 'warning',
+                             'Value': variety, 'Message': "variety is not in VARIETY_MAP and has no demand column"}
+                            for variety in df_harvest['Apple Variety'].dropna().unique()
+                            if variety not in known], columns=ERROR_COLUMNS)
+    return _concat([
+        _errors(df_harvest, df_harvest['SupplierID'].isna().to_numpy(), 'SupplierID', 'missing',
+                "supplier ID is missing"),
+        check_domain(df_harvest, 'Country', COUNTRY_PORT_MAP, "country has no shipping port in COUNTRY_PORT_MAP"),
+        _errors(df_harvest, df_harvest['Apple Variety'].isna().to_numpy(), 'Apple Variety', 'missing',
+                "apple variety is missing"),
+        unknown,
+        check_domain(df_harvest, 'Harvest Month', MONTH_MAP, "unknown month name"),
+        check_quantity(df_harvest, 'Harvest Quantity'),
+        check_unique(df_harvest, ['SupplierID', 'Apple Variety', 'Harvest Month']),
+    ])
+
+
+def validate_demand(df_demand, varieties=None):
+    """Validate customer demand data.
+
+    Checks the identifier columns are present, months against MONTH_MAP, that
+    there is at least one quantity column (see quantity_columns), non-negative
+    numeric quantities and one row per customer, city and month.
+
+    Args:
+        df_demand (pandas.DataFrame): Raw demand data
+        varieties (iterable, optional): Apple varieties present in the harvest data
+
+    Returns:
+        pandas.DataFrame: Error table with ERROR_COLUMNS, empty if the data is valid
+    """
+    missing = check_required(df_demand, DEMAND_ID_COLUMNS)
+    if not missing.empty:
+        return missing
+    columns = quantity_columns(df_demand, varieties)
+    if not columns:
+        return pd.DataFrame([{'Row': None, 'Column': 'quantity columns', 'Check': 'required', 'Severity': 'error',
+                              'Value': None, 'Message': "no VARIETY_MAP or harvest variety columns"}],
+                            columns=ERROR_COLUMNS)
+    return _concat([
+        check_domain(df_demand, 'month', MONTH_MAP, "unknown month name"),
+        *[check_quantity(df_demand, column) for column in columns],
+        check_unique(df_demand, DEMAND_ID_COLUMNS),
+    ])
+
+
+def has_errors(errors):
+    """Return True if an error table contains blocking errors."""
+    return bool((errors['Severity'] == 'error').any())
+
+
+def print_validation_report(errors, name="Data", limit=10, log=print):
+    """Print counts per column and check, and the first offending rows.
+
+    Args:
+        errors (pandas.DataFrame): Error table from a validate_* function
+        name (str): Name of the validated data for the messages
+        limit (int): Number of individual problems to list
+        log (callable): Function the report lines are written with
+    """
+    if errors.empty:
+        return
+    counts = errors.groupby(['Severity', 'Column', 'Check'], sort=True).size()
+    log(f"{name} validation found {int((errors['Severity'] == 'error').sum())} error(s) and "
+          f"{int((errors['Severity'] == 'warning').sum())} warning(s):")
+    for (severity, column, check), count in counts.items():
+        log(f"  {severity}: {column} ({check}): {count}")
+    for problem in errors.head(limit).itertuples(index=False):
+        row = "-" if problem.Row is None or pd.isna(problem.Row) else problem.Row
+        log(f"  row {row}: {problem.Column} = {problem.Value!r}: {problem.Message}")